@@ -0,0 +1,138 @@
+import os
+import sys
+import glob
+import time
+import shutil
+import tempfile
+import argparse
+import rasterio
+import numpy as np
+
+# --- Make the backend package importable (py/ holds config.py and wildfire_sim/) ---
+PY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "py")
+sys.path.insert(0, PY_DIR)
+
+from config import WILDFIRE_OUTPUT_BASE
+from wildfire_sim.sca import OUTPUT_PROFILES, _save_raster, run_geotiff_simulation
+
+# --- 1. CONFIGURATION ---
+FILE_PATTERN = "wildfire_t_*.tif"
+DEFAULT_LATEST_RUNS = 3  # Used when neither --runs nor --simulate is given
+
+
+# --- 2. FIND FRAMES ---
+def find_run_dirs(run_dirs, latest):
+    """Returns the requested run directories, or the `latest` runs in WILDFIRE_OUTPUT_BASE."""
+    if run_dirs:
+        return run_dirs
+    candidates = sorted(glob.glob(os.path.join(WILDFIRE_OUTPUT_BASE, "sim_run_*")), key=os.path.getmtime)
+    return candidates[-latest:]
+
+
+def load_frames(run_dirs):
+    """Reads every frame of every run into memory as (data, meta) pairs."""
+    frames = []
+    for run_dir in run_dirs:
+        for path in sorted(glob.glob(os.path.join(run_dir, FILE_PATTERN))):
+            with rasterio.open(path) as src:
+                frames.append((src.read(1), src.meta.copy()))
+    return frames
+
+
+# --- 3. BENCHMARK ---
+def benchmark_profile(profile, frames, work_dir):
+    """Writes and reads back every frame with `profile`; returns per-frame averages."""
+    profile_dir = os.path.join(work_dir, profile)
+    os.makedirs(profile_dir, exist_ok=True)
+
+    write_times, read_times, sizes = [], [], []
+    for i, (data, meta) in enumerate(frames):
+        start = time.perf_counter()
+        _save_raster(data, meta.copy(), i, profile_dir, profile=profile)
+        write_times.append(time.perf_counter() - start)
+
+        path = os.path.join(profile_dir, f"wildfire_t_{i:03d}.tif")
+        sizes.append(os.path.getsize(path))
+
+        start = time.perf_counter()
+        with rasterio.open(path) as src:
+            read_back = src.read(1)
+        read_times.append(time.perf_counter() - start)
+
+        if not np.array_equal(read_back, data.astype(np.uint8)):
+            print(f"  WARNING: profile '{profile}' did not round-trip frame {i}")
+
+    return {
+        "write_ms": 1000 * np.mean(write_times),
+        "read_ms": 1000 * np.mean(read_times),
+        "bytes": np.mean(sizes),
+        "total_bytes": int(np.sum(sizes)),
+    }
+
+
+def print_report(results, n_frames, shape):
+    print(f"\n--- Output profile benchmark ({n_frames} frames, typical size {shape}) ---")
+    print(f"{'profile':<20}{'write ms/frame':>16}{'read ms/frame':>16}{'bytes/frame':>14}{'total KiB':>12}")
+    for profile, r in results.items():
+        print(f"{profile:<20}{r['write_ms']:>16.2f}{r['read_ms']:>16.2f}{r['bytes']:>14.0f}{r['total_bytes'] / 1024:>12.1f}")
+
+    fastest = min(results, key=lambda p: results[p]["write_ms"] + results[p]["read_ms"])
+    smallest = min(results, key=lambda p: results[p]["bytes"])
+    print(f"\nLatency-bound pick: {fastest}")
+    print(f"Storage-bound pick: {smallest}")
+
+
+# --- 4. RUN THE SCRIPT ---
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark wildfire frame output profiles (write time, read time, bytes per frame)."
+    )
+    parser.add_argument(
+        '--runs', '-r',
+        nargs='*',
+        default=None,
+        help="Simulation output directories (e.g. 'wildfire_output/sim_run_...'). "
+             f"Defaults to the {DEFAULT_LATEST_RUNS} most recent runs."
+    )
+    parser.add_argument(
+        '--simulate', '-s',
+        nargs=3,
+        metavar=('COUNTY_KEY', 'LAT', 'LON'),
+        default=None,
+        help="Run a fresh county simulation first and benchmark its frames."
+    )
+    parser.add_argument(
+        '--profiles', '-p',
+        nargs='*',
+        default=list(OUTPUT_PROFILES),
+        help=f"Profiles to compare. (Default: {' '.join(OUTPUT_PROFILES)})"
+    )
+    args = parser.parse_args()
+
+    run_dirs = list(args.runs or [])
+    if args.simulate:
+        county_key, lat, lon = args.simulate
+        result = run_geotiff_simulation(county_key, float(lat), float(lon))
+        run_dirs.append(result["output_dir"])
+
+    run_dirs = find_run_dirs(run_dirs, DEFAULT_LATEST_RUNS)
+    frames = load_frames(run_dirs)
+    if not frames:
+        print(f"No files matching '{FILE_PATTERN}' found. Run a simulation first or pass --simulate.")
+        return
+
+    print(f"Benchmarking {len(frames)} frames from {len(run_dirs)} run(s):")
+    for run_dir in run_dirs:
+        print(f"  {run_dir}")
+
+    work_dir = tempfile.mkdtemp(prefix="profile_bench_")
+    try:
+        results = {p: benchmark_profile(p, frames, work_dir) for p in args.profiles}
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_report(results, len(frames), frames[0][0].shape)
+
+
+if __name__ == "__main__":
+    main()
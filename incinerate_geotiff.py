@@ -1,4 +1,5 @@
 import os
+import sys
 import time
 import numpy as np
 import matplotlib.pyplot as plt
@@ -8,8 +9,19 @@ import random as rnd
 import rasterio
 import matplotlib
 import argparse
+import scipy.sparse as sp
 from matplotlib.colors import ListedColormap
 
+# --- Make the backend package importable (py/ holds config.py and wildfire_sim/) ---
+PY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "py")
+sys.path.insert(0, PY_DIR)
+
+from wildfire_sim.graph_engine import edge_weights
+from wildfire_sim.incinerate import (
+    wind_table, fire_front, extend_fire_front, frontier_ignitions, set_burning, set_edge_burning,
+    set_edge_weight, lifeline_update, life_edge_update,
+)
+
 # Use 'Agg' backend for non-interactive (server) environments
 matplotlib.use('Agg')
 
@@ -30,6 +42,9 @@ EDGE_WEIGHT_NOISE_HIGH = 1.6
 THRESHOLD_NOISE_LOW = 0.8      # Fixed: Added missing constant
 THRESHOLD_NOISE_HIGH = 1.2     # Fixed: Added missing constant
 DEFAULT_IGNITION = "random"
+DEFAULT_ENGINE = "networkx"
+ENGINES = ("networkx", "sparse", "lazy")
+LAZY_MARGIN = 2           # Cells around burning nodes the lazy engine materializes
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -47,6 +62,9 @@ STATE_TO_INT = {
     'burning': 2,
     'burnt': 3
 }
+# Node colours live on the graph only; the shared set_burning / set_burnt
+# helpers also update a per-node colour list, which this script has none of
+NO_COLOR_LIST = ()
 
 # =========================================================================
 # Core Simulation Functions (Mostly unchanged)
@@ -92,179 +110,553 @@ def get_burning(g, lst):
     """Filters a list of nodes, returning only those that are 'burning'."""
     return [item for item in lst if g.has_node(item) and g.nodes[item]['fire_state'] == 'burning']
 
-def life_edge_update(g, edge_list):
-    """Reduces 'life' of burning edges, turning them 'brown' (burnt)."""
-    for p, q in edge_list:
-        if g.has_edge(p,q) and g[p][q]['color'] == 'orange':
-            g[p][q]['life'] -= 1
-            if g[p][q]['life'] < 0:
-                g[p][q]['color'] = 'brown'
-
-def update_active_neighbors(g):
-    """Updates the 'num_of_active_neighbors' attribute for each node."""
-    for itemm in g.nodes():
-        num = sum(1 for item in g.neighbors(itemm) if g.has_node(item) and g.nodes[item]['fire_state'] == 'burning')
-        g.nodes[itemm]['num_of_active_neighbors'] = num
-
-def lifeline_update(g):
-    """Reduces 'life' of burning nodes, turning them 'burnt'."""
-    for node in g.nodes():
-        if g.nodes[node]['fire_state'] == 'burning':
-            g.nodes[node]['life'] -= 1
-            if g.nodes[node]['life'] < 0:
-                g.nodes[node]['fire_state'] = 'burnt'
-                g.nodes[node]['color'] = 'brown'
-
 def incinerate(g, edge_list, grid_width, grid_height):
     """
     Main fire spread logic for one timestep.
     Calculates ignition from neighbors and ember spotting.
+
+    Burning neighbours, their weight sums and the burnout steps are kept
+    in g.graph['fire_front'] (wildfire_sim.incinerate.fire_front), so a
+    step visits the unburnt nodes next to the fire and this step's burnout
+    buckets rather than every node and edge.
     """
-    cell_scale = 100.0 / grid_width # Scale based on 100x100 unit area
-    
-    burning_nodes = get_burning(g, [n for n in g.nodes])
-    nodes_to_ignite = []
+    front = fire_front(g)
+    burning_nodes = sorted(front['burning'])
 
     # 1. Neighbor-based ignition
-    for ignition_node in burning_nodes:
-        for nb in g.neighbors(ignition_node):
-            if g.nodes[nb]['fire_state'] == 'not_burnt':
-                active_neighbors = get_burning(g, list(g.neighbors(nb)))
-                s = 0
-                for burning_nb in active_neighbors:
-                    if g.has_edge(burning_nb, nb):
-                        w = g.get_edge_data(burning_nb, nb).get('w', 0)
-                        w_eff = w * rnd.uniform(EDGE_WEIGHT_NOISE_LOW, EDGE_WEIGHT_NOISE_HIGH)
-                        s = min(1, s + w_eff)
-                
-                ths = g.nodes[nb]['threshold_switch']
-                ths_eff = ths * rnd.uniform(THRESHOLD_NOISE_LOW, THRESHOLD_NOISE_HIGH)
-
-                if s >= ths_eff:
-                    nodes_to_ignite.append((nb, ignition_node))
-
-    for nb, ignition_node in nodes_to_ignite:
-        if g.nodes[nb]['fire_state'] != 'burning':
-            g.nodes[nb]['fire_state'] = 'burning'
-            g.nodes[nb]['color'] = 'orange'
-            if g.has_edge(ignition_node, nb):
-                g[ignition_node][nb]['color'] = 'orange'
-
-    # 2. Ember mechanic (spotting)
-    non_empty_nodes = [n for n in g.nodes if g.nodes[n]['fire_state'] not in ('empty', 'burning', 'burnt')]
+    for nb, ignition_node in frontier_ignitions(g, front, (EDGE_WEIGHT_NOISE_LOW, EDGE_WEIGHT_NOISE_HIGH),
+                                                (THRESHOLD_NOISE_LOW, THRESHOLD_NOISE_HIGH)):
+        set_burning(g, nb, NO_COLOR_LIST)
+        set_edge_burning(g, ignition_node, nb)
+
+    # 2. Ember mechanic (spotting): candidates are the unburnt nodes after step 1
+    ember_index = g.graph['ember_index']    # RasterEmberIndex of the forest raster
+    ember_index.flush()
     for bnode in burning_nodes:
-        if not non_empty_nodes:
+        if not len(ember_index):
             break
         if rnd.random() < EMBER_PROB:
-            bx, by = g.nodes[bnode]['pos']
-            candidates = []
-            for n in non_empty_nodes:
-                nxp, nyp = g.nodes[n]['pos']
-                dx = abs(nxp - bx) / cell_scale
-                dy = abs(nyp - by) / cell_scale
-                if dx <= EMBER_RADIUS and dy <= EMBER_RADIUS:
-                    candidates.append(n)
-            
-            if not candidates and rnd.random() < 0.1:
-                candidates = non_empty_nodes
-            
-            if candidates:
-                target = rnd.choice(candidates)
+            candidates = ember_index.near(g.nodes[bnode]['pos'])
+            target = rnd.choice(candidates) if candidates else None
+            if target is None and rnd.random() < 0.1:
+                target = ember_index.sample()
+
+            if target is not None:
                 if rnd.random() < 0.5:
+                    if 'lazy' in g.graph:
+                        g.graph['lazy'].materialize([target])
                     if g.nodes[target]['fire_state'] == 'not_burnt':
-                        g.nodes[target]['fire_state'] = 'burning'
-                        g.nodes[target]['color'] = 'orange'
+                        set_burning(g, target, NO_COLOR_LIST)
                         if g.has_edge(bnode, target):
-                            g[bnode][target]['color'] = 'orange'
-
-    # 3. Update node/edge lifelines
-    lifeline_update(g)
-    life_edge_update(g, edge_list)
-    update_active_neighbors(g)
-
-    # 4. Final state check
-    for nd in list(g.nodes()):
-        if g.nodes[nd]['fire_state'] == 'burnt':
-            g.nodes[nd]['color'] = 'brown'
-            for neighbor in g.neighbors(nd):
-                if g.has_edge(nd, neighbor):
-                    g[nd][neighbor]['color'] = 'brown'
+                            set_edge_burning(g, bnode, target)
+    ember_index.flush()
+
+    # 3. Node/edge lifelines: this step's burnout buckets (burnt nodes brown their edges)
+    lifeline_update(g, NO_COLOR_LIST)
+    life_edge_update(g)
+    front['step'] += 1
     return g
 
-def simulate_wind(g, edge_list, max_speed, epsilon, dist_scale):
-    """Applies a random wind ellipse to the graph, modifying edge weights."""
-    nn = g.number_of_nodes()
-    snn = int(np.ceil(np.sqrt(nn))) # Approx grid size
-    non_empty_nodes = [n for n in g.nodes if g.nodes[n]['fire_state'] != 'empty']
-    if not non_empty_nodes:
-        return (None, 0, 0)
-    
-    center_node = rnd.choice(non_empty_nodes)
-    center_node_pos = g.nodes[center_node]['pos']
+def wind_ellipse(center_pos, snn, rng=None):
+    """
+    Draws the axes of a random wind ellipse centred on `center_pos` for an
+    approx grid size `snn`, from `rng` (a NumPy Generator) or else `random`.
+    Returns (center_x, center_y, scaled_a, scaled_b, a, b).
+    """
+    if rng is None:
+        randint, choice = rnd.randint, rnd.choice
+    else:
+        randint = lambda low, high: int(rng.integers(low, high + 1))
+        choice = lambda seq: seq[int(rng.integers(len(seq)))]
     random_bound = 4
     a, b = 0, 0
     while a == b:
-        a = rnd.randint(1, random_bound)
-        b = rnd.randint(1, random_bound)
+        a = randint(1, random_bound)
+        b = randint(1, random_bound)
     c_max = max(a, b) - 1
-    c = rnd.randint(1, c_max) * rnd.choice([-1, 1]) if c_max > 0 else 0
-    center_x, center_y = g.nodes[center_node]['pos']
+    c = randint(1, c_max) * choice([-1, 1]) if c_max > 0 else 0
+    center_x, center_y = center_pos
     
     cell_scale = 100.0 / snn
     scaled_a = a * cell_scale * 5 
     scaled_b = b * cell_scale * 5
+    return (center_x, center_y, scaled_a, scaled_b, a, b)
+
+def in_wind_ellipse(pos, ellipse):
+    """Mask of the positions `pos` inside a wind_ellipse()."""
+    center_x, center_y, scaled_a, scaled_b, _, _ = ellipse
+    return ((pos[:, 0] - center_x)**2 / scaled_a**2) + ((pos[:, 1] - center_y)**2 / scaled_b**2) <= 1
+
+def wind_angles(pos1, pos2, ellipse):
+    """Wind direction of the edges (pos1, pos2) in a wind_ellipse(); its centre is the focus."""
+    posf = ellipse[:2]
+    a, b = ellipse[4:]
+    if a > b: # Horizontal ellipse
+        return np.where((pos1[:, 0] > posf[0]) & (pos2[:, 0] > posf[0]), 0, 180)
+    # Vertical ellipse
+    return np.where((pos1[:, 1] > posf[1]) & (pos2[:, 1] > posf[1]), 90, 270)
 
-    elliptical_nodes = []
-    for node, data in g.nodes(data=True):
-        if data['fire_state'] != 'empty':
-            x, y = g.nodes[node]['pos']
-            if ((x - center_x)**2 / scaled_a**2) + ((y - center_y)**2 / scaled_b**2) <= 1:
-                elliptical_nodes.append(node)
-    
-    focus = center_node
-    posf = g.nodes[focus]['pos']
+def simulate_wind(g, edge_list, max_speed, epsilon, dist_scale):
+    """Applies a random wind ellipse to the graph, modifying edge weights."""
+    nn = g.number_of_nodes()
+    snn = g.graph.get('grid_size') or int(np.ceil(np.sqrt(nn))) # Approx grid size
+    table = wind_table(g, edge_list)
+    non_empty_nodes = table['non_empty_nodes']
+    if not non_empty_nodes:
+        return (None, 0, 0)
 
-    for n1 in elliptical_nodes:
-        for n2 in elliptical_nodes:
-            if n1 >= n2 or not g.has_edge(n1, n2):
-                continue
-            
-            pos1 = g.nodes[n1]['pos']
-            pos2 = g.nodes[n2]['pos']
-            
-            if a > b: # Horizontal ellipse
-                angle = 0 if (pos1[0] > posf[0] and pos2[0] > posf[0]) else 180
-            else: # Vertical ellipse
-                angle = 90 if (pos1[1] > posf[1] and pos2[1] > posf[1]) else 270
-            
-            w_e = edge_weight(max_speed, epsilon, 1, angle, dist(pos1, pos2, 30))
-            g[n1][n2]['w'] = w_e
-            g[n1][n2]['wind_dir'] = angle
-            g[n1][n2]['edge_strength'] = 1
+    pos = table['pos']
+    center_node = rnd.choice(non_empty_nodes)
+    center_node_pos = g.nodes[center_node]['pos']
+    ellipse = wind_ellipse(center_node_pos, snn)
+    inside = table['non_empty'] & in_wind_ellipse(pos, ellipse)
+
+    # Edges with both ends in the ellipse, from the incidence lists of its nodes
+    indptr = table['indptr']
+    inside_nodes = np.flatnonzero(inside)
+    lengths = indptr[inside_nodes + 1] - indptr[inside_nodes]
+    offsets = np.arange(int(lengths.sum())) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    edges = np.unique(table['incident'][np.repeat(indptr[inside_nodes], lengths) + offsets])
+    edges = edges[inside[table['u'][edges]] & inside[table['v'][edges]]]
+    pos1, pos2 = pos[table['u'][edges]], pos[table['v'][edges]]
+
+    angles = wind_angles(pos1, pos2, ellipse)
+    distances = np.hypot(pos2[:, 0] - pos1[:, 0], pos2[:, 1] - pos1[:, 1]) * 30
+    weights = edge_weights(max_speed, epsilon, 1, angles, distances, table['rng'])
+
+    for e, angle, w_e in zip(edges.tolist(), angles.tolist(), weights.tolist()):
+        n1, n2 = table['edges'][e]
+        data = table['edge_data'][e]
+        set_edge_weight(g, n1, n2, w_e, data)
+        data['wind_dir'] = angle
+        data['edge_strength'] = 1
             
-    return (center_node_pos, a, b)
+    return (center_node_pos, ellipse[4], ellipse[5])
 
 # =========================================================================
 # NEW/REWRITTEN Simulation Runner
 # =========================================================================
 
+def base_edge_weights(p1, p2, dist_scale, rng):
+    """Angles (as get_angle) and windless weights of the edges (p1, p2). Returns (angles, weights)."""
+    dx, dy = p2[:, 0] - p1[:, 0], p2[:, 1] - p1[:, 1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        angles = np.arctan(dy / dx) * 180 / np.pi
+    angles = np.where(dx < 0, angles + 180, angles)
+    angles = np.where(dx == 0, np.where(dy > 0, 90.0, 270.0), angles)
+    weights = edge_weights(MAX_WIND_SPEED, 0.1, 0, angles, np.hypot(dx, dy) * dist_scale, rng) * PP_FACTOR
+    return angles, weights
+
+def ember_reach(grid_shape, transform):
+    """incinerate()'s ember radius (EMBER_RADIUS cells of 100 / width position units) in pixels, as (rows, cols)."""
+    reach = 100.0 / grid_shape[1] * EMBER_RADIUS
+    return (int(min(reach / abs(transform.e), grid_shape[0])),
+            int(min(reach / abs(transform.a), grid_shape[1])))
+
+def raster_graph_arrays(forest_data, transform, dist_scale):
+    """
+    Node and edge arrays of a forest raster's fire graph.
+
+    Only forest pixels become nodes; node IDs are the flat pixel index
+    row * width + col and positions are pixel centres. Edges join
+    8-connected forest pixels, as indices into the node arrays.
+    """
+    grid_height, grid_width = forest_data.shape
+    forest = forest_data == FOREST_PIXEL_VALUE
+    rows, cols = np.nonzero(forest)
+    ids = rows * grid_width + cols
+    xs, ys = transform * (cols + 0.5, rows + 0.5) # centre of pixel
+    pos = np.column_stack([xs, ys])
+    # Array draws are seeded from `random`, so rnd.seed() still fixes a run
+    rng = np.random.default_rng(rnd.getrandbits(64))
+    life = rng.integers(3, 8, size=ids.size) # Lifeline
+
+    # 8-neighbour edges: each pair once, via right, down, down-right and down-left
+    node_index = np.full(forest.shape, -1, dtype=np.int64)
+    node_index[rows, cols] = np.arange(ids.size)
+    src, dst = [], []
+    for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        nr, nc = rows + dr, cols + dc
+        ok = (nr < grid_height) & (nc >= 0) & (nc < grid_width)
+        ok[ok] = forest[nr[ok], nc[ok]]
+        src.append(np.flatnonzero(ok))
+        dst.append(node_index[nr[ok], nc[ok]])
+    src, dst = np.concatenate(src), np.concatenate(dst)
+
+    angles, weights = base_edge_weights(pos[src], pos[dst], dist_scale, rng)
+    edge_life = (life[src] + life[dst]) // 2
+    return {'ids': ids, 'pos': pos, 'life': life, 'src': src, 'dst': dst,
+            'w': weights, 'wind_dir': angles, 'edge_life': edge_life}
+
+def build_raster_graph(forest_data, transform, threshold, dist_scale):
+    """Builds the networkx fire graph of a forest raster. Returns (g, edge_list)."""
+    a = raster_graph_arrays(forest_data, transform, dist_scale)
+    ids, src, dst = a['ids'], a['src'], a['dst']
+    g = nx.Graph(grid_size=int(np.ceil(np.sqrt(forest_data.size))),
+                 ember_index=RasterEmberIndex(forest_data == FOREST_PIXEL_VALUE, transform))
+    g.add_nodes_from(
+        (n, {'threshold_switch': threshold, 'color': 'green', 'num_of_active_neighbors': 0,
+             'fire_state': 'not_burnt', 'life': lf, 'pos': (x, y)})
+        for n, lf, (x, y) in zip(ids.tolist(), a['life'].tolist(), a['pos'].tolist())
+    )
+    edge_list = list(zip(ids[src].tolist(), ids[dst].tolist()))
+    g.add_edges_from(
+        (n1, n2, {'w': w, 'color': 'green', 'life': lf, 'edge_strength': 0, 'wind_speed': 0.01,
+                  'wind_dir': angle, 'eb': 0})
+        for (n1, n2), w, lf, angle in zip(edge_list, a['w'].tolist(), a['edge_life'].tolist(), a['wind_dir'].tolist())
+    )
+    return g, edge_list
+
+class SparseFireGraph:
+    """
+    The fire graph of a raster as a scipy.sparse CSR matrix of edge weights.
+
+    The spread of incinerate() becomes sparse matrix-vector products: the
+    weight matrix, scaled elementwise by fresh edge noise, times the burning
+    indicator gives each node's summed weight from burning neighbours,
+    which is compared against noisy thresholds in one vectorized pass.
+    incinerate() repeats that trial once per burning neighbour, so a node
+    with k burning neighbours stays in the next k - 1 passes too; only the
+    rows of unburnt nodes next to the fire are multiplied. Ember targets
+    come from a RasterEmberIndex, as for the networkx engines, and every
+    draw (noise, embers, wind) comes from the graph's own Generator.
+    """
+
+    def __init__(self, arrays, grid_shape, transform, threshold, dist_scale):
+        self.grid_shape = grid_shape
+        self.ids = arrays['ids']
+        self.rows, self.cols = np.divmod(self.ids, grid_shape[1])
+        self.pos = arrays['pos']
+        self.life = arrays['life'].copy()
+        self.n = self.ids.size
+        self.threshold = np.full(self.n, threshold, dtype=float)
+        self.state = np.full(self.n, STATE_TO_INT['not_burnt'], dtype=np.uint8)
+        self.dist_scale = dist_scale
+        self.grid_size = int(np.ceil(np.sqrt(grid_shape[0] * grid_shape[1])))
+        self.rng = np.random.default_rng(rnd.getrandbits(64))
+        self.node_index = np.full(grid_shape, -1, dtype=np.int64)
+        self.node_index[self.rows, self.cols] = np.arange(self.n)
+        self.ember_index = RasterEmberIndex(self.node_index >= 0, transform, self.rng)
+
+        # Symmetric matrix; entry_of[e] / entry_of[e + E] are the CSR slots of edge e
+        self.src, self.dst = arrays['src'], arrays['dst']
+        m = self.src.size
+        r = np.concatenate([self.src, self.dst])
+        c = np.concatenate([self.dst, self.src])
+        order = np.lexsort((c, r))
+        self.entry_of = np.empty(2 * m, dtype=np.int64)
+        self.entry_of[order] = np.arange(2 * m)
+        indptr = np.zeros(self.n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(r, minlength=self.n), out=indptr[1:])
+        self.weights = sp.csr_matrix((np.concatenate([arrays['w'], arrays['w']])[order], c[order], indptr),
+                                     shape=(self.n, self.n))
+        self.adjacency = sp.csr_matrix((np.ones(2 * m), c[order], indptr), shape=(self.n, self.n))
+
+    def ignite(self, node):
+        self.state[node] = STATE_TO_INT['burning']
+        self.ember_index.discard(int(self.ids[node]))
+
+    def count(self, state):
+        return int(np.count_nonzero(self.state == STATE_TO_INT[state]))
+
+    def snapshot(self):
+        img_data = np.zeros(self.grid_shape, dtype=int)
+        img_data[self.rows, self.cols] = self.state
+        return img_data
+
+    def step(self):
+        """One timestep: spread, embers, then lifelines (as incinerate())."""
+        burning = self.state == STATE_TO_INT['burning']
+        not_burnt = self.state == STATE_TO_INT['not_burnt']
+
+        # 1. Neighbour-based ignition: (W .* noise) @ burning vs noisy thresholds,
+        #    one pass per burning neighbour of the frontier nodes
+        x = burning.astype(float)
+        active = (self.adjacency @ x).astype(int)
+        rows = np.flatnonzero(not_burnt & (active > 0))
+        trial = 0
+        while rows.size:
+            w = self.weights[rows]
+            noisy = sp.csr_matrix((w.data * self.rng.uniform(EDGE_WEIGHT_NOISE_LOW, EDGE_WEIGHT_NOISE_HIGH, w.nnz),
+                                   w.indices, w.indptr), shape=w.shape)
+            s = np.minimum(1, noisy @ x)
+            ths_eff = self.threshold[rows] * self.rng.uniform(THRESHOLD_NOISE_LOW, THRESHOLD_NOISE_HIGH, rows.size)
+            ignite = s >= ths_eff
+            self._set_burning(rows[ignite])
+            trial += 1
+            rows = rows[~ignite & (active[rows] > trial)]
+
+        # 2. Embers from the nodes burning at the start of the step. Ignitions
+        #    are applied after the pass, so every ember sees the unburnt nodes
+        #    left by step 1 (as incinerate() and ArrayGraph._embers do)
+        self.ember_index.flush()
+        launch = np.flatnonzero(burning & (self.rng.random(self.n) < EMBER_PROB))
+        targets = set()
+        for node in launch.tolist():
+            if not len(self.ember_index):
+                break
+            target = self._ember_target(node)
+            if target >= 0 and self.rng.random() < 0.5:
+                targets.add(target)
+        self._set_burning(np.array(sorted(targets), dtype=np.int64))
+        self.ember_index.flush()
+
+        # 3. Lifelines
+        burning = self.state == STATE_TO_INT['burning']
+        self.life[burning] -= 1
+        self.state[burning & (self.life < 0)] = STATE_TO_INT['burnt']
+
+    def _set_burning(self, nodes):
+        self.state[nodes] = STATE_TO_INT['burning']
+        for pixel in self.ids[nodes].tolist():
+            self.ember_index.discard(pixel)
+
+    def _ember_target(self, node):
+        """A random unburnt node within the ember radius, else (p=0.1) anywhere; -1 if none."""
+        candidates = self.ember_index.pixels_near(self.pos[node])
+        if candidates.size:
+            pixel = candidates[self.rng.integers(candidates.size)]
+        elif self.rng.random() < 0.1:
+            pixel = self.ember_index.sample()
+        else:
+            return -1
+        return int(self.node_index.flat[pixel])
+
+    def simulate_wind(self, max_speed, epsilon):
+        """simulate_wind() on the matrix: reweights the edges inside a random ellipse."""
+        center = int(self.rng.integers(self.n))
+        ellipse = wind_ellipse(self.pos[center], self.grid_size, self.rng)
+        inside = in_wind_ellipse(self.pos, ellipse)
+        edges = np.flatnonzero(inside[self.src] & inside[self.dst])
+        pos1, pos2 = self.pos[self.src[edges]], self.pos[self.dst[edges]]
+        angles = wind_angles(pos1, pos2, ellipse)
+        distances = np.hypot(pos2[:, 0] - pos1[:, 0], pos2[:, 1] - pos1[:, 1]) * self.dist_scale
+        w_e = edge_weights(max_speed, epsilon, 1, angles, distances, self.rng)
+        data = self.weights.data
+        data[self.entry_of[edges]] = w_e
+        data[self.entry_of[edges + self.src.size]] = w_e
+        return (tuple(self.pos[center]), ellipse[4], ellipse[5])
+
+def random_pixel(mask, rng=None):
+    """
+    Flat index of a uniformly random True pixel of `mask` (flat bool array),
+    drawn from `rng` (a NumPy Generator) or else `random`.
+    """
+    randrange = rnd.randrange if rng is None else lambda n: int(rng.integers(n))
+    for _ in range(32):
+        node = randrange(mask.size)
+        if mask[node]:
+            return node
+    candidates = np.flatnonzero(mask)
+    return int(candidates[randrange(candidates.size)])
+
+class RasterEmberIndex:
+    """
+    Ember targets of incinerate(): the unburnt forest pixels within
+    EMBER_RADIUS pixels (ember_reach) of a burning node, read from a mask
+    of the raster. Node ids are flat pixel indices, so the same index
+    serves the full networkx graph, a LazyRasterGraph, whose targets may
+    not be materialized yet, and SparseFireGraph. Removals are deferred until flush(), so
+    an ember pass samples from the unburnt pixels as they were before it.
+    sample() draws from `rng` (a NumPy Generator) or else `random`.
+    """
+
+    def __init__(self, forest, transform, rng=None):
+        self.shape = forest.shape
+        self.rng = rng
+        self.inverse = ~transform
+        self.reach = ember_reach(forest.shape, transform)
+        self.unburnt = forest.ravel().copy()
+        self.count = int(np.count_nonzero(self.unburnt))
+        self.pending = []
+
+    def __len__(self):
+        return self.count
+
+    def discard(self, node):
+        self.pending.append(node)
+
+    def flush(self):
+        if self.pending:
+            nodes = np.unique(self.pending)
+            self.count -= int(np.count_nonzero(self.unburnt[nodes]))
+            self.unburnt[nodes] = False
+            self.pending = []
+
+    def near(self, pos):
+        """Unburnt forest pixels within the ember radius of `pos`."""
+        return self.pixels_near(pos).tolist()
+
+    def pixels_near(self, pos):
+        """near() as an array of flat pixel indices."""
+        col, row = self.inverse * pos
+        r, c = int(np.floor(row)), int(np.floor(col))
+        (dr, dc), (height, width) = self.reach, self.shape
+        r0, c0 = max(r - dr, 0), max(c - dc, 0)
+        block = self.unburnt.reshape(self.shape)[r0:min(r + dr + 1, height), c0:min(c + dc + 1, width)]
+        rows, cols = np.nonzero(block)
+        return (rows + r0) * width + cols + c0
+
+    def sample(self):
+        """A uniformly random unburnt forest pixel."""
+        return random_pixel(self.unburnt, self.rng)
+
+class LazyRasterGraph:
+    """
+    Builds the networkx fire graph of a raster only around the fire.
+
+    grow() adds the forest pixels within `margin` cells of a burning node
+    to `g`, with edges to the materialized pixels around them; the rest of
+    the raster never becomes nodes, so graph memory and build time follow
+    the burned footprint. An edge's weight is drawn when the edge is first
+    created and then stays on the edge, with every earlier wind ellipse
+    covering it applied, so incinerate() sees the weights the full graph
+    would have. Embers (RasterEmberIndex) may land anywhere in the forest
+    and materialize the pixel they hit. Materialized nodes and edges join
+    the incremental fire front (extend_fire_front).
+    """
+
+    def __init__(self, forest_data, transform, threshold, dist_scale, margin=LAZY_MARGIN):
+        self.forest = forest_data == FOREST_PIXEL_VALUE
+        self.grid_shape = self.forest.shape
+        self.transform = transform
+        self.threshold = threshold
+        self.dist_scale = dist_scale
+        self.margin = margin
+        self.materialized = np.zeros(self.forest.size, dtype=bool)
+        self.life = {}          # node -> initial life, for the lives of edges created later
+        self.winds = []         # (ellipse, max_speed, epsilon) of every simulate_wind() so far
+        self.edge_u, self.edge_v = [], []
+        self.edge_list = []
+        self.rng = np.random.default_rng(rnd.getrandbits(64))
+        self.g = nx.Graph(grid_size=int(np.ceil(np.sqrt(self.forest.size))), lazy=self)
+        self.g.graph['ember_index'] = RasterEmberIndex(self.forest, transform)
+
+    def positions(self, nodes):
+        rows, cols = np.divmod(nodes, self.grid_shape[1])
+        xs, ys = self.transform * (cols + 0.5, rows + 0.5) # centre of pixel
+        return np.column_stack([xs, ys])
+
+    def materialize(self, nodes):
+        """Adds the given forest pixels (flat indices) and their edges to materialized neighbours."""
+        nodes = np.unique(np.asarray(nodes, dtype=np.int64))
+        nodes = nodes[self.forest.ravel()[nodes] & ~self.materialized[nodes]]
+        if nodes.size == 0:
+            return
+        height, width = self.grid_shape
+        life = self.rng.integers(3, 8, size=nodes.size) # Lifeline
+        self.life.update(zip(nodes.tolist(), life.tolist()))
+        self.materialized[nodes] = True
+        self.g.add_nodes_from(
+            (n, {'threshold_switch': self.threshold, 'color': 'green', 'num_of_active_neighbors': 0,
+                 'fire_state': 'not_burnt', 'life': lf, 'pos': (x, y)})
+            for n, lf, (x, y) in zip(nodes.tolist(), life.tolist(), self.positions(nodes).tolist())
+        )
+
+        # Edges to every materialized 8-neighbour; pairs of new nodes only once
+        rows, cols = np.divmod(nodes, width)
+        us, vs = [], []
+        for dr in (-1, 0, 1):
+            for dc in (-1, 0, 1):
+                if not (dr or dc):
+                    continue
+                nr, nc = rows + dr, cols + dc
+                ok = (nr >= 0) & (nr < height) & (nc >= 0) & (nc < width)
+                nb = nr * width + nc
+                ok[ok] = self.materialized[nb[ok]]
+                ok &= ~np.isin(nb, nodes) | (nb > nodes)
+                us.append(np.minimum(nodes[ok], nb[ok]))
+                vs.append(np.maximum(nodes[ok], nb[ok]))
+        u, v = np.concatenate(us), np.concatenate(vs)
+        if u.size == 0:
+            extend_fire_front(self.g, nodes.tolist(), [])
+            return
+        p1, p2 = self.positions(u), self.positions(v)
+        angles, weights = base_edge_weights(p1, p2, self.dist_scale, self.rng)
+        strength = np.zeros(u.size, dtype=int)
+        distances = np.hypot(p2[:, 0] - p1[:, 0], p2[:, 1] - p1[:, 1]) * self.dist_scale
+        for ellipse, max_speed, epsilon in self.winds:
+            inside = in_wind_ellipse(p1, ellipse) & in_wind_ellipse(p2, ellipse)
+            angles[inside] = wind_angles(p1[inside], p2[inside], ellipse)
+            weights[inside] = edge_weights(max_speed, epsilon, 1, angles[inside], distances[inside], self.rng)
+            strength[inside] = 1
+
+        pairs = list(zip(u.tolist(), v.tolist()))
+        burnt = lambda n: self.g.nodes[n]['fire_state'] == 'burnt'
+        self.g.add_edges_from(
+            (n1, n2, {'w': w, 'color': 'brown' if burnt(n1) or burnt(n2) else 'green',
+                      'life': (self.life[n1] + self.life[n2]) // 2,
+                      'edge_strength': es, 'wind_speed': 0.01, 'wind_dir': angle, 'eb': 0})
+            for (n1, n2), w, es, angle in zip(pairs, weights.tolist(), strength.tolist(), angles.tolist())
+        )
+        self.edge_u.append(u)
+        self.edge_v.append(v)
+        self.edge_list.extend(pairs)
+        extend_fire_front(self.g, nodes.tolist(), pairs)
+
+    def grow(self):
+        """Materializes the forest within `margin` cells of every burning node."""
+        burning = np.array(sorted(fire_front(self.g)['burning']), dtype=np.int64)
+        if burning.size == 0:
+            return
+        height, width = self.grid_shape
+        rows, cols = np.divmod(burning, width)
+        dr, dc = np.meshgrid(np.arange(-self.margin, self.margin + 1), np.arange(-self.margin, self.margin + 1))
+        nr = (rows[:, None] + dr.ravel()).ravel()
+        nc = (cols[:, None] + dc.ravel()).ravel()
+        ok = (nr >= 0) & (nr < height) & (nc >= 0) & (nc < width)
+        self.materialize(nr[ok] * width + nc[ok])
+
+    def simulate_wind(self, max_speed, epsilon):
+        """simulate_wind() over the whole forest: reweights the materialized edges and is replayed on later ones."""
+        center_pos = tuple(self.positions(np.array([random_pixel(self.forest.ravel())]))[0])
+        ellipse = wind_ellipse(center_pos, self.g.graph['grid_size'])
+        self.winds.append((ellipse, max_speed, epsilon))
+        if self.edge_u:
+            self.edge_u, self.edge_v = [np.concatenate(self.edge_u)], [np.concatenate(self.edge_v)]
+            u, v = self.edge_u[0], self.edge_v[0]
+            p1, p2 = self.positions(u), self.positions(v)
+            inside = np.flatnonzero(in_wind_ellipse(p1, ellipse) & in_wind_ellipse(p2, ellipse))
+            p1, p2 = p1[inside], p2[inside]
+            angles = wind_angles(p1, p2, ellipse)
+            distances = np.hypot(p2[:, 0] - p1[:, 0], p2[:, 1] - p1[:, 1]) * self.dist_scale
+            weights = edge_weights(max_speed, epsilon, 1, angles, distances, self.rng)
+            for e, angle, w_e in zip(inside.tolist(), angles.tolist(), weights.tolist()):
+                n1, n2 = int(u[e]), int(v[e])
+                set_edge_weight(self.g, n1, n2, w_e)
+                edge = self.g[n1][n2]
+                edge['wind_dir'] = angle
+                edge['edge_strength'] = 1
+        return (center_pos, ellipse[4], ellipse[5])
+
+    def snapshot(self):
+        """Raster of STATE_TO_INT values: unmaterialized forest is not_burnt."""
+        img_data = self.forest.astype(int) * STATE_TO_INT['not_burnt']
+        width = self.grid_shape[1]
+        for node_id, data in self.g.nodes(data=True):
+            img_data[divmod(node_id, width)] = STATE_TO_INT.get(data['fire_state'], 0)
+        return img_data
+
 def draw_forest_snapshot(g, grid_height, grid_width, timestep, output_dir):
     """
     Renders the current state of the graph as a raster image.
-    Node IDs (r, c) are used as pixel coordinates.
+    Node IDs (row * width + col) give the pixel coordinates.
     """
     img_data = np.zeros((grid_height, grid_width), dtype=int)
     
     # Map node states to integer values for the image
     for node_id, data in g.nodes(data=True):
-        r, c = node_id # Node ID is the (row, col) tuple
+        r, c = divmod(node_id, grid_width)
         state_int = STATE_TO_INT.get(data['fire_state'], 0)
         
         if 0 <= r < grid_height and 0 <= c < grid_width:
             img_data[r, c] = state_int
         else:
             logger.warning(f"Node {node_id} is out-of-bounds. Skipping.")
+    save_snapshot(img_data, timestep, output_dir)
 
+def save_snapshot(img_data, timestep, output_dir):
+    """Saves a raster of STATE_TO_INT values as the frame for `timestep`."""
     plt.figure(figsize=(10, 10))
     # 'origin=upper' matches raster (row 0 is at the top)
     plt.imshow(img_data, cmap=CUSTOM_CMAP, interpolation='nearest', origin='upper', vmin=0, vmax=len(STATE_TO_INT) - 1)
@@ -273,10 +665,14 @@ def draw_forest_snapshot(g, grid_height, grid_width, timestep, output_dir):
     plt.savefig(filepath, bbox_inches='tight', pad_inches=0, dpi=150)
     plt.close()
 
-def run_wildfire_simulation(geotiff_path, output_dir, timesteps, threshold, ignition_point):
+def run_wildfire_simulation(geotiff_path, output_dir, timesteps, threshold, ignition_point, engine=DEFAULT_ENGINE):
     """
     Main function to load GeoTIFF, build graph, and run simulation.
+    `engine` is "networkx" (incinerate() on a networkx graph), "sparse"
+    (SparseFireGraph) or "lazy" (incinerate() on a LazyRasterGraph).
     """
+    if engine not in ENGINES:
+        return {"success": False, "error": f"Unknown engine '{engine}' (expected one of {', '.join(ENGINES)})"}
     logger.info(f"Starting simulation from GeoTIFF: {geotiff_path}")
     
     # --- 1. Load GeoTIFF and build graph ---
@@ -291,93 +687,65 @@ def run_wildfire_simulation(geotiff_path, output_dir, timesteps, threshold, igni
         return {"success": False, "error": f"Could not load GeoTIFF at {geotiff_path}"}
 
     dist_scale = 30
-    g = nx.Graph()
-    pos_dict = {}
-    
-    logger.info("Building graph from raster...")
-    for r in range(grid_height):
-        for c in range(grid_width):
-            node_id = (r, c) # Node ID is its (row, col)
-            x, y = transform * (c + 0.5, r + 0.5) # center of pixel
-            pos = (x, y)
-            pos_dict[node_id] = pos
-            lf = rnd.randint(3, 7) # Lifeline
-            
-            # Check if pixel is forest
-            if forest_data[r, c] == FOREST_PIXEL_VALUE:
-                g.add_node(
-                    node_id, 
-                    threshold_switch=threshold, # Use the uniform threshold
-                    color='green', 
-                    num_of_active_neighbors=0,
-                    fire_state='not_burnt', 
-                    life=lf, 
-                    pos=pos
-                )
-            else: # Not a forest pixel
-                g.add_node(
-                    node_id, 
-                    threshold_switch=999.0, # High threshold for non-burnable
-                    color='black', 
-                    num_of_active_neighbors=0,
-                    fire_state='empty', 
-                    life=lf, 
-                    pos=pos
-                )
-
-    # --- 2. Build graph edges (8-neighbor grid) ---
-    logger.info("Building grid edges...")
-    edge_list = []
-    for r in range(grid_height):
-        for c in range(grid_width):
-            node_id = (r, c)
-            if g.nodes[node_id]['fire_state'] == 'empty':
-                continue
-            
-            for dr in [-1, 0, 1]:
-                for dc in [-1, 0, 1]:
-                    if dr == 0 and dc == 0: continue
-                    nr, nc = r + dr, c + dc
-                    neighbor_id = (nr, nc)
-                    
-                    if 0 <= nr < grid_height and 0 <= nc < grid_width and \
-                       g.nodes[neighbor_id]['fire_state'] != 'empty' and \
-                       not g.has_edge(node_id, neighbor_id):
-                        
-                        edge_list.append((node_id, neighbor_id))
-
-    logger.info(f"Adding {len(edge_list)} edges...")
-    for n1, n2 in edge_list:
-        p1, p2 = g.nodes[n1]['pos'], g.nodes[n2]['pos']
-        angle = get_angle(p1, p2)
-        pp = edge_weight(MAX_WIND_SPEED, 0.1, 0, angle, dist(p1, p2, dist_scale)) * PP_FACTOR
-        lf = np.floor((g.nodes[n1]['life'] + g.nodes[n2]['life']) / 2)
-        g.add_edge(n1, n2, w=pp, color='green', life=int(lf), edge_strength=0, wind_speed=0.01, wind_dir=angle, eb=0)
+    logger.info(f"Building {engine} graph from raster...")
+    if engine == "sparse":
+        g = SparseFireGraph(raster_graph_arrays(forest_data, transform, dist_scale),
+                            (grid_height, grid_width), transform, threshold, dist_scale)
+        logger.info(f"Built {g.n} forest nodes and {g.src.size} edges.")
+        non_burnt_nodes = g.ids.tolist()
+    elif engine == "lazy":
+        lazy = LazyRasterGraph(forest_data, transform, threshold, dist_scale)
+        g, edge_list = lazy.g, lazy.edge_list
+        logger.info(f"Nodes are built within {lazy.margin} cells of the fire.")
+        # Ignition is drawn from the forest mask instead of a node list
+        non_burnt_nodes = lazy.forest.ravel() if lazy.forest.any() else []
+    else:
+        g, edge_list = build_raster_graph(forest_data, transform, threshold, dist_scale)
+        logger.info(f"Built {g.number_of_nodes()} forest nodes and {len(edge_list)} edges.")
+        non_burnt_nodes = [n for n in g.nodes if g.nodes[n]['fire_state'] == 'not_burnt']
 
     # --- 3. Set Ignition Point ---
-    non_burnt_nodes = [n for n in g.nodes if g.nodes[n]['fire_state'] == 'not_burnt']
-    if not non_burnt_nodes:
+    if len(non_burnt_nodes) == 0:
         logger.warning("No nodes available to ignite. Forest is empty.")
         return {"success": False, "error": "No nodes available to ignite"}
 
+    def random_ignition():
+        return random_pixel(non_burnt_nodes) if engine == "lazy" else rnd.choice(non_burnt_nodes)
+
     ignition_node = None
     if ignition_point == "random":
-        ignition_node = rnd.choice(non_burnt_nodes)
+        ignition_node = random_ignition()
     else:
         try:
             # Try to parse as "row,col"
             r, c = map(int, ignition_point.split(','))
-            ignition_node = (r, c)
-            if not g.has_node(ignition_node) or g.nodes[ignition_node]['fire_state'] != 'not_burnt':
+            ignition_node = r * grid_width + c if 0 <= c < grid_width else None
+            if engine == "sparse":
+                valid = 0 <= r < grid_height and g.node_index[r, c] >= 0
+            elif engine == "lazy":
+                valid = 0 <= r < grid_height and lazy.forest[r, c]
+            else:
+                valid = g.has_node(ignition_node) and g.nodes[ignition_node]['fire_state'] == 'not_burnt'
+            if not valid:
                  logger.warning(f"Ignition point {ignition_node} is invalid or not in forest. Reverting to random.")
-                 ignition_node = rnd.choice(non_burnt_nodes)
+                 ignition_node = random_ignition()
         except:
              logger.warning(f"Could not parse ignition point '{ignition_point}'. Reverting to random.")
-             ignition_node = rnd.choice(non_burnt_nodes)
+             ignition_node = random_ignition()
     
-    g.nodes[ignition_node]['fire_state'] = 'burning'
-    g.nodes[ignition_node]['color'] = 'orange'
-    logger.info(f"Ignition set at node {ignition_node} (pos {g.nodes[ignition_node]['pos']})")
+    if engine == "lazy":
+        lazy.materialize([ignition_node])
+    if engine != "sparse":
+        g.graph['ember_index'].discard(ignition_node)
+    if engine == "sparse":
+        node = g.node_index[divmod(ignition_node, grid_width)]
+        g.ignite(node)
+        ignition_pos = tuple(g.pos[node])
+    else:
+        g.nodes[ignition_node]['fire_state'] = 'burning'
+        g.nodes[ignition_node]['color'] = 'orange'
+        ignition_pos = g.nodes[ignition_node]['pos']
+    logger.info(f"Ignition set at node {ignition_node} (pos {ignition_pos})")
 
     # --- 4. Setup Unique Output Directory ---
     run_output_dir = os.path.join(output_dir, f"wildfire_run_{int(time.time())}")
@@ -390,9 +758,15 @@ def run_wildfire_simulation(geotiff_path, output_dir, timesteps, threshold, igni
         final_timestep = i
         
         # Draw the state *before* this step's incineration
-        draw_forest_snapshot(g, grid_height, grid_width, i, run_output_dir)
-        
-        current_burning_forests = count_burning(g)
+        if engine == "sparse":
+            save_snapshot(g.snapshot(), i, run_output_dir)
+            current_burning_forests = g.count('burning')
+        elif engine == "lazy":
+            save_snapshot(lazy.snapshot(), i, run_output_dir)
+            current_burning_forests = len(fire_front(g)['burning'])
+        else:
+            draw_forest_snapshot(g, grid_height, grid_width, i, run_output_dir)
+            current_burning_forests = len(fire_front(g)['burning'])
         if current_burning_forests == 0 and i > 0:
             logger.info(f"Fire simulation stopped at timestep {i}: no more burning nodes.")
             break
@@ -400,21 +774,35 @@ def run_wildfire_simulation(geotiff_path, output_dir, timesteps, threshold, igni
         if i == timesteps:
              logger.info(f"Simulation reached max timesteps ({timesteps}).")
 
-        # Run fire spread logic
-        g = incinerate(g, edge_list, grid_width, grid_height)
+        # Run fire spread logic, then wind
+        if engine == "sparse":
+            g.step()
+            if i > 0:
+                g.simulate_wind(MAX_WIND_SPEED, 0.1)
+            continue
+
+        if engine == "lazy":
+            lazy.grow()
+            g = incinerate(g, edge_list, grid_width, grid_height)
+            if i > 0:
+                lazy.simulate_wind(MAX_WIND_SPEED, 0.1)
+            continue
 
-        # Run wind logic
+        g = incinerate(g, edge_list, grid_width, grid_height)
         if i > 0:
             simulate_wind(g, edge_list, MAX_WIND_SPEED, 0.1, dist_scale)
 
     logger.info(f"Simulation complete. Final timestep: {final_timestep}")
+    if engine == "lazy":
+        logger.info(f"Materialized {g.number_of_nodes()} of {int(lazy.forest.sum())} forest nodes.")
 
     return {
         "success": True,
         "message": f"Simulation complete. {final_timestep+1} frames saved.",
         "output_dir": run_output_dir,
         "grid_size": (grid_width, grid_height),
-        "final_timestep": final_timestep
+        "final_timestep": final_timestep,
+        "engine": engine
     }
 
 # =========================================================================
@@ -462,6 +850,15 @@ if __name__ == "__main__":
         help=f"Ignition point. 'random' or 'row,col' (e.g., '150,120'). (Default: {DEFAULT_IGNITION})"
     )
     
+    parser.add_argument(
+        '--engine',
+        dest='engine',
+        choices=ENGINES,
+        default=DEFAULT_ENGINE,
+        help=f"Step implementation: 'networkx', 'sparse' (scipy.sparse CSR matrix) or 'lazy' "
+             f"(networkx graph built only around the fire). (Default: {DEFAULT_ENGINE})"
+    )
+    
     args = parser.parse_args()
 
     # --- Setup Logging ---
@@ -481,7 +878,8 @@ if __name__ == "__main__":
         output_dir=args.output_dir,
         timesteps=args.timesteps,
         threshold=args.threshold,
-        ignition_point=args.ignition_point
+        ignition_point=args.ignition_point,
+        engine=args.engine
     )
     end_time = time.time()
 
@@ -296,20 +296,6 @@ def draw_graph(g, ns, node_colors, edge_colors, pos_dict, fs, filepath=None, ori
 
     plt.close()
 
-def save_graph(g, node_fn, edge_fn):
-    """Saves the graph node and edge attributes to CSV files."""
-    node_df = pd.DataFrame.from_dict(dict(g.nodes(data=True)), orient='index')
-    node_df['node'] = node_df.index
-    node_df.to_csv(node_fn, index=False)
-
-    edge_list_data = []
-    for u, v, data in g.edges(data=True):
-        edge_data = data.copy()
-        edge_data['edge'] = f"{u},{v}"
-        edge_list_data.append(edge_data)
-    edge_df = pd.DataFrame(edge_list_data)
-    edge_df.to_csv(edge_fn, index=False)
-
 # =========================================================================
 # Main Execution Block
 # =========================================================================
@@ -4,9 +4,11 @@ routes.py
 Defines and registers all API blueprints for the application.
 """
 
-from flask import Blueprint, request, jsonify, send_from_directory, abort
+from flask import Blueprint, request, jsonify, send_from_directory, abort, Response
+from werkzeug.exceptions import HTTPException
 import logging
 import traceback
+import mimetypes
 import os
 
 from config import (
@@ -15,7 +17,13 @@ from config import (
     GEOTIFF_DIR,
     WILDFIRE_OUTPUT_BASE
 )
-from wildfire_sim.sca import run_geotiff_simulation
+from wildfire_sim.sca import run_geotiff_simulation, fork_geotiff_simulation, SIMULATION_GRIDS, OUTPUT_PROFILES
+from wildfire_sim.run_store import MEMORY_RUN_PREFIX, open_run
+from wildfire_sim.checkpoints import resolve_run_file
+from wildfire_sim.ensemble import run_ensemble, PROBABILITY_FILENAME
+from wildfire_sim.surrogate import preview_burn_probability, SurrogateModelError
+from wildfire_sim.raster_index import raster_index, warm_up as warm_up_raster_index
+from wildfire_sim.animate import ANIMATION_FORMATS, get_animation, animation_mimetype
 
 logger = logging.getLogger(__name__)
 
@@ -43,6 +51,8 @@ def serve_geotiff(filename):
         logger.info(f"Serving GeoTIFF file: {full_path}")
         return send_from_directory(GEOTIFF_DIR, filename)
 
+    except HTTPException:
+        raise    # abort(404) above
     except Exception as e:
         logger.error(f"Failed to serve GeoTIFF {filename}: {e}")
         return jsonify({
@@ -50,22 +60,57 @@ def serve_geotiff(filename):
             "message": str(e)
         }), 500
         
+def _public_output_path(sim_result):
+    """Turns a simulation result into the 'wildfire_output/<run>' path served below."""
+    output_dir_absolute = sim_result["output_dir"]
+    wildfire_root = os.path.join(BASE_DIR, "wildfire_output")
+
+    if sim_result["ephemeral"]:
+        # In-memory runs are served by the same route, keyed by run name
+        return f"wildfire_output/{sim_result['run_name']}"
+    if output_dir_absolute.startswith(wildfire_root):
+        relative_part = os.path.relpath(output_dir_absolute, wildfire_root)
+        return f"wildfire_output/{relative_part}".replace(os.path.sep, "/")
+    # Fallback in rare case output is outside expected dir
+    return f"wildfire_output/{os.path.basename(output_dir_absolute)}"
+
 @api_bp.route('/simulate_wildfire', methods=['GET'])
 def simulate_wildfire():
     """
     Run wildfire simulation based on a local GeoTIFF file.
-    Expects query parameters: countyKey, igniPointLat, igniPointLon
+    Expects query parameters: igniPointLat, igniPointLon
+    Optional: countyKey (resolved from the coordinate via the raster index when omitted),
+              grid ("source" or "webmercator", defaults to config SIMULATION_GRID),
+              profile (frame encoding, defaults to config OUTPUT_PROFILE),
+              ephemeral ("true" keeps the run in memory, defaults to config EPHEMERAL_RUNS),
+              snapRadius (pixels to search for the nearest forest pixel,
+                          defaults to config IGNITION_SNAP_RADIUS_PX; 0 disables),
+              terrain ("false" ignores the county DEM, defaults to config TERRAIN_SPREAD),
+              mosaic ("false" keeps the fire inside the county raster, defaults to config MOSAIC_NEIGHBOURS),
+              engine ("sca" (default) runs the simulation; "preview" returns the
+                      surrogate's burn-probability raster and its calibration metrics)
     """
     try:
         # 1. Get arguments from the request
         county_key = request.args.get('countyKey')
         igni_lat_str = request.args.get('igniPointLat')
         igni_lon_str = request.args.get('igniPointLon')
+        grid = request.args.get('grid')
+        output_profile = request.args.get('profile')
+        ephemeral_str = request.args.get('ephemeral')
+        ephemeral = None if ephemeral_str is None else ephemeral_str.lower() in ('1', 'true', 'yes')
+        snap_radius_str = request.args.get('snapRadius')
+        terrain_str = request.args.get('terrain')
+        terrain = None if terrain_str is None else terrain_str.lower() in ('1', 'true', 'yes')
+        mosaic_str = request.args.get('mosaic')
+        mosaic = None if mosaic_str is None else mosaic_str.lower() in ('1', 'true', 'yes')
+        engine = request.args.get('engine', 'sca').lower()
+        if engine not in ('sca', 'preview'):
+            return jsonify({'success': False, 'error': 'Invalid parameter format', 'message': 'engine must be "sca" or "preview".'}), 400
 
         # 2. Validate arguments
-        if not all([county_key, igni_lat_str, igni_lon_str]):
+        if not all([igni_lat_str, igni_lon_str]):
             missing_params = []
-            if not county_key: missing_params.append('countyKey')
             if not igni_lat_str: missing_params.append('igniPointLat')
             if not igni_lon_str: missing_params.append('igniPointLon')
             return jsonify({'success': False, 'error': 'Missing query parameters', 'message': f'Missing required query parameters: {", ".join(missing_params)}'}), 400
@@ -76,37 +121,80 @@ def simulate_wildfire():
         except ValueError:
             return jsonify({'success': False, 'error': 'Invalid parameter format', 'message': 'igniPointLat and igniPointLon must be valid numbers.'}), 400
 
+        try:
+            snap_radius_px = None if snap_radius_str is None else float(snap_radius_str)
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Invalid parameter format', 'message': 'snapRadius must be a valid number.'}), 400
+
+        if grid is not None and grid not in SIMULATION_GRIDS:
+            return jsonify({'success': False, 'error': 'Invalid parameter format', 'message': f'grid must be one of: {", ".join(SIMULATION_GRIDS)}.'}), 400
+        if output_profile is not None and output_profile not in OUTPUT_PROFILES:
+            return jsonify({'success': False, 'error': 'Invalid parameter format', 'message': f'profile must be one of: {", ".join(OUTPUT_PROFILES)}.'}), 400
+
+        if not county_key:
+            # Bare coordinate: find the county raster that covers it
+            hits = raster_index.resolve(igni_lat, igni_lon)
+            if not hits:
+                return jsonify({'success': False, 'error': 'No covering raster', 'message': f'No county raster covers ({igni_lat}, {igni_lon}).'}), 404
+            county_key = hits[0]['county_key']
+            logger.info(f"Resolved ({igni_lat}, {igni_lon}) to county raster {county_key}")
+
+        if engine == 'preview':
+            # Surrogate prediction instead of a stochastic run
+            preview = preview_burn_probability(
+                county_key, igni_lat, igni_lon,
+                grid=grid, snap_radius_px=snap_radius_px, ephemeral=ephemeral
+            )
+            response = {key: value for key, value in preview.items() if key != 'run_name'}
+            response.update(
+                success=True,
+                message=f"Surrogate preview for {county_key} complete.",
+                countyKey=county_key,
+                engine='preview',
+                output_dir=_public_output_path(preview),
+                probability_file=PROBABILITY_FILENAME,
+            )
+            return jsonify(response)
+
         # 3. Run the simulation (defined in sca_geotiff.py)
         logger.info(f"Running GeoTIFF simulation for {county_key} at ({igni_lat}, {igni_lon})")
         
-        # This function will return an absolute path to the output directory
+        # This function will return the absolute output directory and per-step stats
         # Run sim function here
-        output_dir_absolute = run_geotiff_simulation(county_key, igni_lat, igni_lon)
+        sim_result = run_geotiff_simulation(
+            county_key, igni_lat, igni_lon,
+            grid=grid, output_profile=output_profile, ephemeral=ephemeral,
+            snap_radius_px=snap_radius_px, terrain=terrain, mosaic=mosaic
+        )
 
         # 4. Format the output path
-        wildfire_root = os.path.join(BASE_DIR, "wildfire_output")
-
-        if output_dir_absolute.startswith(wildfire_root):
-            relative_part = os.path.relpath(output_dir_absolute, wildfire_root)
-            final_output_path = f"wildfire_output/{relative_part}".replace(os.path.sep, "/")
-        else:
-            # Fallback in rare case output is outside expected dir
-            final_output_path = f"wildfire_output/{os.path.basename(output_dir_absolute)}"
+        final_output_path = _public_output_path(sim_result)
 
         # 5. Return success response
         return jsonify({
             "success": True,
             "message": f"Simulation for {county_key} complete.",
-            "output_dir": final_output_path
+            "countyKey": county_key,
+            "output_dir": final_output_path,
+            "ephemeral": sim_result["ephemeral"],
+            "final_timestep": sim_result["final_timestep"],
+            "crs": sim_result["crs"],
+            "terrain": sim_result["terrain"],
+            "mosaic": sim_result["mosaic"],
+            "ignition": sim_result["ignition"],
+            "stats": sim_result["stats"]
         })
 
     # --- Error Handling (matching incinerate.py) ---
     except FileNotFoundError as e:
         logger.error(f"GeoTIFF simulation failed: File not found. {e}", exc_info=True)
         return jsonify({'success': False, 'error': 'File not found', 'message': str(e)}), 404
+    except SurrogateModelError as e:
+        logger.error(f"Surrogate preview failed: {e}")
+        return jsonify({'success': False, 'error': 'Server configuration error', 'message': str(e)}), 500
     except (IndexError, ValueError) as e:
         # IndexError: Coords are outside raster bounds
-        # ValueError: Coords are not on a FOREST pixel
+        # ValueError: No FOREST pixel within the snap radius
         logger.error(f"GeoTIFF simulation failed: Invalid ignition point. {e}", exc_info=True)
         return jsonify({'success': False, 'error': 'Invalid ignition point', 'message': str(e)}), 400
     except ImportError as e:
@@ -125,15 +213,242 @@ def simulate_wildfire():
             'traceback': traceback.format_exc()
         }), 500
 
+@api_bp.route('/resolve_points', methods=['POST'])
+def resolve_points():
+    """
+    Resolve many coordinates to the county rasters covering them in one call.
+    Expects a JSON body {"points": [[lat, lon], ...]} or {"lats": [...], "lons": [...]}.
+    Returns, in input order, {"countyKey", "row", "col"} of the first covering
+    raster (or null), all covering rasters per point, and point counts per county.
+    """
+    body = request.get_json(silent=True) or {}
+    try:
+        if 'points' in body:
+            points = body['points']
+            lats = [float(p[0]) for p in points]
+            lons = [float(p[1]) for p in points]
+        else:
+            lats = [float(v) for v in body.get('lats', [])]
+            lons = [float(v) for v in body.get('lons', [])]
+    except (TypeError, ValueError, IndexError):
+        return jsonify({'success': False, 'error': 'Invalid parameter format', 'message': 'points must be [lat, lon] number pairs.'}), 400
+    if len(lats) != len(lons):
+        return jsonify({'success': False, 'error': 'Invalid parameter format', 'message': 'lats and lons must have the same length.'}), 400
+
+    try:
+        hits = raster_index.resolve_many(lats, lons)
+    except Exception as e:
+        logger.error("Point resolution failed", exc_info=True)
+        return jsonify({'success': False, 'error': 'Internal server error while resolving points', 'message': str(e)}), 500
+
+    counts = {}
+    for point_hits in hits:
+        if point_hits:
+            counts[point_hits[0]['county_key']] = counts.get(point_hits[0]['county_key'], 0) + 1
+    return jsonify({
+        "success": True,
+        "results": [
+            {"countyKey": h[0]['county_key'], "row": h[0]['row'], "col": h[0]['col']} if h else None
+            for h in hits
+        ],
+        "covering": [[{"countyKey": x['county_key'], "row": x['row'], "col": x['col']} for x in h] for h in hits],
+        "counts": counts,
+        "unresolved": sum(1 for h in hits if not h)
+    })
+
+@api_bp.route('/simulate_ensemble', methods=['GET'])
+def simulate_ensemble():
+    """
+    Run an adaptive Monte Carlo ensemble and save a burn-probability raster.
+    Expects query parameters: countyKey, igniPointLat, igniPointLon
+    Optional: tolerance (max per-pixel 95% CI half-width, defaults to config ENSEMBLE_PIXEL_TOLERANCE),
+              areaTolerance (relative SE of mean burnt area, defaults to ENSEMBLE_AREA_TOLERANCE),
+              timeBudget (seconds, defaults to ENSEMBLE_TIME_BUDGET_S),
+              maxMembers, seed, and grid / ephemeral / snapRadius / terrain as for /simulate_wildfire
+    The response reports why the ensemble stopped and the error it achieved.
+    """
+    try:
+        county_key = request.args.get('countyKey')
+        igni_lat_str = request.args.get('igniPointLat')
+        igni_lon_str = request.args.get('igniPointLon')
+        if not all([county_key, igni_lat_str, igni_lon_str]):
+            return jsonify({'success': False, 'error': 'Missing query parameters', 'message': 'countyKey, igniPointLat and igniPointLon are required.'}), 400
+
+        ephemeral_str = request.args.get('ephemeral')
+        terrain_str = request.args.get('terrain')
+        try:
+            numbers = {
+                name: (None if request.args.get(arg) is None else cast(request.args.get(arg)))
+                for name, arg, cast in (
+                    ('igni_lat', 'igniPointLat', float),
+                    ('igni_lon', 'igniPointLon', float),
+                    ('pixel_tolerance', 'tolerance', float),
+                    ('area_tolerance', 'areaTolerance', float),
+                    ('time_budget_s', 'timeBudget', float),
+                    ('max_members', 'maxMembers', int),
+                    ('seed', 'seed', int),
+                    ('snap_radius_px', 'snapRadius', float),
+                )
+            }
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Invalid parameter format', 'message': 'Numeric parameters must be valid numbers.'}), 400
+
+        logger.info(f"Running ensemble for {county_key} at ({numbers['igni_lat']}, {numbers['igni_lon']})")
+        result = run_ensemble(
+            county_key,
+            grid=request.args.get('grid'),
+            ephemeral=None if ephemeral_str is None else ephemeral_str.lower() in ('1', 'true', 'yes'),
+            terrain=None if terrain_str is None else terrain_str.lower() in ('1', 'true', 'yes'),
+            **numbers
+        )
+
+        response = {key: value for key, value in result.items() if key not in ('input_file', 'run_name')}
+        response.update(
+            success=True,
+            message=f"Ensemble for {county_key} stopped ({result['stop_reason']}) after {result['members']} members.",
+            output_dir=_public_output_path(result),
+            probability_file=PROBABILITY_FILENAME,
+        )
+        return jsonify(response)
+
+    except FileNotFoundError as e:
+        logger.error(f"Ensemble failed: File not found. {e}", exc_info=True)
+        return jsonify({'success': False, 'error': 'File not found', 'message': str(e)}), 404
+    except (IndexError, ValueError) as e:
+        logger.error(f"Ensemble failed: Invalid request. {e}", exc_info=True)
+        return jsonify({'success': False, 'error': 'Invalid ensemble request', 'message': str(e)}), 400
+    except Exception as e:
+        logger.error("Ensemble failed", exc_info=True)
+        return jsonify({
+            'success': False,
+            'error': 'Internal server error during ensemble',
+            'message': str(e),
+            'traceback': traceback.format_exc()
+        }), 500
+
+@api_bp.route('/fork_simulation', methods=['POST'])
+def fork_simulation():
+    """
+    Re-run an existing simulation from one of its timesteps with what-if changes.
+    Expects a JSON body:
+        {
+          "runDir": "wildfire_output/sim_run_...",   (output_dir of the parent run)
+          "step": 8,
+          "modifiers": [
+            {"type": "firebreak", "geometry": {GeoJSON, lon/lat}, "bufferPx": 1},
+            {"type": "suppression", "geometry": {...}},
+            {"type": "ignition", "lat": 45.1, "lon": -87.2}
+          ],
+          "ephemeral": true                          (optional, defaults to the parent's)
+        }
+    Frames before `step` are shared with the parent and served through its path.
+    """
+    try:
+        body = request.get_json(silent=True) or {}
+        run_dir = body.get('runDir')
+        step = body.get('step')
+        modifiers = body.get('modifiers') or []
+        ephemeral = body.get('ephemeral')
+
+        if not run_dir or step is None:
+            return jsonify({'success': False, 'error': 'Missing parameters', 'message': 'runDir and step are required.'}), 400
+        if not isinstance(modifiers, list):
+            return jsonify({'success': False, 'error': 'Invalid parameter format', 'message': 'modifiers must be a list.'}), 400
+        try:
+            step = int(step)
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'error': 'Invalid parameter format', 'message': 'step must be an integer.'}), 400
+
+        logger.info(f"Forking {run_dir} at t={step} with {len(modifiers)} modifier(s)")
+        sim_result = fork_geotiff_simulation(run_dir, step, modifiers, ephemeral=ephemeral)
+
+        return jsonify({
+            "success": True,
+            "message": f"Fork of {sim_result['parent']} at t={step} complete.",
+            "output_dir": _public_output_path(sim_result),
+            "parent": sim_result["parent"],
+            "fork_step": sim_result["fork_step"],
+            "ephemeral": sim_result["ephemeral"],
+            "final_timestep": sim_result["final_timestep"],
+            "crs": sim_result["crs"],
+            "ignition": sim_result["ignition"],
+            "stats": sim_result["stats"]
+        })
+
+    except FileNotFoundError as e:
+        logger.error(f"Fork failed: Run not found. {e}", exc_info=True)
+        return jsonify({'success': False, 'error': 'Run not found', 'message': str(e)}), 404
+    except ValueError as e:
+        logger.error(f"Fork failed: Invalid request. {e}", exc_info=True)
+        return jsonify({'success': False, 'error': 'Invalid fork request', 'message': str(e)}), 400
+    except Exception as e:
+        logger.error("Fork failed", exc_info=True)
+        return jsonify({
+            'success': False,
+            'error': 'Internal server error during fork',
+            'message': str(e),
+            'traceback': traceback.format_exc()
+        }), 500
+
+@api_bp.route('/wildfire_animation/<path:run_dir>', methods=['GET'])
+def wildfire_animation(run_dir):
+    """
+    Serves a whole run as one animated image, rendered on first request and
+    cached in the run.
+    Optional query parameter: format ("gif" (default), "apng" or "webp").
+    Example:
+        /api/wildfire_animation/wildfire_output/sim_run_Door_WI_20251121_120635?format=webp
+    """
+    fmt = request.args.get('format', 'gif').lower()
+    if fmt not in ANIMATION_FORMATS:
+        return jsonify({'success': False, 'error': 'Invalid parameter format', 'message': f'format must be one of: {", ".join(ANIMATION_FORMATS)}.'}), 400
+
+    try:
+        run = open_run(run_dir)
+        if run is None:
+            return jsonify({'success': False, 'error': 'Run not found', 'message': f"Run '{run_dir}' does not exist or has expired."}), 404
+
+        payload = get_animation(run, fmt)
+        response = Response(payload, mimetype=animation_mimetype(fmt))
+        # A finished run never changes, so clients may cache the animation
+        response.headers['Cache-Control'] = 'public, max-age=86400'
+        return response
+    except FileNotFoundError as e:
+        logger.error(f"Animation failed: {e}")
+        return jsonify({'success': False, 'error': 'Frames not found', 'message': str(e)}), 404
+    except Exception as e:
+        logger.error("Animation failed", exc_info=True)
+        return jsonify({
+            'success': False,
+            'error': 'Internal server error while rendering animation',
+            'message': str(e)
+        }), 500
+
 # serve raster geotiff files for wildfire simulation
 @api_bp.route('/wildfire_output/<path:subpath>', methods=['GET'])
 def serve_wildfire_output(subpath):
     """
-    Serves simulation output rasters from wildfire_output/<sim_run_*> directories.
+    Serves simulation output rasters from wildfire_output/<sim_run_*> directories,
+    or straight from the in-memory run cache for ephemeral mem_run_* runs.
+    Frames a forked run shares with its parent are served from the parent.
     Example:
         /wildfire_output/sim_run_Door_WI_20251121_120635/wildfire_t_000.tif
     """
     try:
+        if subpath.startswith(MEMORY_RUN_PREFIX):
+            run_name, _, filename = subpath.partition('/')
+            run = open_run(run_name)
+            if run is not None:
+                run = resolve_run_file(run, filename)
+            if run is None:
+                logger.warning(f"Requested in-memory output not found (expired?): {subpath}")
+                return jsonify({
+                    "error": "Wildfire output not found",
+                    "message": f"In-memory run output '{subpath}' does not exist or has expired."
+                }), 404
+            mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            return Response(run.read_bytes(filename), mimetype=mimetype)
+
         # Base directory for all wildfire simulations
         # output_root = os.path.join(BASE_DIR, 'wildfire_output')
 
@@ -146,6 +461,15 @@ def serve_wildfire_output(subpath):
             abort(403)
 
         if not os.path.exists(full_path):
+            # Forked runs reference their parent's early frames
+            run_name, _, filename = subpath.partition('/')
+            run = open_run(run_name)
+            owner = resolve_run_file(run, filename) if run is not None and '/' not in filename else None
+            if owner is not None:
+                if owner.ephemeral:
+                    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+                    return Response(owner.read_bytes(filename), mimetype=mimetype)
+                return send_from_directory(owner.path, filename)
             logger.warning(f"Requested wildfire raster not found: {full_path}")
             abort(404)
 
@@ -154,6 +478,8 @@ def serve_wildfire_output(subpath):
         logger.info(f"Serving wildfire output file: {full_path}")
 
         return send_from_directory(directory, filename)
+    except HTTPException:
+        raise    # abort(403/404) above
     except Exception as e:
         logger.error(f"Error serving wildfire output: {e}")
         return jsonify({
@@ -167,4 +493,10 @@ def register_routes(app):
     """Registers all API blueprints with the Flask app."""
     
     # Register the main API blueprint
-    app.register_blueprint(api_bp, url_prefix=API_PREFIX)
\ No newline at end of file
+    app.register_blueprint(api_bp, url_prefix=API_PREFIX)
+
+    # Index the county raster footprints so bare coordinates resolve immediately
+    try:
+        warm_up_raster_index()
+    except Exception as e:
+        logger.error(f"Raster index build failed: {e}")
\ No newline at end of file
@@ -32,8 +32,95 @@ GEOJSON_DIR = os.path.join(PROJECT_ROOT, "data", "shared", "geojson")
 # Directory to store GEE inputs (e.g., downloaded GeoTIFFs)
 GEOTIFF_DIR = os.path.join(PROJECT_ROOT, "data", "shared", "geotiff")
 
+# Grid the GeoTIFF simulator runs on: "source" (county raster as downloaded)
+# or "webmercator" (EPSG:3857 copy aligned to Leaflet zoom levels, so frames
+# need no reprojection on the server or in the browser)
+SIMULATION_GRID = "source"
+
+# Encoding of simulation frames, a key of wildfire_sim.sca.OUTPUT_PROFILES:
+# "default" (LZW), "fast", "compact", "compact_predictor" or "cog".
+# benchmark_output_profiles.py measures the trade-off on real runs.
+OUTPUT_PROFILE = "default"
+
+# Ignition clicks that miss a forest pixel are moved to the nearest forest
+# pixel within this radius (0 disables snapping and rejects the click)
+IGNITION_SNAP_RADIUS_PX = 15
+# Number of county rasters whose nearest-forest index is kept in memory
+IGNITION_SNAP_CACHE_SIZE = 4
+
+# Save a state checkpoint every N timesteps (0 = only t=0) so runs can be
+# forked for what-if scenarios; forks replay from the nearest checkpoint
+CHECKPOINT_INTERVAL = 5
+
+# Scale the per-cell ignition probability by slope and aspect when the county
+# has a DEM (DEM_<countyKey>.tif in GEOTIFF_DIR); layers are cached per county
+TERRAIN_SPREAD = True
+# Number of county terrain layer sets kept in memory
+TERRAIN_CACHE_SIZE = 4
+
+# Animated run previews (/api/wildfire_animation): per-frame delay and how
+# long the final frame is held before the animation loops, in milliseconds
+ANIMATION_FRAME_MS = 200
+ANIMATION_HOLD_MS = 1500
+
+# ------------------ ENSEMBLES ------------------ #
+# /api/simulate_ensemble adds members in batches until the widest per-pixel
+# 95% CI of the burn probability and the relative standard error of the mean
+# burnt area are both within tolerance, or the time budget / member cap is hit
+ENSEMBLE_BATCH_SIZE = 10
+ENSEMBLE_MIN_MEMBERS = 20
+ENSEMBLE_MAX_MEMBERS = 2000
+ENSEMBLE_PIXEL_TOLERANCE = 0.05
+ENSEMBLE_AREA_TOLERANCE = 0.02
+ENSEMBLE_TIME_BUDGET_S = 30
+
+# Seconds between checks of GEOTIFF_DIR for added / changed rasters by the
+# spatial index that resolves coordinates to county rasters
+RASTER_INDEX_REFRESH_S = 5
+
+# When the crop window around an ignition crosses the county raster's edge,
+# read it from a virtual mosaic of the neighbouring ForestCover_* rasters in
+# GEOTIFF_DIR so fires continue across county lines
+MOSAIC_NEIGHBOURS = True
+
+# Trained surrogate used by /api/simulate_wildfire?engine=preview
+# (train with: python -m wildfire_sim.surrogate)
+SURROGATE_MODEL_PATH = os.path.join(PROJECT_ROOT, "data", "surrogate", "sca_surrogate.npz")
+
+# ------------------ IN-MEMORY RUNS ------------------ #
+# When True, simulations keep their frames in the in-memory run cache
+# (served by /api/wildfire_output/mem_run_*) instead of writing sim_run_* dirs
+EPHEMERAL_RUNS = False
+RUN_CACHE_MAX_BYTES = 256 * 1024 * 1024   # total size of cached runs
+RUN_CACHE_TTL_SECONDS = 15 * 60            # runs expire this long after completion
+RUN_CACHE_MIN_FREE_BYTES = 256 * 1024 * 1024  # evict early if the host has less free memory
+
 # Primary dataset for wildfire simulation (forest cover CSV)
 ROOSEVELT_FOREST_COVER_CSV = os.path.join(PROJECT_ROOT, "covtype.csv")
 
+# ------------------ GRAPH MODEL ------------------ #
+# Engine of the graph model in wildfire_sim.incinerate: "networkx" (attribute
+# dicts), "arrays" (NumPy struct-of-arrays, wildfire_sim.graph_engine) or
+# "events" (continuous-time next-reaction, wildfire_sim.event_engine)
+GRAPH_ENGINE = "networkx"
+
+# Write a graph_checkpoint.npz every N timesteps (0 = never) so a networkx /
+# arrays run can be resumed with run_wildfire_simulation(resume=output_dir)
+GRAPH_CHECKPOINT_INTERVAL = 10
+
+# Node / edge columns (wildfire_sim.graph_export) recorded every timestep into
+# the run's graph_history/, e.g. ("state", "life", "edge_w", "edge_color");
+# empty = no history
+GRAPH_HISTORY_COLUMNS = ()
+
+# Prebuilt graphs (positions, thresholds, forest-shape mask, candidate edges)
+# reused by wildfire_sim.incinerate while covtype.csv, NODES, the density seed
+# and forest_shape are unchanged (wildfire_sim.graph_cache); None disables it.
+# Git-ignored, and kept out of WILDFIRE_OUTPUT_BASE, which the API serves
+GRAPH_CACHE_DIR = os.path.join(PROJECT_ROOT, "data", "graph_cache")
+# Seed of the DENSITY_FACTOR occupancy draw. None draws it per run; with a
+# seed every run shares one occupied grid, which is then cached too
+GRAPH_DENSITY_SEED = None
+
 # Create the output directory if it doesn’t exist
 os.makedirs(WILDFIRE_OUTPUT_BASE, exist_ok=True)
@@ -0,0 +1,155 @@
+"""
+animate.py
+---------------------------------------------
+Renders a finished simulation run into one animated image (GIF, APNG or
+WebP) so viewers and share links fetch a single small file instead of one
+GeoTIFF per timestep.
+
+Each frame's state array is used directly as the pixel indices of a
+palette image built from sca.STATE_COLORMAP (no matplotlib, no RGB
+expansion), and the frames are read once, in order. The result is stored
+in the run as animation.<ext> and reused on later requests.
+
+Usage:
+    python -m wildfire_sim.animate wildfire_output/sim_run_... [--format gif] [--output fire.gif]
+"""
+
+import io
+import os
+import logging
+import argparse
+import numpy as np
+from rasterio.io import MemoryFile
+from PIL import Image
+
+from wildfire_sim.sca import STATE_COLORMAP
+from wildfire_sim.run_store import DirectoryRun, open_run, run_cache
+from wildfire_sim.checkpoints import FRAME_PATTERN, MANIFEST_FILENAME, read_manifest, resolve_run_file
+
+try:
+    from config import ANIMATION_FRAME_MS, ANIMATION_HOLD_MS
+except ImportError:
+    ANIMATION_FRAME_MS = 200
+    ANIMATION_HOLD_MS = 1500
+
+logger = logging.getLogger(__name__)
+
+FRAME_FILENAME = "wildfire_t_{:03d}.tif"
+
+# format -> (file extension, Pillow format, mimetype, extra save options)
+ANIMATION_FORMATS = {
+    "gif": ("gif", "GIF", "image/gif", {"disposal": 1}),
+    "apng": ("png", "PNG", "image/apng", {"disposal": 0, "blend": 0}),
+    "webp": ("webp", "WEBP", "image/webp", {"lossless": True, "method": 4}),
+}
+
+# Flat RGB palette with the simulation states at their own indices
+PALETTE = [channel for state in sorted(STATE_COLORMAP) for channel in STATE_COLORMAP[state][:3]]
+
+
+def animation_filename(fmt):
+    return f"animation.{ANIMATION_FORMATS[fmt][0]}"
+
+
+def animation_mimetype(fmt):
+    return ANIMATION_FORMATS[fmt][2]
+
+
+def _frame_timesteps(run):
+    """Timesteps of the run's frames, including frames a fork shares with its parent."""
+    if run.exists(MANIFEST_FILENAME):
+        return list(range(read_manifest(run)['final_timestep'] + 1))
+    steps = [int(m.group(1)) for m in map(FRAME_PATTERN.match, run.list_files()) if m]
+    return sorted(steps)
+
+
+def _iter_frames(run):
+    """Yield one palette image per timestep, reading each frame once."""
+    for t in _frame_timesteps(run):
+        filename = FRAME_FILENAME.format(t)
+        owner = resolve_run_file(run, filename)
+        if owner is None:
+            raise FileNotFoundError(f"Frame {filename} of run '{run.name}' is missing.")
+        with MemoryFile(owner.read_bytes(filename)) as memfile, memfile.open() as src:
+            data = np.ascontiguousarray(src.read(1), dtype=np.uint8)
+        # State values are the palette indices
+        image = Image.frombytes("P", (data.shape[1], data.shape[0]), data.tobytes())
+        image.putpalette(PALETTE)
+        yield image
+
+
+def render_animation(run, fmt="gif", frame_ms=ANIMATION_FRAME_MS, hold_ms=ANIMATION_HOLD_MS):
+    """
+    Encode every frame of `run` into one animated image.
+
+    Returns:
+        bytes: The encoded animation.
+
+    Raises:
+        ValueError: If `fmt` is not a key of ANIMATION_FORMATS.
+        FileNotFoundError: If the run has no frames.
+    """
+    if fmt not in ANIMATION_FORMATS:
+        raise ValueError(f"Unknown animation format '{fmt}'. Expected one of: {', '.join(ANIMATION_FORMATS)}")
+    _, pil_format, _, options = ANIMATION_FORMATS[fmt]
+
+    frames = _iter_frames(run)
+    first = next(frames, None)
+    if first is None:
+        raise FileNotFoundError(f"Run '{run.name}' has no frames to animate.")
+    rest = list(frames)
+    # Hold the last frame so looping viewers show the final footprint
+    durations = [frame_ms] * len(rest) + [hold_ms]
+    if not rest:
+        durations = [hold_ms]
+
+    buf = io.BytesIO()
+    first.save(
+        buf,
+        format=pil_format,
+        save_all=True,
+        append_images=rest,
+        duration=durations,
+        loop=0,
+        **options,
+    )
+    logger.info(f"  Rendered {len(rest) + 1}-frame {fmt} for {run.name} ({buf.tell() / 1024:.1f} KiB)")
+    return buf.getvalue()
+
+
+def get_animation(run, fmt="gif"):
+    """Return the run's cached animation in `fmt`, rendering and storing it on first use."""
+    filename = animation_filename(fmt) if fmt in ANIMATION_FORMATS else None
+    if filename and run.exists(filename):
+        return run.read_bytes(filename)
+
+    payload = render_animation(run, fmt)
+    run.write_bytes(filename, payload)
+    if run.ephemeral:
+        # Re-store so the run cache accounts for the added bytes
+        run_cache.put(run)
+    return payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a wildfire simulation run as an animated GIF / APNG / WebP.")
+    parser.add_argument('run', help="Run directory (e.g. 'wildfire_output/sim_run_...') or run name.")
+    parser.add_argument('--format', '-f', default="gif", choices=list(ANIMATION_FORMATS), help="Animation format. (Default: gif)")
+    parser.add_argument('--output', '-o', default=None, help="Also copy the animation to this path.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    run = DirectoryRun(args.run, create=False) if os.path.isdir(args.run) else open_run(args.run)
+    if run is None:
+        parser.error(f"Run '{args.run}' not found.")
+
+    payload = get_animation(run, args.format)
+    if args.output:
+        with open(args.output, 'wb') as f:
+            f.write(payload)
+    logger.info(f"Ready: {args.output or os.path.join(run.path, animation_filename(args.format))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+checkpoints.py
+---------------------------------------------
+Run manifests and compact state checkpoints for GeoTIFF simulations.
+
+Each run stores a run.json manifest (inputs, seed, crop window, checkpoint
+steps, parent run) and periodic checkpoint_t_NNN.npz files. A checkpoint
+holds the step number, the generator state and only the cells whose state
+differs from the input raster, so it stays small however large the county.
+
+Forked runs reference their parent's frames instead of copying them; use
+resolve_run_file() to find which run actually holds a given frame.
+"""
+
+import io
+import re
+import json
+import logging
+import numpy as np
+
+from wildfire_sim.run_store import open_run
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "run.json"
+CHECKPOINT_FILENAME = "checkpoint_t_{:03d}.npz"
+FRAME_PATTERN = re.compile(r"wildfire_t_(\d+)\.tif$")
+
+
+def write_manifest(run, manifest):
+    run.write_bytes(MANIFEST_FILENAME, json.dumps(manifest, indent=2).encode())
+
+
+def read_manifest(run):
+    """
+    Return the manifest of `run`.
+
+    Raises:
+        FileNotFoundError: If the run has no manifest (e.g. it predates checkpoints).
+    """
+    if not run.exists(MANIFEST_FILENAME):
+        raise FileNotFoundError(f"Run '{run.name}' has no {MANIFEST_FILENAME}; it cannot be forked.")
+    return json.loads(run.read_bytes(MANIFEST_FILENAME))
+
+
+def save_checkpoint(run, step, state, base_state, rng):
+    """Store the cells that differ from `base_state` plus the generator state."""
+    diff_index = np.flatnonzero(state != base_state)
+    if state.size <= np.iinfo(np.uint32).max:
+        diff_index = diff_index.astype(np.uint32)
+
+    buf = io.BytesIO()
+    np.savez_compressed(
+        buf,
+        step=np.int32(step),
+        shape=np.array(state.shape, dtype=np.int64),
+        diff_index=diff_index,
+        diff_value=state.ravel()[diff_index],
+        rng_state=np.array(json.dumps(rng.bit_generator.state)),
+    )
+    run.write_bytes(CHECKPOINT_FILENAME.format(step), buf.getvalue())
+    logger.info(f"  Checkpoint t={step}: {diff_index.size} changed cells, {buf.tell() / 1024:.1f} KiB")
+
+
+def load_checkpoint(run, step, base_state):
+    """
+    Rebuild the state array and generator saved at `step`.
+
+    Returns:
+        tuple: (state ndarray, numpy Generator positioned as at `step`).
+    """
+    with np.load(io.BytesIO(run.read_bytes(CHECKPOINT_FILENAME.format(step)))) as ckpt:
+        if tuple(ckpt['shape']) != base_state.shape:
+            raise ValueError(f"Checkpoint t={step} of '{run.name}' does not match the input raster shape.")
+        state = base_state.copy()
+        state.ravel()[ckpt['diff_index']] = ckpt['diff_value']
+        rng = np.random.default_rng()
+        rng.bit_generator.state = json.loads(str(ckpt['rng_state']))
+    return state, rng
+
+
+def latest_checkpoint(manifest, step):
+    """The last checkpoint step at or before `step`."""
+    candidates = [s for s in manifest.get('checkpoints', []) if s <= step]
+    if not candidates:
+        raise ValueError(f"No checkpoint at or before step {step}.")
+    return max(candidates)
+
+
+def checkpoint_run(run, manifest, step):
+    """
+    The run holding the checkpoint to rebuild `step` of `run` from, and that
+    checkpoint's step. A fork only checkpoints from its fork_step on, so
+    earlier steps follow the fork parents, as resolve_run_file() does for
+    frames.
+
+    Raises:
+        FileNotFoundError: If a parent in the chain no longer exists.
+        ValueError: If no run in the chain has a checkpoint at or before `step`.
+    """
+    while manifest.get('parent') is not None and step < manifest.get('fork_step', 0):
+        parent = open_run(manifest['parent'])
+        if parent is None:
+            raise FileNotFoundError(f"Parent run '{manifest['parent']}' of '{run.name}' not found (it may have expired).")
+        run, manifest = parent, read_manifest(parent)
+    return run, latest_checkpoint(manifest, step)
+
+
+def resolve_run_file(run, filename):
+    """
+    Return the run that holds `filename`, following fork parents for frames
+    shared by reference. Returns None if no run in the chain has it.
+    """
+    while run is not None:
+        if run.exists(filename):
+            return run
+        match = FRAME_PATTERN.match(filename)
+        if not match or not run.exists(MANIFEST_FILENAME):
+            return None
+        manifest = read_manifest(run)
+        parent = manifest.get('parent')
+        if parent is None or int(match.group(1)) >= manifest.get('fork_step', 0):
+            return None
+        run = open_run(parent)
+    return None
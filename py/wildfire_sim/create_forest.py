@@ -131,5 +131,5 @@ def make_point_in_forest(shape_obj, scale, grid_size):
 def get_point_in_forest(scale, grid_size, override_shape=None):
     """Return predicate from override_shape or latest stored shape in state."""
     logger.info("get_point_in_forest called.")
-    shape = override_shape if override_shape is not None else app_state.get_forest_shape()
+    shape = override_shape if override_shape is not None else app_state.get_value('forest_shape')
     return make_point_in_forest(shape, scale, grid_size)
\ No newline at end of file
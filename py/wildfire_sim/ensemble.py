@@ -0,0 +1,292 @@
+"""
+ensemble.py
+---------------------------------------------
+Monte Carlo ensembles of the raster CA with adaptive size.
+
+Members are added in batches until the ensemble has converged: the widest
+per-pixel 95% confidence interval (Wilson score) on the burn probability,
+over the burnable pixels some member burnt or bordered, and the relative
+standard error of the mean burnt area must both be within tolerance. The
+run also stops when its time budget or member cap is reached, and reports
+the error it actually achieved. Fires that cannot spread far converge once
+a pixel no member burnt is bounded (about 35 members for a 5% tolerance);
+only uncertain fronts need hundreds of runs.
+
+Members are simulated on a window around the ignition that the fire cannot
+leave within TIMESTEPS (the CA spreads at most one cell per step), so the
+cost per member does not depend on the county size.
+"""
+
+import json
+import math
+import time
+import logging
+import numpy as np
+import rasterio
+from rasterio.windows import Window
+from rasterio.windows import transform as window_transform
+from scipy.ndimage import binary_dilation
+
+from wildfire_sim.sca import (
+    NO_FOREST, BURNING, BURNT, TIMESTEPS, P_IGNITION, P_SPONTANEOUS,
+    _find_input_raster, _read_ignition_site, _run_ca_step, _new_run,
+)
+from wildfire_sim.terrain import terrain_ignition_probability
+from wildfire_sim.run_store import run_cache
+
+try:
+    from config import (
+        SIMULATION_GRID, EPHEMERAL_RUNS, IGNITION_SNAP_RADIUS_PX, TERRAIN_SPREAD,
+        ENSEMBLE_BATCH_SIZE, ENSEMBLE_MIN_MEMBERS, ENSEMBLE_MAX_MEMBERS,
+        ENSEMBLE_PIXEL_TOLERANCE, ENSEMBLE_AREA_TOLERANCE, ENSEMBLE_TIME_BUDGET_S
+    )
+except ImportError:
+    SIMULATION_GRID = "source"
+    EPHEMERAL_RUNS = False
+    IGNITION_SNAP_RADIUS_PX = 15
+    TERRAIN_SPREAD = True
+    ENSEMBLE_BATCH_SIZE = 10
+    ENSEMBLE_MIN_MEMBERS = 20
+    ENSEMBLE_MAX_MEMBERS = 2000
+    ENSEMBLE_PIXEL_TOLERANCE = 0.05
+    ENSEMBLE_AREA_TOLERANCE = 0.02
+    ENSEMBLE_TIME_BUDGET_S = 30
+
+logger = logging.getLogger(__name__)
+
+PROBABILITY_FILENAME = "burn_probability.tif"
+SUMMARY_FILENAME = "ensemble_summary.json"
+Z_95 = 1.959964
+
+
+class EnsembleAccumulator:
+    """
+    Running per-pixel burn counts and burnt-area moments (Welford), so the
+    convergence check after each batch is O(window) regardless of size.
+    """
+
+    def __init__(self, shape, pixel_area_ha, burnable=None):
+        self.counts = np.zeros(shape, dtype=np.int32)
+        self.burnable = np.ones(shape, dtype=bool) if burnable is None else burnable
+        self.pixel_area_ha = pixel_area_ha
+        self.members = 0
+        self._area_mean = 0.0
+        self._area_m2 = 0.0
+
+    def add(self, burnt_mask):
+        self.counts += burnt_mask
+        self.members += 1
+        area = float(burnt_mask.sum()) * self.pixel_area_ha
+        delta = area - self._area_mean
+        self._area_mean += delta / self.members
+        self._area_m2 += delta * (area - self._area_mean)
+
+    @property
+    def probability(self):
+        return self.counts / max(self.members, 1)
+
+    def pixel_ci_half_width(self):
+        """
+        Wilson score 95% CI half-widths of the per-pixel burn probability.
+        Unlike the normal approximation they stay positive at 0/n and n/n,
+        so a pixel no member has burnt yet is not taken as settled.
+        """
+        n = max(self.members, 1)
+        p = self.probability
+        z2 = Z_95 ** 2
+        return Z_95 * np.sqrt(p * (1 - p) / n + z2 / (4 * n * n)) / (1 + z2 / n)
+
+    def reachable(self):
+        """Burnable pixels some member burnt or bordered: those the front can reach."""
+        return binary_dilation(self.counts > 0, structure=np.ones((3, 3), dtype=bool)) & self.burnable
+
+    def area_standard_error(self):
+        if self.members < 2:
+            return math.inf
+        variance = self._area_m2 / (self.members - 1)
+        return math.sqrt(variance / self.members)
+
+    def summary(self):
+        half_width = self.pixel_ci_half_width()
+        reachable = self.reachable()
+        se = self.area_standard_error()
+        mean = self._area_mean
+        return {
+            "members": self.members,
+            "max_pixel_ci_half_width": round(float(half_width[reachable].max()), 5) if reachable.any() else 0.0,
+            "mean_pixel_ci_half_width": round(float(half_width[reachable].mean()), 5) if reachable.any() else 0.0,
+            "burnt_area_mean_ha": round(mean, 4),
+            "burnt_area_se_ha": round(se, 4) if math.isfinite(se) else None,
+            # None until two members give an SE (the area check cannot pass before);
+            # 0.0 if every member burnt nothing
+            "burnt_area_rel_se": None if not math.isfinite(se) else (round(se / mean, 5) if mean > 0 else 0.0),
+        }
+
+
+def ignition_window(shape, row, col):
+    """Window around (row, col) the fire cannot leave (the whole raster if it can jump)."""
+    height, width = shape
+    if P_SPONTANEOUS > 0:
+        return Window(0, 0, width, height)
+    reach = TIMESTEPS + 1
+    row0, col0 = max(0, row - reach), max(0, col - reach)
+    row1, col1 = min(height, row + reach + 1), min(width, col + reach + 1)
+    return Window(col0, row0, col1 - col0, row1 - row0)
+
+
+def write_probability_raster(run, probability, source_meta, window):
+    """Save a float32 burn-probability window of the source raster into `run`."""
+    meta = source_meta.copy()
+    for key in ('compress', 'tiled', 'blockxsize', 'blockysize', 'predictor', 'nbits'):
+        meta.pop(key, None)
+    meta.update(
+        driver="GTiff",
+        dtype=rasterio.float32,
+        count=1,
+        nodata=None,
+        compress="lzw",
+        transform=window_transform(window, source_meta['transform']),
+        width=window.width,
+        height=window.height,
+    )
+    run.write_raster(PROBABILITY_FILENAME, probability.astype(np.float32), meta)
+
+
+def simulate_member(state, p_ignite, rng):
+    """One CA run to TIMESTEPS; returns the mask of cells that burned."""
+    for _ in range(TIMESTEPS):
+        state = _run_ca_step(state, p_ignite, P_SPONTANEOUS, rng=rng)
+        if not (state == BURNING).any():
+            break
+    return (state == BURNING) | (state == BURNT)
+
+
+def run_ensemble(county_key, igni_lat, igni_lon, pixel_tolerance=None, area_tolerance=None,
+                 time_budget_s=None, min_members=None, max_members=None, batch_size=None,
+                 grid=None, terrain=None, snap_radius_px=None, ephemeral=None, seed=None):
+    """
+    Runs an adaptive ensemble and saves its burn-probability raster.
+
+    Args:
+        county_key, igni_lat, igni_lon: As for run_geotiff_simulation.
+        pixel_tolerance (float): Target max 95% CI half-width of any pixel's
+            burn probability. Defaults to config ENSEMBLE_PIXEL_TOLERANCE.
+        area_tolerance (float): Target relative standard error of the mean
+            burnt area. Defaults to config ENSEMBLE_AREA_TOLERANCE.
+        time_budget_s (float): Wall-clock budget. Defaults to ENSEMBLE_TIME_BUDGET_S.
+        min_members, max_members, batch_size (int): Ensemble size controls.
+        grid, terrain, snap_radius_px, ephemeral: As for run_geotiff_simulation.
+        seed (int): Seed of the ensemble generator (random if None).
+
+    Returns:
+        dict: output_dir, run_name, ephemeral, crs, ignition, stop_reason,
+              converged, elapsed_s, tolerances and the achieved errors.
+
+    Raises:
+        FileNotFoundError, IndexError, ValueError: As for run_geotiff_simulation.
+    """
+    pixel_tolerance = ENSEMBLE_PIXEL_TOLERANCE if pixel_tolerance is None else pixel_tolerance
+    area_tolerance = ENSEMBLE_AREA_TOLERANCE if area_tolerance is None else area_tolerance
+    time_budget_s = ENSEMBLE_TIME_BUDGET_S if time_budget_s is None else time_budget_s
+    min_members = ENSEMBLE_MIN_MEMBERS if min_members is None else int(min_members)
+    max_members = ENSEMBLE_MAX_MEMBERS if max_members is None else int(max_members)
+    batch_size = ENSEMBLE_BATCH_SIZE if batch_size is None else int(batch_size)
+    if pixel_tolerance <= 0 or area_tolerance <= 0 or time_budget_s <= 0:
+        raise ValueError("Tolerances and the time budget must be positive.")
+    if batch_size < 1 or max_members < 1:
+        raise ValueError("batch_size and max_members must be at least 1.")
+
+    started = time.perf_counter()
+    grid = grid or SIMULATION_GRID
+    snap_radius_px = IGNITION_SNAP_RADIUS_PX if snap_radius_px is None else snap_radius_px
+    input_file = _find_input_raster(county_key, grid)
+    site = _read_ignition_site(input_file, igni_lat, igni_lon, snap_radius_px)
+    full_state = site['state']
+    pixel_w, pixel_h = site['pixel_size_m']
+
+    window = ignition_window(full_state.shape, site['row'], site['col'])
+    rows = slice(window.row_off, window.row_off + window.height)
+    cols = slice(window.col_off, window.col_off + window.width)
+
+    base_state = full_state[rows, cols].copy()
+    base_state[site['row'] - window.row_off, site['col'] - window.col_off] = BURNING
+
+    if terrain is None:
+        terrain = TERRAIN_SPREAD
+    p_terrain = terrain_ignition_probability(county_key, input_file, P_IGNITION) if terrain else None
+    p_ignite = P_IGNITION if p_terrain is None else p_terrain[rows, cols]
+
+    # --- Add members in batches until converged ---
+    seed = int(np.random.SeedSequence().entropy % (2 ** 63)) if seed is None else int(seed)
+    rng = np.random.default_rng(seed)
+    acc = EnsembleAccumulator(base_state.shape, pixel_w * pixel_h / 10000.0, base_state != NO_FOREST)
+    stop_reason = "max_members"
+    logger.info(f"Ensemble for {county_key} on a {window.height}x{window.width} window "
+                f"(pixel tol {pixel_tolerance}, area tol {area_tolerance}, budget {time_budget_s}s)")
+
+    while acc.members < max_members:
+        for _ in range(min(batch_size, max_members - acc.members)):
+            acc.add(simulate_member(base_state, p_ignite, rng))
+
+        summary = acc.summary()
+        if (acc.members >= min_members
+                and summary["max_pixel_ci_half_width"] <= pixel_tolerance
+                and summary["burnt_area_rel_se"] is not None
+                and summary["burnt_area_rel_se"] <= area_tolerance):
+            stop_reason = "converged"
+            break
+        if time.perf_counter() - started >= time_budget_s:
+            stop_reason = "time_budget"
+            break
+
+    summary = acc.summary()
+    elapsed = time.perf_counter() - started
+    logger.info(f"  Ensemble stopped ({stop_reason}) after {acc.members} members in {elapsed:.2f}s: "
+                f"max CI half-width {summary['max_pixel_ci_half_width']}, area rel SE {summary['burnt_area_rel_se']}")
+
+    # --- Save the probability raster and summary ---
+    if ephemeral is None:
+        ephemeral = EPHEMERAL_RUNS
+    run = _new_run(county_key, ephemeral, suffix="_ensemble")
+
+    probability = acc.probability.astype(np.float32)
+    probability[base_state == NO_FOREST] = 0.0
+    write_probability_raster(run, probability, site['meta'], window)
+
+    result = {
+        "county_key": county_key,
+        "input_file": input_file,
+        "ignition": {
+            "lat": site['lat'],
+            "lon": site['lon'],
+            "row": site['row'],
+            "col": site['col'],
+            "snapped": site['snapped'],
+            "snap_distance_m": round(site['snap_distance_px'] * (pixel_w + pixel_h) / 2, 2)
+        },
+        "window": [window.col_off, window.row_off, window.width, window.height],
+        "terrain": p_terrain is not None,
+        "seed": seed,
+        "stop_reason": stop_reason,
+        "converged": stop_reason == "converged",
+        "elapsed_s": round(elapsed, 3),
+        "tolerances": {
+            "pixel_ci_half_width": pixel_tolerance,
+            "burnt_area_rel_se": area_tolerance,
+            "time_budget_s": time_budget_s,
+            "min_members": min_members,
+            "max_members": max_members,
+        },
+        **summary,
+    }
+    run.write_bytes(SUMMARY_FILENAME, json.dumps(result, indent=2).encode())
+    if run.ephemeral:
+        run_cache.put(run)
+
+    result.update(
+        output_dir=run.path,
+        run_name=run.name,
+        ephemeral=run.ephemeral,
+        crs=site['crs'],
+    )
+    return result
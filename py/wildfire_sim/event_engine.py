@@ -0,0 +1,259 @@
+"""
+event_engine.py
+---------------------------------------------
+Continuous-time, event-driven engine for the graph wildfire model.
+
+A next-reaction simulation on an ArrayGraph (graph_engine.py): instead of
+advancing every node each step, the engine keeps a priority queue of
+timed events and only ever touches the nodes an event involves.
+
+    ignition    each (burning -> unburnt) edge carries a clock. Its delay
+                is the step of the first successful trial, geometric in q
+                (the chance that one incinerate() trial over that edge alone
+                succeeds), placed uniformly within half a step of that step.
+                Each hop therefore takes as long on average as in the step
+                engines, but the fire cannot cross several cells in one step.
+                Several burning neighbours compete as independent clocks:
+                the first to ring ignites the node, and clocks into burning
+                or burnt nodes are dropped.
+    burnout     a node igniting at time t with life L burns out at
+                t + L + 1/2, after its L-th trial.
+    ember       burning nodes launch embers at rate -ln(1 - ember_prob),
+                targeted as in incinerate().
+    wind        at every whole time step while the fire burns, the wind
+                ellipse of simulate_wind reweights its edges. Pending clocks
+                on those edges are redrawn from the new q.
+
+Nodes get sub-step arrival times (`arrival`). advance() runs the queue up
+to the next whole step, so callers can still draw one frame per step up to
+TIMESTEPS. A quiet stretch with no events costs nothing.
+"""
+
+import heapq
+import logging
+import numpy as np
+
+from wildfire_sim.graph_engine import (
+    NOT_BURNT, BURNING, BURNT, EDGE_ORANGE, EDGE_BROWN,
+)
+
+logger = logging.getLogger(__name__)
+
+IGNITE = 0
+BURNOUT = 1
+EMBER = 2
+WIND = 3
+
+# Quadrature points of the threshold noise in single_trial_probability
+THRESHOLD_NOISE_POINTS = 32
+
+
+def single_trial_probability(w, threshold, edge_noise, threshold_noise):
+    """
+    P(min(1, w * U(edge_noise)) >= threshold * U(threshold_noise)): the
+    chance that one incinerate() trial over a single edge succeeds.
+    Vectorized over `w` / `threshold`.
+    """
+    w = np.atleast_1d(np.asarray(w, dtype=np.float64))
+    threshold = np.broadcast_to(np.asarray(threshold, dtype=np.float64), w.shape)
+    e_lo, e_hi = edge_noise
+    t_lo, t_hi = threshold_noise
+    # Midpoints of the uniform threshold noise
+    u = t_lo + (t_hi - t_lo) * (np.arange(THRESHOLD_NOISE_POINTS) + 0.5) / THRESHOLD_NOISE_POINTS
+    y = threshold[:, None] * u[None, :]
+    wc = np.maximum(w, 1e-12)[:, None]
+    p = np.clip((e_hi * wc - y) / ((e_hi - e_lo) * wc), 0.0, 1.0)
+    p = np.where(y <= 1.0, p, 0.0)
+    return np.where(w > 0, p.mean(axis=1), 0.0)
+
+
+def trial_rate(q):
+    """Exponential rate whose one-step firing probability is q."""
+    return -np.log1p(-np.minimum(q, 1 - 1e-12))
+
+
+def trial_delays(q, rng):
+    """Time to the first successful per-step trial (probability q), with sub-step jitter; inf if q == 0."""
+    q = np.asarray(q, dtype=np.float64)
+    trials = rng.geometric(np.clip(q, 1e-12, 1.0))
+    delays = trials - 1 + rng.uniform(0.5, 1.5, size=q.shape)
+    return np.where(q > 0, delays, np.inf)
+
+
+class EventEngine:
+    """
+    Next-reaction simulation of an ArrayGraph.
+
+    Args:
+        graph: ArrayGraph with its ignition node(s) already burning; its
+            state, colours and rng are updated in place.
+        wind: dict of simulate_wind arguments (max_speed, epsilon,
+            grid_size, dist_scale), or None for no wind.
+    """
+
+    def __init__(self, graph, wind=None):
+        self.graph = graph
+        self.rng = graph.rng
+        self.wind = wind
+        self.time = 0.0
+        self.queue = []
+        self._seq = 0
+        n = graph.n_nodes
+        self.arrival = np.full(n, np.nan)
+        self.burnout_time = np.full(n, np.inf)
+        self.clocks = {}        # edge id -> (time, seq, q, source, target)
+        self.ember_rate = float(trial_rate(graph.ember_prob))
+        self._ignited = []
+        self._burnt_out = 0
+        self.burning = 0
+        self.events = 0
+
+        for node in np.flatnonzero(graph.state == BURNING).tolist():
+            self._ignite(node, 0.0, source=-1, initial=True)
+        if wind:
+            # The step engines first reweight after step 1, i.e. at time 2
+            self._push(2.0, WIND, -1)
+
+    # --- queue ---
+
+    def _push(self, time, kind, node, extra=-1):
+        self._seq += 1
+        heapq.heappush(self.queue, (time, self._seq, kind, node, extra))
+        return self._seq
+
+    def _trial_probability(self, edges, targets):
+        g = self.graph
+        return single_trial_probability(g.edge_w[edges], g.threshold[targets], g.edge_noise, g.threshold_noise)
+
+    def _start_clocks(self, node, now):
+        """Clocks on every edge from a newly burning node to an unburnt neighbour."""
+        g = self.graph
+        entries = g._csr_entries(np.array([node]))
+        targets = g.indices[entries]
+        keep = g.state[targets] == NOT_BURNT
+        edges, targets = g.csr_edge[entries[keep]], targets[keep]
+        if edges.size == 0:
+            return
+        q = self._trial_probability(edges, targets)
+        times = now + trial_delays(q, self.rng)
+        deadline = self.burnout_time[node]
+        for e, t, qe, target in zip(edges.tolist(), times.tolist(), q.tolist(), targets.tolist()):
+            seq = self._push(t, IGNITE, target, e) if t < deadline else -1
+            self.clocks[e] = (t, seq, qe, node, target)
+
+    # --- transitions ---
+
+    def _ignite(self, node, now, source, initial=False):
+        g = self.graph
+        g.state[node] = BURNING
+        self.burning += 1
+        self.arrival[node] = now
+        self.burnout_time[node] = now + int(g.life[node]) + 0.5
+        self._push(self.burnout_time[node], BURNOUT, node)
+        if not initial:
+            g.unburnt -= 1
+            self._ignited.append(node)
+            g._add_burning(np.array([node]), 1)
+            if source >= 0:
+                edge = g.edge_ids([source], [node])
+                edge = edge[edge >= 0]
+                g.edge_color[edge] = EDGE_ORANGE
+                for e in edge.tolist():
+                    self._push(now + int(g.edge_life[e]), BURNOUT, -1, e)
+        if self.ember_rate > 0:
+            t = now + self.rng.exponential() / self.ember_rate
+            if t < self.burnout_time[node]:
+                self._push(t, EMBER, node)
+        self._start_clocks(node, now)
+
+    def _burn_out(self, node):
+        g = self.graph
+        if g.state[node] != BURNING:
+            return
+        g.state[node] = BURNT
+        self.burning -= 1
+        g.life[node] = -1
+        g._add_burning(np.array([node]), -1)
+        entries = g._csr_entries(np.array([node]))
+        g.edge_color[g.csr_edge[entries]] = EDGE_BROWN
+        for e in g.csr_edge[entries].tolist():
+            clock = self.clocks.get(e)
+            if clock is not None and clock[3] == node:
+                del self.clocks[e]
+        self._burnt_out += 1
+
+    def _ember(self, node, now):
+        g = self.graph
+        if g.state[node] != BURNING:
+            return
+        if g.unburnt > 0:
+            target = g.ember_target(node)
+            if target >= 0 and self.rng.random() < 0.5:
+                self._ignite(target, now, source=node)
+        t = now + self.rng.exponential() / self.ember_rate
+        if t < self.burnout_time[node]:
+            self._push(t, EMBER, node)
+
+    def _apply_wind(self, now):
+        g = self.graph
+        g.simulate_wind(**self.wind)
+        changed = [e for e in g.last_wind_edges.tolist()
+                   if e in self.clocks and g.state[self.clocks[e][4]] == NOT_BURNT]
+        if changed:
+            targets = np.array([self.clocks[e][4] for e in changed])
+            q = self._trial_probability(np.array(changed), targets)
+            times = now + trial_delays(q, self.rng)
+            for e, t_new, qe in zip(changed, times.tolist(), q.tolist()):
+                _, _, _, source, target = self.clocks[e]
+                # The old event stays queued but no longer matches the clock's seq
+                seq = self._push(t_new, IGNITE, target, e) if t_new < self.burnout_time[source] else -1
+                self.clocks[e] = (t_new, seq, qe, source, target)
+        if self.burning:
+            self._push(now + 1.0, WIND, -1)
+
+    # --- running ---
+
+    def run_until(self, t_end):
+        """Process every event with time <= t_end."""
+        g = self.graph
+        while self.queue and self.queue[0][0] <= t_end:
+            now, seq, kind, node, extra = heapq.heappop(self.queue)
+            self.events += 1
+            if kind == IGNITE:
+                clock = self.clocks.get(extra)
+                if clock is None or clock[1] != seq:
+                    continue            # rescaled or cancelled
+                del self.clocks[extra]
+                if g.state[node] == NOT_BURNT:
+                    self._ignite(node, now, source=clock[3])
+            elif kind == BURNOUT:
+                if node >= 0:
+                    self._burn_out(node)
+                elif g.edge_color[extra] == EDGE_ORANGE:
+                    g.edge_color[extra] = EDGE_BROWN
+                    g.edge_life[extra] = -1
+            elif kind == EMBER:
+                self._ember(node, now)
+            else:
+                self._apply_wind(now)
+        self.time = max(self.time, t_end)
+
+    def advance(self, stats=None):
+        """
+        Run to the next whole time step, the counterpart of one
+        ArrayGraph.step(). Returns the nodes that ignited.
+        """
+        self.run_until(np.floor(self.time) + 1)
+        ignited = np.array(self._ignited, dtype=np.int64)
+        if stats is not None:
+            if ignited.size:
+                stats.ignite(self.graph.rows[ignited], self.graph.cols[ignited])
+            stats.burn_out(self._burnt_out)
+        self._ignited, self._burnt_out = [], 0
+        return ignited
+
+    def arrival_grid(self, shape=None):
+        """Arrival (ignition) time per grid cell; NaN where the fire never arrived."""
+        grid = np.full(shape or self.graph.grid_shape, np.nan, dtype=np.float32)
+        grid[self.graph.rows, self.graph.cols] = self.arrival
+        return grid
@@ -0,0 +1,186 @@
+"""
+fire_stats.py
+---------------------------------------------
+Per-timestep fire statistics maintained incrementally from state transitions.
+
+The engines report which cells ignite and how many burn out on each step;
+the tracker updates its counters and the footprint perimeter from those
+transitions only, so no full-grid recount is needed per frame.
+"""
+
+import io
+import csv
+import json
+import math
+import logging
+import numpy as np
+
+from wildfire_sim.run_store import as_run
+
+logger = logging.getLogger(__name__)
+
+STATS_JSON_FILENAME = "fire_stats.json"
+STATS_CSV_FILENAME = "fire_stats.csv"
+
+STATS_FIELDS = [
+    "timestep",
+    "burning",
+    "burnt",
+    "ignited",
+    "burnt_area_ha",
+    "perimeter_m",
+    "spread_rate_ha_per_step",
+]
+
+# Mean Earth radius (m), used to size pixels of geographic (degree) rasters.
+EARTH_RADIUS_M = 6371008.8
+
+
+def pixel_size_m(transform, crs=None):
+    """
+    Return the (width, height) of one raster pixel in metres.
+
+    Projected rasters use the transform directly. For geographic CRSs the
+    degree sizes are scaled at the latitude of the raster origin, and Web
+    Mercator sizes are corrected by that latitude's scale factor.
+    """
+    width = math.hypot(transform.a, transform.d)
+    height = math.hypot(transform.b, transform.e)
+
+    if crs is None:
+        return width, height
+
+    if getattr(crs, "is_geographic", False):
+        m_per_deg = math.pi * EARTH_RADIUS_M / 180.0
+        lat = max(-89.9, min(89.9, transform.f))
+        width *= m_per_deg * math.cos(math.radians(lat))
+        height *= m_per_deg
+    elif crs.to_epsg() == 3857:
+        # Spherical Mercator stretches ground distances by 1/cos(lat)
+        lat = math.atan(math.sinh(transform.f / 6378137.0))
+        width *= math.cos(lat)
+        height *= math.cos(lat)
+
+    return width, height
+
+
+class FireStatsTracker:
+    """
+    Incremental fire statistics over a 2D grid.
+
+    The burnt footprint (burning + burnt cells) only ever grows, so its
+    perimeter can be updated from the 4-neighbours of each newly ignited
+    cell: every new cell adds four edges and removes two for each neighbour
+    already in the footprint.
+    """
+
+    def __init__(self, shape, pixel_width_m, pixel_height_m):
+        height, width = shape
+        # Padded by one cell so neighbour lookups never leave the array
+        self._footprint = np.zeros((height + 2, width + 2), dtype=bool)
+        self.pixel_width_m = float(pixel_width_m)
+        self.pixel_height_m = float(pixel_height_m)
+        self.pixel_area_ha = self.pixel_width_m * self.pixel_height_m / 10000.0
+
+        self.burning = 0
+        self.burnt = 0
+        self.footprint_cells = 0
+        # Boundary edges between footprint and non-footprint cells
+        self._edges_lr = 0  # shared with a left/right neighbour (length = pixel height)
+        self._edges_ud = 0  # shared with an up/down neighbour (length = pixel width)
+
+        self._step_ignited = 0
+        self.records = []
+
+    @classmethod
+    def from_grid(cls, grid, burning_value, burnt_value, pixel_width_m, pixel_height_m, records=None):
+        """
+        Rebuild a tracker from a full state grid (one full pass), e.g. when a
+        run is resumed from a checkpoint. `records` seeds the time series.
+        """
+        tracker = cls(grid.shape, pixel_width_m, pixel_height_m)
+        burnt = (grid == burnt_value)
+        tracker.ignite(*np.nonzero((grid == burning_value) | burnt))
+        tracker.burn_out(int(burnt.sum()))
+        tracker._step_ignited = 0
+        tracker.records = list(records or [])
+        return tracker
+
+    def ignited_this_step(self, count):
+        """Override the ignition count reported for the current step."""
+        self._step_ignited = int(count)
+
+    def ignite(self, rows, cols):
+        """Record cells that entered the BURNING state this step."""
+        rows = np.asarray(rows, dtype=np.intp).ravel() + 1
+        cols = np.asarray(cols, dtype=np.intp).ravel() + 1
+        if rows.size == 0:
+            return
+
+        fp = self._footprint
+        # Neighbours already in the footprint before this batch
+        lr_old = fp[rows, cols - 1].astype(np.int64) + fp[rows, cols + 1]
+        ud_old = fp[rows - 1, cols].astype(np.int64) + fp[rows + 1, cols]
+        fp[rows, cols] = True
+        # Neighbours in the footprint after adding the batch; the difference
+        # counts pairs inside the batch, each of which is seen from both sides
+        lr_new = fp[rows, cols - 1].astype(np.int64) + fp[rows, cols + 1]
+        ud_new = fp[rows - 1, cols].astype(np.int64) + fp[rows + 1, cols]
+
+        n = rows.size
+        self._edges_lr += int(2 * n - 2 * lr_old.sum() - (lr_new - lr_old).sum())
+        self._edges_ud += int(2 * n - 2 * ud_old.sum() - (ud_new - ud_old).sum())
+
+        self.burning += n
+        self.footprint_cells += n
+        self._step_ignited += n
+
+    def burn_out(self, count):
+        """Record `count` cells moving from BURNING to BURNT this step."""
+        self.burning -= int(count)
+        self.burnt += int(count)
+
+    @property
+    def perimeter_m(self):
+        return self._edges_lr * self.pixel_height_m + self._edges_ud * self.pixel_width_m
+
+    def end_step(self, timestep):
+        """Close the current step and append its record to the time series."""
+        record = {
+            "timestep": int(timestep),
+            "burning": self.burning,
+            "burnt": self.burnt,
+            "ignited": self._step_ignited,
+            "burnt_area_ha": round(self.footprint_cells * self.pixel_area_ha, 4),
+            "perimeter_m": round(self.perimeter_m, 2),
+            "spread_rate_ha_per_step": round(self._step_ignited * self.pixel_area_ha, 4),
+        }
+        self.records.append(record)
+        self._step_ignited = 0
+        return record
+
+    def to_columns(self):
+        """Return the time series as a compact column-oriented dict."""
+        return {field: [r[field] for r in self.records] for field in STATS_FIELDS}
+
+    def write(self, output_dir):
+        """
+        Write the time series as JSON (columnar) and CSV into the run.
+
+        `output_dir` may be a directory path or a run_store run object.
+        """
+        run = as_run(output_dir)
+
+        payload = {
+            "pixel_area_ha": self.pixel_area_ha,
+            "series": self.to_columns(),
+        }
+        run.write_bytes(STATS_JSON_FILENAME, json.dumps(payload, separators=(",", ":")).encode())
+
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=STATS_FIELDS, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(self.records)
+        run.write_bytes(STATS_CSV_FILENAME, buf.getvalue().encode())
+
+        logger.info(f"  Saved fire statistics ({STATS_JSON_FILENAME}, {STATS_CSV_FILENAME}) to {run.name}")
@@ -0,0 +1,107 @@
+"""
+graph_cache.py
+---------------------------------------------
+On-disk cache of the deterministic part of wildfire_sim.incinerate graphs.
+
+Node positions, slope / elevation / aspect thresholds, the forest-shape
+mask and the candidate 8-neighbour edges (with their angles and lengths)
+depend only on the dataset, NODES and forest_shape. They are stored as one
+.npz per key in GRAPH_CACHE_DIR, so a repeated run skips reading the CSV,
+computing thresholds and testing every cell against the polygon. Each run
+still draws its own lives, occupancy, edge weights, ignition and wind.
+
+With a GRAPH_DENSITY_SEED the DENSITY_FACTOR occupancy is drawn from that
+seed, so the occupied grid is cached as well.
+
+The key is a hash of the CSV's contents, NODES, DENSITY_FACTOR, the
+density seed and forest_shape (canonical JSON, or WKB for shapely
+geometries), plus any model constants the cached arrays depend on.
+Entries are written to a temporary file and moved into place,
+as graph_checkpoint.py does.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Bump when the cached arrays change meaning
+GRAPH_CACHE_VERSION = 1
+
+# (path, size, mtime_ns) -> checksum, so an unchanged CSV is hashed once per process
+_checksums = {}
+
+
+def file_checksum(path):
+    """BLAKE2b checksum of a file's contents (raises OSError if unreadable)."""
+    stat = os.stat(path)
+    signature = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    checksum = _checksums.get(signature)
+    if checksum is None:
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        checksum = _checksums[signature] = digest.hexdigest()
+    return checksum
+
+
+def shape_digest(shape):
+    """Stable digest of a forest_shape (GeoJSON dict, coordinate list or shapely geometry)."""
+    if shape is None:
+        return None
+    if hasattr(shape, 'wkb'):
+        data = shape.wkb
+    else:
+        data = json.dumps(shape, sort_keys=True, default=str).encode()
+    return hashlib.sha1(data).hexdigest()
+
+
+def graph_cache_key(csv_path, nodes, density_factor, density_seed, forest_shape, **params):
+    """Cache key of a graph; `params` are further constants its arrays depend on."""
+    parts = {
+        **params,
+        'version': GRAPH_CACHE_VERSION,
+        'csv': file_checksum(csv_path),
+        'nodes': nodes,
+        'density_factor': density_factor,
+        'density_seed': density_seed,
+        'forest_shape': shape_digest(forest_shape),
+    }
+    return hashlib.sha1(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+def graph_cache_path(cache_dir, key):
+    return os.path.join(cache_dir, f"graph_{key}.npz")
+
+
+def load_prebuilt_graph(cache_dir, key):
+    """The cached arrays for `key`, or None on a miss (or an unreadable entry)."""
+    path = graph_cache_path(cache_dir, key)
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as cached:
+            arrays = {name: cached[name] for name in cached.files}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable graph cache entry {path}: {e}")
+        return None
+    logger.info(f"Loaded prebuilt graph {key[:12]} from {cache_dir}")
+    return arrays
+
+
+def save_prebuilt_graph(cache_dir, key, arrays):
+    path = graph_cache_path(cache_dir, key)
+    tmp_path = path + ".tmp"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not write graph cache entry {path}: {e}")
+        return
+    logger.info(f"Cached prebuilt graph {key[:12]} in {cache_dir}")
@@ -0,0 +1,104 @@
+"""
+graph_checkpoint.py
+---------------------------------------------
+Checkpoint / resume for graph-model runs (wildfire_sim.incinerate).
+
+Every GRAPH_CHECKPOINT_INTERVAL steps the run directory gets a
+graph_checkpoint.npz with what the static graph cannot rebuild: node state
+codes and life counters, the current edge weights, colours and lives, the
+pending burnout buckets and the states of the `random` and numpy
+generators. Positions, thresholds and adjacency are rebuilt from the CSV
+and the saved states, so a checkpoint stays a few bytes per node and edge.
+
+Checkpoints are written uncompressed to a temporary file and moved into
+place with os.replace, so a crash mid-write leaves the previous checkpoint
+intact and writing one costs about as much as copying the arrays.
+"""
+
+import os
+import json
+import random as rnd
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+GRAPH_CHECKPOINT_FILENAME = "graph_checkpoint.npz"
+
+
+def generator_state(rng):
+    """JSON-encoded state of a numpy Generator (a 0-d array, as checkpoints.py stores it)."""
+    return np.array(json.dumps(rng.bit_generator.state))
+
+
+def restore_generator(rng, state):
+    rng.bit_generator.state = json.loads(str(state))
+    return rng
+
+
+def random_state():
+    """JSON-encoded state of the global `random` generator."""
+    return np.array(json.dumps(rnd.getstate()))
+
+
+def restore_random(state):
+    version, internal, gauss_next = json.loads(str(state))
+    rnd.setstate((version, tuple(internal), gauss_next))
+
+
+def flatten_buckets(buckets):
+    """
+    A {step: [items or arrays of items]} burnout queue as (steps, items)
+    arrays; items may be node ids or (node, node) edge pairs.
+    """
+    steps, items = [], []
+    for step, entries in buckets.items():
+        if not len(entries):
+            continue
+        if isinstance(entries[0], np.ndarray):
+            chunk = np.concatenate(entries)     # ArrayGraph: arrays of node / edge indices
+        else:
+            chunk = np.asarray(entries)         # networkx: node ids or (node, node) pairs
+        steps.append(np.full(len(chunk), step, dtype=np.int64))
+        items.append(chunk.astype(np.int64))
+    if not items:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(steps), np.concatenate(items)
+
+
+def graph_checkpoint_path(output_dir):
+    return os.path.join(output_dir, GRAPH_CHECKPOINT_FILENAME)
+
+
+def save_graph_checkpoint(output_dir, step, engine, arrays):
+    """
+    Atomically replace the run's checkpoint with `arrays` (a dict of numpy
+    arrays) taken at the start of `step`.
+    """
+    path = graph_checkpoint_path(output_dir)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, step=np.int64(step), engine=np.array(engine), py_random=random_state(), **arrays)
+    os.replace(tmp_path, path)
+    logger.debug(f"  Graph checkpoint t={step} ({os.path.getsize(path) / 1024:.1f} KiB)")
+
+
+def load_graph_checkpoint(output_dir):
+    """
+    Load the run's checkpoint. Pass its 'py_random' to restore_random()
+    once the graph is rebuilt, since rebuilding draws from `random` too.
+
+    Returns:
+        dict: The saved arrays; 'step' and 'engine' as Python values.
+
+    Raises:
+        FileNotFoundError: If the run has no checkpoint.
+    """
+    path = graph_checkpoint_path(output_dir)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No {GRAPH_CHECKPOINT_FILENAME} in {output_dir}; the run cannot be resumed.")
+    with np.load(path) as ckpt:
+        arrays = {key: ckpt[key] for key in ckpt.files}
+    arrays['step'] = int(arrays['step'])
+    arrays['engine'] = str(arrays['engine'])
+    return arrays
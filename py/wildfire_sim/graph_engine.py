@@ -0,0 +1,486 @@
+"""
+graph_engine.py
+---------------------------------------------
+Array-backed engine for the graph wildfire model of incinerate.py.
+
+Same rules as the networkx engine (incinerate / lifeline_update /
+life_edge_update / simulate_wind), but the graph
+is stored as NumPy struct-of-arrays and every step is vectorized:
+
+    nodes   state (uint8 codes), threshold (float32), life (int8), pos,
+            grid row / col, number of burning neighbours
+    edges   undirected table u < v with weight, life, colour code, wind
+            direction and edge strength
+    CSR     indptr / indices over both directions, with csr_edge mapping
+            each entry back to its undirected edge
+
+Spread keeps the networkx semantics exactly: an unburnt node with k burning
+neighbours gets k trials, each summing freshly-noised weights of all k
+edges (capped at 1) against a freshly-noised threshold. Each node's count
+and summed weight of burning neighbours are kept incrementally (updated
+only for nodes that ignite or burn out, and for edges the wind changes),
+so a step only visits the fire front, and trials whose outcome the weight
+sum already decides draw no random numbers. Embers, burnout and
+wind follow incinerate.py as well; only the random streams differ (a NumPy
+Generator instead of the `random` module). Convert back with to_networkx()
+when attribute-dict access is needed.
+"""
+
+import logging
+import numpy as np
+import networkx as nx
+
+from wildfire_sim.graph_checkpoint import flatten_buckets, generator_state, restore_generator
+
+logger = logging.getLogger(__name__)
+
+# --- State and colour codes ---
+EMPTY = 0
+NOT_BURNT = 1
+BURNING = 2
+BURNT = 3
+STATE_NAMES = ('empty', 'not_burnt', 'burning', 'burnt')
+STATE_CODES = {name: code for code, name in enumerate(STATE_NAMES)}
+NODE_COLORS = ('black', 'green', 'orange', 'brown')
+
+EDGE_GREEN = 0
+EDGE_ORANGE = 1
+EDGE_BROWN = 2
+EDGE_COLORS = ('green', 'orange', 'brown')
+EDGE_COLOR_CODES = {name: code for code, name in enumerate(EDGE_COLORS)}
+
+
+def edge_weights(max_speed, eps, edge_strength, wind_direction, distance, rng):
+    """Vectorized incinerate.edge_weight (one uniform draw per edge)."""
+    edge_strength = np.asarray(edge_strength)
+    distance = np.asarray(distance, dtype=np.float64)
+    epss = np.where((edge_strength == 0) | (edge_strength == 1), 1.0, eps)
+    gamma = rng.uniform(0.01, 1, size=distance.shape) * max_speed * epss
+    tau = np.asarray(wind_direction, dtype=np.float64) * np.pi / 180
+    with np.errstate(divide='ignore', invalid='ignore'):
+        beta = np.maximum(2 / np.pi * np.arctan(gamma * np.cos(tau) / distance), 0.01)
+    beta = np.round(beta, 2)
+    return np.where(distance == 0, 0.01, beta)
+
+
+def edge_angles(p1, p2):
+    """Vectorized incinerate.get_angle for (n, 2) position arrays."""
+    dx = p2[:, 0] - p1[:, 0]
+    dy = p2[:, 1] - p1[:, 1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        angle = np.arctan(dy / dx) * 180 / np.pi
+    angle = np.where(dx < 0, angle + 180, angle)
+    return np.where(dx == 0, np.where(dy > 0, 90.0, 270.0), angle)
+
+
+class ArrayGraph:
+    """
+    Struct-of-arrays wildfire graph.
+
+    Args:
+        labels: Node labels (e.g. the 1-based ids of incinerate.py), sorted.
+        state, threshold, life, pos: Per-node arrays (pos is (n, 2)).
+        rows, cols: Grid cell of each node (for stats, snapshots and embers).
+        edge_u, edge_v: Undirected edges as node indices.
+        edge_w, edge_life: Per-edge weight and life.
+        ember_prob, ember_radius: Ember launch probability and search radius (cells).
+        threshold_noise, edge_noise: (low, high) multiplicative noise ranges.
+        rng: numpy Generator (seeded from entropy if None).
+    """
+
+    def __init__(self, labels, state, threshold, life, pos, rows, cols, edge_u, edge_v, edge_w, edge_life,
+                 ember_prob, ember_radius, threshold_noise, edge_noise, rng=None, edge_wind_dir=None):
+        self.labels = np.asarray(labels)
+        self.state = np.asarray(state, dtype=np.uint8).copy()
+        self.threshold = np.asarray(threshold, dtype=np.float32)
+        self.life = np.asarray(life, dtype=np.int8).copy()
+        self.pos = np.asarray(pos, dtype=np.float64)
+        self.rows = np.asarray(rows, dtype=np.int32)
+        self.cols = np.asarray(cols, dtype=np.int32)
+
+        edge_u = np.asarray(edge_u, dtype=np.int32)
+        edge_v = np.asarray(edge_v, dtype=np.int32)
+        swap = edge_u > edge_v
+        self.edge_u = np.where(swap, edge_v, edge_u)
+        self.edge_v = np.where(swap, edge_u, edge_v)
+        self.edge_w = np.asarray(edge_w, dtype=np.float32).copy()
+        self.edge_life = np.asarray(edge_life, dtype=np.int16).copy()
+        self.edge_color = np.zeros(self.n_edges, dtype=np.uint8)
+        self.edge_strength = np.zeros(self.n_edges, dtype=np.uint8)
+        self.edge_wind_dir = (np.zeros(self.n_edges, dtype=np.float32) if edge_wind_dir is None
+                              else np.asarray(edge_wind_dir, dtype=np.float32).copy())
+
+        self.ember_prob = ember_prob
+        self.ember_radius = ember_radius
+        self.threshold_noise = threshold_noise
+        self.edge_noise = edge_noise
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+        # Emptiness never changes: wind picks its centre from these
+        self.non_empty = self.state != EMPTY
+        self.non_empty_nodes = np.flatnonzero(self.non_empty)
+
+        self._build_csr()
+        self._build_cell_index()
+        self._init_front()
+        self._init_timers()
+
+    # --- construction helpers ---
+
+    @property
+    def n_nodes(self):
+        return self.state.size
+
+    @property
+    def n_edges(self):
+        return self.edge_u.size
+
+    def _build_csr(self):
+        """CSR adjacency over both edge directions, grouped by node."""
+        src = np.concatenate([self.edge_u, self.edge_v])
+        dst = np.concatenate([self.edge_v, self.edge_u])
+        edge_ids = np.concatenate([np.arange(self.n_edges, dtype=np.int32)] * 2)
+        order = np.lexsort((dst, src))   # rows by node, neighbours ascending
+        self.indices = dst[order]
+        self.csr_edge = edge_ids[order]
+        self.indptr = np.zeros(self.n_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=self.n_nodes), out=self.indptr[1:])
+        # Source node of each CSR entry, for vectorized gathers
+        self.csr_src = np.repeat(np.arange(self.n_nodes, dtype=np.int32), np.diff(self.indptr))
+        # Entries sorted by (source, neighbour): a searchable key for edge lookups
+        self._csr_key = self.csr_src.astype(np.int64) * self.n_nodes + self.indices
+
+    def _csr_entries(self, nodes):
+        """CSR entry indices of the adjacency rows of `nodes`."""
+        starts = self.indptr[nodes]
+        lengths = self.indptr[np.asarray(nodes) + 1] - starts
+        offsets = np.arange(int(lengths.sum())) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        return np.repeat(starts, lengths) + offsets
+
+    def _init_front(self):
+        """Burning-neighbour count and weight sum of every node, from scratch."""
+        self.active_neighbors = np.zeros(self.n_nodes, dtype=np.int32)
+        self.pressure = np.zeros(self.n_nodes, dtype=np.float64)
+        self._add_burning(np.flatnonzero(self.state == BURNING), 1)
+        self.unburnt = self.count(NOT_BURNT)
+
+    def _add_burning(self, nodes, sign):
+        """Add (sign=1) or remove (sign=-1) `nodes` as burning neighbours of their neighbours."""
+        entries = self._csr_entries(nodes)
+        neighbors = self.indices[entries]
+        np.add.at(self.active_neighbors, neighbors, sign)
+        np.add.at(self.pressure, neighbors, sign * self.edge_w[self.csr_edge[entries]].astype(np.float64))
+        if sign < 0:
+            # No rounding drift on nodes that left the front
+            self.pressure[neighbors[self.active_neighbors[neighbors] == 0]] = 0.0
+
+    def _build_cell_index(self):
+        """Dense grid of node indices (-1 where no node) for ember neighbourhoods."""
+        self.grid_shape = (int(self.rows.max()) + 1, int(self.cols.max()) + 1) if self.n_nodes else (0, 0)
+        self.cell_index = np.full(self.grid_shape, -1, dtype=np.int64)
+        self.cell_index[self.rows, self.cols] = np.arange(self.n_nodes)
+
+    def edge_ids(self, i, j):
+        """Undirected edge ids between node index arrays i and j (-1 where not adjacent)."""
+        key = np.asarray(i, dtype=np.int64) * self.n_nodes + np.asarray(j, dtype=np.int64)
+        if self._csr_key.size == 0:
+            return np.full(key.shape, -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self._csr_key, key), self._csr_key.size - 1)
+        return np.where(self._csr_key[pos] == key, self.csr_edge[pos], -1).astype(np.int64)
+
+    def edge_id(self, i, j):
+        """Undirected edge id between node indices i and j (KeyError if absent)."""
+        edge = int(self.edge_ids([i], [j])[0])
+        if edge < 0:
+            raise KeyError((i, j))
+        return edge
+
+    def to_networkx(self):
+        """Export to a networkx graph with the attribute names incinerate.py uses."""
+        g = nx.Graph()
+        for i, label in enumerate(self.labels.tolist()):
+            code = int(self.state[i])
+            g.add_node(label, threshold_switch=float(self.threshold[i]), color=NODE_COLORS[code],
+                       num_of_active_neighbors=int(self.active_neighbors[i]), fire_state=STATE_NAMES[code],
+                       life=int(self.life[i]), pos=tuple(self.pos[i]))
+        for e in range(self.n_edges):
+            g.add_edge(self.labels[self.edge_u[e]].item(), self.labels[self.edge_v[e]].item(),
+                       w=float(self.edge_w[e]), color=EDGE_COLORS[self.edge_color[e]], life=int(self.edge_life[e]),
+                       edge_strength=int(self.edge_strength[e]), wind_speed=0.01,
+                       wind_dir=float(self.edge_wind_dir[e]), eb=0)
+        return g
+
+    # --- checkpoints (graph_checkpoint.py) ---
+
+    def checkpoint_arrays(self):
+        """Everything a step changes: node and edge state, burnout buckets and the generator."""
+        burnout_step, burnout_node = flatten_buckets(self.burnout)
+        edge_burnout_step, edge_burnout_edge = flatten_buckets(self.edge_burnout)
+        return {
+            'state': self.state, 'life': self.life, 'pressure': self.pressure, 't': np.int64(self.t),
+            'edge_w': self.edge_w, 'edge_life': self.edge_life, 'edge_color': self.edge_color,
+            'edge_strength': self.edge_strength, 'edge_wind_dir': self.edge_wind_dir,
+            'burnout_step': burnout_step, 'burnout_node': burnout_node,
+            'edge_burnout_step': edge_burnout_step, 'edge_burnout_edge': edge_burnout_edge,
+            'np_random': generator_state(self.rng),
+        }
+
+    def restore_checkpoint(self, arrays):
+        """Resume from checkpoint_arrays() of a graph with the same nodes and edges."""
+        self.state[:] = arrays['state']
+        self.life[:] = arrays['life']
+        self.edge_w[:] = arrays['edge_w']
+        self.edge_life[:] = arrays['edge_life']
+        self.edge_color[:] = arrays['edge_color']
+        self.edge_strength[:] = arrays['edge_strength']
+        self.edge_wind_dir[:] = arrays['edge_wind_dir']
+        self._init_front()
+        self.pressure[:] = arrays['pressure']   # keeps the saved run's rounding
+        self.t = int(arrays['t'])
+        self.burnout, self.edge_burnout = {}, {}
+        self._schedule(self.burnout, arrays['burnout_step'], arrays['burnout_node'])
+        self._schedule(self.edge_burnout, arrays['edge_burnout_step'], arrays['edge_burnout_edge'])
+        restore_generator(self.rng, arrays['np_random'])
+
+    # --- counts ---
+
+    def count(self, code):
+        return int(np.count_nonzero(self.state == code))
+
+    def snapshot(self, shape=None):
+        """State codes painted on the node grid (what draw_forest_snapshot renders)."""
+        img = np.zeros(shape or self.grid_shape, dtype=np.uint8)
+        img[self.rows, self.cols] = self.state
+        return img
+
+    # --- one step (incinerate) ---
+
+    def _spread(self):
+        """Neighbour ignition trials; returns (ignited node indices, source node of each)."""
+        frontier = np.flatnonzero((self.active_neighbors > 0) & (self.state == NOT_BURNT))
+        th = self.threshold[frontier].astype(np.float64)
+        pressure = self.pressure[frontier]
+        certain = np.minimum(1.0, pressure * self.edge_noise[0]) >= th * self.threshold_noise[1]
+        possible = np.minimum(1.0, pressure * self.edge_noise[1]) >= th * self.threshold_noise[0]
+        trial_nodes = frontier[possible & ~certain]
+
+        # Certain ignitions are attributed to their lowest burning neighbour, like a first trial
+        certain_nodes = frontier[certain]
+        entries = self._csr_entries(certain_nodes)
+        entries = entries[self.state[self.indices[entries]] == BURNING]
+        owners, first = np.unique(self.csr_src[entries], return_index=True)
+        certain_sources = self.indices[entries[first]]
+
+        targets, sources = self._trials(trial_nodes)
+        return (np.concatenate([owners, targets]).astype(np.int64),
+                np.concatenate([certain_sources, sources]).astype(np.int64))
+
+    def _trials(self, nodes):
+        """k noisy trials for each of `nodes` (k = its burning neighbours)."""
+        # (unburnt target <- burning source) entries, grouped by target, sources ascending
+        entries = self._csr_entries(nodes)
+        entries = entries[self.state[self.indices[entries]] == BURNING]
+        if entries.size == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        targets = self.csr_src[entries]
+        uniq, starts, k = np.unique(targets, return_index=True, return_counts=True)
+        weights = self.edge_w[self.csr_edge[entries]].astype(np.float64)
+
+        # k trials per target, each over all k of its burning edges (k^2 draws)
+        trial_target = np.repeat(np.arange(uniq.size), k)
+        trial_k = k[trial_target]
+        trial_start = np.repeat(starts, k)
+        draws = int(trial_k.sum())
+        first_of_trial = np.zeros(trial_k.size, dtype=np.int64)
+        np.cumsum(trial_k[:-1], out=first_of_trial[1:])
+        offset = np.arange(draws) - np.repeat(first_of_trial, trial_k)
+        picks = np.repeat(trial_start, trial_k) + offset
+
+        noisy = weights[picks] * self.rng.uniform(*self.edge_noise, size=draws)
+        s = np.minimum(1.0, np.add.reduceat(noisy, first_of_trial))
+        ths = self.threshold[uniq[trial_target]] * self.rng.uniform(*self.threshold_noise, size=trial_k.size)
+        success = s >= ths
+
+        # Trial r of a target is attributed to its r-th burning neighbour (CSR order)
+        trial_source = self.indices[entries[trial_start + (np.arange(trial_k.size) - np.repeat(np.cumsum(k) - k, k))]]
+        hit_targets, first_hit = np.unique(trial_target[success], return_index=True)
+        sources = trial_source[np.flatnonzero(success)[first_hit]]
+        return uniq[hit_targets].astype(np.int64), sources.astype(np.int64)
+
+    def _embers(self, burning_nodes):
+        """Ember launches from this step's burning nodes; returns (ignited, sources)."""
+        launches = burning_nodes[self.rng.random(burning_nodes.size) < self.ember_prob]
+        if launches.size == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        if self.unburnt == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        # Ignitions are applied after the pass, so every ember sees the
+        # unburnt nodes left by neighbour ignition, as in incinerate()
+        ignited = {}
+        for b in launches:
+            target = self.ember_target(b)
+            if target >= 0 and self.rng.random() < 0.5 and target not in ignited:
+                ignited[target] = b
+        targets = np.array(list(ignited), dtype=np.int64)
+        self.state[targets] = BURNING
+        return targets, np.array(list(ignited.values()), dtype=np.int64)
+
+    def ember_target(self, node):
+        """
+        Where an ember from `node` lands: a random unburnt node within
+        ember_radius cells (an O(radius^2) lookup in the cell_index spatial
+        hash) or, 1 time in 10 when there is none, anywhere; -1 if neither.
+        """
+        r = self.ember_radius
+        h, w = self.grid_shape
+        row, col = self.rows[node], self.cols[node]
+        block = self.cell_index[max(0, row - r):min(h, row + r + 1), max(0, col - r):min(w, col + r + 1)]
+        nodes = block[block >= 0]
+        nodes = nodes[self.state[nodes] == NOT_BURNT]
+        if nodes.size == 0:
+            if self.rng.random() >= 0.1:
+                return -1
+            nodes = np.flatnonzero(self.state == NOT_BURNT)
+            if nodes.size == 0:
+                return -1
+        return int(nodes[self.rng.integers(nodes.size)])
+
+    def _color_edges(self, sources, targets):
+        """Colour the igniting edges orange (embers may jump between non-adjacent nodes)."""
+        edges = self.edge_ids(sources, targets)
+        edges = edges[edges >= 0]
+        self.edge_color[edges] = EDGE_ORANGE
+        self._schedule(self.edge_burnout, self.t + self.edge_life[edges].astype(np.int64), edges)
+
+    # --- burnout timers ---
+
+    def _init_timers(self):
+        """
+        Bucketed burnout queues keyed by step: a node (orange edge) with
+        life L at step t burns out at step t + L, the step at which the
+        per-step countdown would take it below zero. 'life' keeps its value
+        while burning and is set to -1 at burnout.
+        """
+        self.t = 0
+        self.burnout = {}
+        self.edge_burnout = {}
+        burning = np.flatnonzero(self.state == BURNING)
+        self._schedule(self.burnout, self.life[burning].astype(np.int64), burning)
+        orange = np.flatnonzero(self.edge_color == EDGE_ORANGE)
+        self._schedule(self.edge_burnout, self.edge_life[orange].astype(np.int64), orange)
+
+    @staticmethod
+    def _schedule(queue, when, items):
+        if items.size == 0:
+            return
+        order = np.argsort(when, kind='stable')
+        steps, starts = np.unique(when[order], return_index=True)
+        for step, chunk in zip(steps.tolist(), np.split(items[order], starts[1:])):
+            queue.setdefault(step, []).append(chunk)
+
+    def _due(self, queue):
+        chunks = queue.pop(self.t, None)
+        return np.unique(np.concatenate(chunks)) if chunks else np.empty(0, dtype=np.int64)
+
+    def step(self, stats=None):
+        """
+        One incinerate() step: spread, embers, then this step's node and
+        edge burnouts (with burnt-edge colouring).
+
+        Returns:
+            ndarray: Indices of the nodes that ignited this step.
+        """
+        burning_nodes = np.flatnonzero(self.state == BURNING)
+
+        spread_targets, spread_sources = self._spread()
+        self.state[spread_targets] = BURNING
+        self._color_edges(spread_sources, spread_targets)
+
+        ember_targets, ember_sources = self._embers(burning_nodes)
+        self._color_edges(ember_sources, ember_targets)
+        ignited = np.concatenate([spread_targets, ember_targets])
+
+        self._add_burning(ignited, 1)
+        self.unburnt -= ignited.size
+        if stats is not None and ignited.size:
+            stats.ignite(self.rows[ignited], self.cols[ignited])
+
+        self._schedule(self.burnout, self.t + self.life[ignited].astype(np.int64), ignited)
+
+        # lifeline_update: this step's burnout bucket
+        burnt_out = self._due(self.burnout)
+        burnt_out = burnt_out[self.state[burnt_out] == BURNING]
+        self.state[burnt_out] = BURNT
+        self.life[burnt_out] = -1
+        self._add_burning(burnt_out, -1)
+        if stats is not None:
+            stats.burn_out(int(burnt_out.size))
+        # Edges touching burnt nodes turn brown, once
+        self.edge_color[self.csr_edge[self._csr_entries(burnt_out)]] = EDGE_BROWN
+
+        # life_edge_update: this step's orange-edge bucket
+        expired = self._due(self.edge_burnout)
+        expired = expired[self.edge_color[expired] == EDGE_ORANGE]
+        self.edge_color[expired] = EDGE_BROWN
+        self.edge_life[expired] = -1
+
+        self.t += 1
+        return ignited
+
+    # --- wind (simulate_wind) ---
+
+    def simulate_wind(self, max_speed, epsilon, grid_size, dist_scale=30):
+        """Vectorized simulate_wind; returns (center position, a, b) or (None, 0, 0)."""
+        non_empty = self.non_empty_nodes
+        self.last_wind_edges = np.empty(0, dtype=np.int64)
+        if non_empty.size == 0:
+            return (None, 0, 0)
+
+        rng = self.rng
+        center = non_empty[rng.integers(non_empty.size)]
+        a = b = 0
+        while a == b:
+            a = int(rng.integers(1, 5))
+            b = int(rng.integers(1, 5))
+        c_max = max(a, b) - 1
+        c = int(rng.integers(1, c_max + 1)) * int(rng.choice([-1, 1])) if c_max > 0 else 0
+
+        cell_scale = 100.0 / grid_size
+        scaled_a = a * cell_scale * 5
+        scaled_b = b * cell_scale * 5
+        cx, cy = self.pos[center]
+        inside = self.non_empty & (
+            (self.pos[:, 0] - cx) ** 2 / scaled_a ** 2 + (self.pos[:, 1] - cy) ** 2 / scaled_b ** 2 <= 1
+        )
+
+        # The focus is `c` columns (a > b) or `c` rows away in label space
+        focus_label = self.labels[center] + (grid_size * c if a > b else c)
+        f = np.searchsorted(self.labels, focus_label)
+        focus = center
+        if 0 <= f < self.n_nodes and self.labels[f] == focus_label and self.state[f] != EMPTY:
+            focus = f
+        fx, fy = self.pos[focus]
+
+        # Each edge with both ends inside, once (from its lower endpoint's row)
+        entries = self._csr_entries(np.flatnonzero(inside))
+        entries = entries[inside[self.indices[entries]] & (self.csr_src[entries] < self.indices[entries])]
+        edges = self.csr_edge[entries]
+        p1, p2 = self.pos[self.edge_u[edges]], self.pos[self.edge_v[edges]]
+        if a > b:
+            angle = np.where((p1[:, 0] > fx) & (p2[:, 0] > fx), 0.0, 180.0)
+        else:
+            angle = np.where((p1[:, 1] > fy) & (p2[:, 1] > fy), 90.0, 270.0)
+        distance = np.hypot(*(p2 - p1).T) * dist_scale
+
+        new_w = edge_weights(max_speed, epsilon, 1, angle, distance, rng).astype(np.float32)
+        # Move the burning-neighbour weight sums with the changed weights
+        dw = new_w.astype(np.float64) - self.edge_w[edges]
+        u, v = self.edge_u[edges], self.edge_v[edges]
+        np.add.at(self.pressure, v, dw * (self.state[u] == BURNING))
+        np.add.at(self.pressure, u, dw * (self.state[v] == BURNING))
+        self.edge_w[edges] = new_w
+        self.edge_wind_dir[edges] = angle
+        self.edge_strength[edges] = 1
+        self.last_wind_edges = edges
+        return (tuple(self.pos[center]), a, b)
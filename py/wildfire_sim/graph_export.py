@@ -0,0 +1,203 @@
+"""
+graph_export.py
+---------------------------------------------
+Typed, columnar export of graph-model node and edge state.
+
+A graph (networkx attribute dicts or an ArrayGraph) is flattened into one
+array per attribute: node order as in the graph, edge order as edge_list.
+States and edge colours are dictionary-encoded as uint8 codes whose names
+are stored in the metadata.
+
+    export_graph()          one snapshot as a single .npz
+    GraphHistoryWriter      a run's history under graph_history/: static
+                            columns (node ids, positions, edge endpoints) once,
+                            and one (timesteps, nodes|edges) .npy per recorded
+                            column, filled a row per step through open_memmap
+    load_graph_history()    memory-maps that history back, so a 1000-step
+                            run is sliced without being read in full
+
+graph_history/graph_history.json lists the columns, their dtypes and the
+number of steps written.
+"""
+
+import os
+import json
+import logging
+import numpy as np
+
+from wildfire_sim.graph_engine import ArrayGraph, STATE_NAMES, STATE_CODES, EDGE_COLORS, EDGE_COLOR_CODES
+
+logger = logging.getLogger(__name__)
+
+GRAPH_HISTORY_DIRNAME = "graph_history"
+GRAPH_HISTORY_METADATA = "graph_history.json"
+
+# column -> (networkx attribute, dtype, ArrayGraph attribute)
+NODE_COLUMNS = {
+    'state': ('fire_state', np.uint8, 'state'),
+    'life': ('life', np.int16, 'life'),
+    'threshold': ('threshold_switch', np.float32, 'threshold'),
+    'active_neighbors': ('num_of_active_neighbors', np.int32, 'active_neighbors'),
+}
+EDGE_COLUMNS = {
+    'edge_w': ('w', np.float32, 'edge_w'),
+    'edge_color': ('color', np.uint8, 'edge_color'),
+    'edge_life': ('life', np.int16, 'edge_life'),
+    'edge_strength': ('edge_strength', np.uint8, 'edge_strength'),
+    'edge_wind_dir': ('wind_dir', np.float32, 'edge_wind_dir'),
+}
+# Dictionary-encoded columns and their code -> name tables
+ENCODINGS = {'state': (STATE_CODES, STATE_NAMES), 'edge_color': (EDGE_COLOR_CODES, EDGE_COLORS)}
+
+
+def static_columns(g, edge_list=None):
+    """Node ids, positions and edge endpoints (node ids)."""
+    if isinstance(g, ArrayGraph):
+        return {'node_id': g.labels, 'pos': g.pos,
+                'edge_u': g.labels[g.edge_u], 'edge_v': g.labels[g.edge_v]}
+    edges = np.array(edge_list if edge_list is not None else list(g.edges), dtype=np.int64).reshape(-1, 2)
+    return {
+        'node_id': np.array(list(g.nodes), dtype=np.int64),
+        'pos': np.array([p for _, p in g.nodes(data='pos')], dtype=np.float64).reshape(-1, 2),
+        'edge_u': edges[:, 0],
+        'edge_v': edges[:, 1],
+    }
+
+
+def graph_columns(g, names, edge_list=None):
+    """
+    The node / edge columns `names` (keys of NODE_COLUMNS / EDGE_COLUMNS)
+    of a networkx graph or an ArrayGraph, as typed arrays.
+    """
+    columns = {}
+    if isinstance(g, ArrayGraph):
+        for name in names:
+            _, dtype, attr = NODE_COLUMNS.get(name) or EDGE_COLUMNS[name]
+            columns[name] = getattr(g, attr).astype(dtype, copy=False)
+        return columns
+
+    edges = None
+    for name in names:
+        if name in NODE_COLUMNS:
+            attr, dtype, _ = NODE_COLUMNS[name]
+            values = [data[attr] for _, data in g.nodes(data=True)]
+        else:
+            if edges is None:
+                edges = [g[p][q] for p, q in edge_list] if edge_list is not None else [d for *_, d in g.edges(data=True)]
+            attr, dtype, _ = EDGE_COLUMNS[name]
+            values = [data[attr] for data in edges]
+        if name in ENCODINGS:
+            values = [ENCODINGS[name][0][v] for v in values]
+        columns[name] = np.array(values, dtype=dtype)
+    return columns
+
+
+def encodings():
+    return {name: list(table) for name, (_, table) in ENCODINGS.items()}
+
+
+def export_graph(g, path, edge_list=None):
+    """Write every node / edge column of `g` to one .npz (replaces the pandas CSV dumps)."""
+    columns = static_columns(g, edge_list)
+    columns.update(graph_columns(g, list(NODE_COLUMNS) + list(EDGE_COLUMNS), edge_list))
+    np.savez(path, encodings=np.array(json.dumps(encodings())), **columns)
+
+
+class GraphHistoryWriter:
+    """
+    Records columns of a graph every step into graph_history/<column>.npy.
+
+    Each per-step file is a (max_steps, nodes|edges) array created with
+    open_memmap, so writing a step is one row copy; rows past the last
+    written step stay zero. With `append` (a resumed run) an existing
+    history is reopened and extended, and grown if the run now has more
+    steps; otherwise it is replaced.
+    """
+
+    def __init__(self, output_dir, g, max_steps, columns, edge_list=None, append=False):
+        self.directory = os.path.join(output_dir, GRAPH_HISTORY_DIRNAME)
+        os.makedirs(self.directory, exist_ok=True)
+        self.max_steps = max_steps
+        self.columns = tuple(columns)
+        self.edge_list = edge_list
+        self.steps = 0
+        self._arrays = {}
+        self._recorded = {}     # columns of an earlier (resumed) session
+        self.append = append
+
+        metadata_path = os.path.join(self.directory, GRAPH_HISTORY_METADATA)
+        if append and os.path.exists(metadata_path):
+            with open(metadata_path) as f:
+                metadata = json.load(f)
+            self.steps = metadata['timesteps']
+            self._recorded = metadata['columns']
+        for name, values in static_columns(g, edge_list).items():
+            np.save(os.path.join(self.directory, f"{name}.npy"), values)
+
+    def _array(self, name, values):
+        array = self._arrays.get(name)
+        if array is None:
+            path = os.path.join(self.directory, f"{name}.npy")
+            if self.append and os.path.exists(path):
+                array = np.lib.format.open_memmap(path, mode='r+')
+                if array.shape[1:] != (values.size,) or array.dtype != values.dtype:
+                    raise ValueError(f"{path} does not match this run's graph.")
+                if array.shape[0] < self.max_steps:
+                    array = self._grow(path, array)
+            else:
+                array = np.lib.format.open_memmap(path, mode='w+', dtype=values.dtype,
+                                                  shape=(self.max_steps, values.size))
+            self._arrays[name] = array
+        return array
+
+    def _grow(self, path, array):
+        """Copy a history file into one with max_steps rows (a run resumed with more TIMESTEPS)."""
+        tmp_path = path + ".tmp"
+        grown = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=array.dtype,
+                                          shape=(self.max_steps,) + array.shape[1:])
+        grown[:array.shape[0]] = array
+        grown.flush()
+        del array, grown
+        os.replace(tmp_path, path)
+        return np.lib.format.open_memmap(path, mode='r+')
+
+    def write(self, timestep, g):
+        """Record the columns of `g` as row `timestep`."""
+        for name, values in graph_columns(g, self.columns, self.edge_list).items():
+            self._array(name, values)[timestep] = values
+        self.steps = max(self.steps, timestep + 1)
+
+    def close(self):
+        for array in self._arrays.values():
+            array.flush()
+        metadata = {
+            'timesteps': self.steps,
+            'max_steps': max([self.max_steps] + [array.shape[0] for array in self._arrays.values()]),
+            'columns': {**self._recorded, **{name: str(array.dtype) for name, array in self._arrays.items()}},
+            'encodings': encodings(),
+        }
+        with open(os.path.join(self.directory, GRAPH_HISTORY_METADATA), 'w') as f:
+            json.dump(metadata, f, indent=2)
+        self._arrays.clear()
+        logger.info(f"  Saved graph history ({self.steps} steps, {', '.join(self.columns)}) to {self.directory}")
+
+
+def load_graph_history(output_dir, mmap_mode='r'):
+    """
+    Memory-map a run's graph history.
+
+    Returns:
+        tuple: (metadata dict, {column: array}); per-step columns are
+        (timesteps, nodes|edges) views of the memory-mapped files.
+    """
+    directory = os.path.join(output_dir, GRAPH_HISTORY_DIRNAME)
+    with open(os.path.join(directory, GRAPH_HISTORY_METADATA)) as f:
+        metadata = json.load(f)
+    columns = {}
+    for filename in sorted(os.listdir(directory)):
+        name, ext = os.path.splitext(filename)
+        if ext != '.npy':
+            continue
+        array = np.load(os.path.join(directory, filename), mmap_mode=mmap_mode)
+        columns[name] = array[:metadata['timesteps']] if name in metadata['columns'] else array
+    return metadata, columns
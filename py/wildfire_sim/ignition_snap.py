@@ -0,0 +1,93 @@
+"""
+ignition_snap.py
+---------------------------------------------
+Snaps ignition points to the nearest forest pixel.
+
+For each county raster we compute, once, a Euclidean distance transform of
+the non-forest mask with index output: every pixel stores the (row, col) of
+its nearest forest pixel. Snapping a click is then a single array lookup.
+The index arrays are kept in a small per-raster LRU cache.
+"""
+
+import os
+import math
+import logging
+from threading import Lock
+from collections import OrderedDict
+import numpy as np
+from scipy.ndimage import distance_transform_edt
+
+try:
+    from config import IGNITION_SNAP_CACHE_SIZE
+except ImportError:
+    IGNITION_SNAP_CACHE_SIZE = 4
+
+logger = logging.getLogger(__name__)
+
+_cache = OrderedDict()
+_lock = Lock()
+
+
+def _build_nearest_index(forest_mask):
+    """(2, H, W) array of the nearest forest pixel's (row, col) for every pixel."""
+    indices = distance_transform_edt(~forest_mask, return_distances=False, return_indices=True)
+    # Halve the memory footprint when the raster is small enough
+    if max(forest_mask.shape) <= np.iinfo(np.uint16).max:
+        indices = indices.astype(np.uint16)
+    return indices
+
+
+def nearest_forest_index(raster_path, grid, forest_value):
+    """
+    Return the cached nearest-forest index for `raster_path`, building it from
+    `grid` on a miss. Entries are keyed by path and modification time, so an
+    updated raster gets a fresh transform.
+    """
+    key = (os.path.abspath(raster_path), os.path.getmtime(raster_path))
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    forest_mask = (grid == forest_value)
+    if not forest_mask.any():
+        raise ValueError(f"Raster {raster_path} contains no forest pixels to ignite.")
+
+    logger.info(f"  Building nearest-forest index for {os.path.basename(raster_path)} {grid.shape}...")
+    indices = _build_nearest_index(forest_mask)
+
+    with _lock:
+        # Drop stale entries for the same file, then bound the cache size
+        for stale in [k for k in _cache if k[0] == key[0]]:
+            del _cache[stale]
+        _cache[key] = indices
+        while len(_cache) > IGNITION_SNAP_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return indices
+
+
+def snap_to_forest(raster_path, grid, row, col, forest_value, max_radius_px):
+    """
+    Snap (row, col) to the nearest forest pixel within `max_radius_px`.
+
+    Returns:
+        tuple: (row, col, distance_px) of the snapped pixel.
+
+    Raises:
+        ValueError: If no forest pixel lies within the radius.
+    """
+    if grid[row, col] == forest_value:
+        return row, col, 0.0
+
+    indices = nearest_forest_index(raster_path, grid, forest_value)
+    snapped_row = int(indices[0, row, col])
+    snapped_col = int(indices[1, row, col])
+    distance = math.hypot(snapped_row - row, snapped_col - col)
+
+    if distance > max_radius_px:
+        raise ValueError(
+            f"No forest pixel within {max_radius_px} px of pixel {row, col}; "
+            f"nearest is {distance:.1f} px away at {snapped_row, snapped_col}."
+        )
+    logger.info(f"  Snapped ignition from {row, col} to forest pixel {snapped_row, snapped_col} ({distance:.1f} px)")
+    return snapped_row, snapped_col, distance
@@ -1,18 +1,41 @@
 import os
 import time
+import json
 import numpy as np
 import matplotlib.pyplot as plt
-from config import OUTPUT_BASE, ROOSEVELT_FOREST_COVER_CSV
+from config import WILDFIRE_OUTPUT_BASE, ROOSEVELT_FOREST_COVER_CSV
 import pandas as pd
 import random as rnd
 import networkx as nx
 import logging
 import matplotlib
 matplotlib.use('Agg')
-from matplotlib.path import Path
 from matplotlib.colors import ListedColormap
 # import create_forest
 from wildfire_sim.create_forest import get_point_in_forest
+from wildfire_sim.fire_stats import FireStatsTracker
+from wildfire_sim.graph_engine import (
+    ArrayGraph, EMPTY, NOT_BURNT, BURNING, BURNT, STATE_NAMES, STATE_CODES, NODE_COLORS,
+    EDGE_COLORS, EDGE_COLOR_CODES, edge_weights, edge_angles,
+)
+from wildfire_sim.event_engine import EventEngine
+from wildfire_sim.graph_checkpoint import (
+    save_graph_checkpoint, load_graph_checkpoint, restore_random,
+    flatten_buckets, generator_state, restore_generator,
+)
+from wildfire_sim.graph_export import GraphHistoryWriter
+from wildfire_sim.graph_cache import graph_cache_key, load_prebuilt_graph, save_prebuilt_graph
+
+try:
+    from config import (
+        GRAPH_ENGINE, GRAPH_CHECKPOINT_INTERVAL, GRAPH_HISTORY_COLUMNS, GRAPH_CACHE_DIR, GRAPH_DENSITY_SEED,
+    )
+except ImportError:
+    GRAPH_ENGINE = "networkx"
+    GRAPH_CHECKPOINT_INTERVAL = 10
+    GRAPH_HISTORY_COLUMNS = ()
+    GRAPH_CACHE_DIR = None
+    GRAPH_DENSITY_SEED = None
 
 # =========================================================================
 # User-configurable Parameters
@@ -31,9 +54,12 @@ EDGE_WEIGHT_NOISE_LOW = 0.6
 EDGE_WEIGHT_NOISE_HIGH = 1.6
 TIMESTEPS = 100             # Reduced for faster test runs; old file had 1000
 IGNITION_POINT = "random"
+CELL_SIZE_M = 30            # ground size of one graph cell (covtype.csv rows are 30 m x 30 m)
 
 logger = logging.getLogger(__name__)
 
+GRAPH_ENGINES = ("networkx", "arrays", "events")
+
 # --- Simple color mapping for raster output ---
 # (0,0) is bottom-left
 CUSTOM_CMAP = ListedColormap([
@@ -100,22 +126,194 @@ def get_direction(a):
     if a < 292.5: return 'W'
     return 'NW'
 
-def lifeline_update(g, colors):
-    for node in g.nodes():
+def fire_front(g):
+    """
+    Incremental ignition bookkeeping kept in g.graph['fire_front']:
+    the set of burning nodes, each node's count and summed edge weight of
+    burning neighbours, and the frontier (unburnt nodes with a burning
+    neighbour). Built on first use; set_burning / set_burnt /
+    set_edge_weight keep it current so a step only touches transitions.
+
+    Burnout is event-driven too: a node igniting (or an edge turning
+    orange) at step t with life L is put in the bucket of step t + L of
+    front['burnout'] (front['edge_burnout']), the step at which the
+    per-step countdown would take it below zero. 'life' keeps its value
+    while burning and is set to -1 at burnout.
+    """
+    front = g.graph.get('fire_front')
+    if front is None:
+        front = {'burning': set(), 'count': dict.fromkeys(g.nodes, 0),
+                 'weight': dict.fromkeys(g.nodes, 0.0), 'frontier': set(),
+                 'step': 0, 'burnout': {}, 'edge_burnout': {}}
+        g.graph['fire_front'] = front
+        for node in g.nodes:
+            g.nodes[node]['num_of_active_neighbors'] = 0
+        for node in [n for n in g.nodes if g.nodes[n]['fire_state'] == 'burning']:
+            _add_burning(g, front, node)
+        for p, q, data in g.edges(data=True):
+            if data.get('color') == 'orange':
+                front['edge_burnout'].setdefault(data['life'], []).append((p, q))
+    return front
+
+def _add_burning(g, front, node):
+    front['burning'].add(node)
+    front['burnout'].setdefault(front['step'] + g.nodes[node]['life'], []).append(node)
+    front['frontier'].discard(node)
+    for nb in g.neighbors(node):
+        front['count'][nb] += 1
+        front['weight'][nb] += g[node][nb].get('w', 0)
+        g.nodes[nb]['num_of_active_neighbors'] = front['count'][nb]
+        if g.nodes[nb]['fire_state'] == 'not_burnt':
+            front['frontier'].add(nb)
+
+def extend_fire_front(g, nodes, edges):
+    """
+    Registers nodes and edges added to g after its fire front was built (a
+    graph materialized around the fire): each new edge to a burning node
+    counts towards the other end. A no-op before the front exists.
+    """
+    front = g.graph.get('fire_front')
+    if front is None:
+        return
+    for node in nodes:
+        front['count'].setdefault(node, 0)
+        front['weight'].setdefault(node, 0.0)
+    for p, q in edges:
+        for src, nb in ((p, q), (q, p)):
+            if src in front['burning']:
+                front['count'][nb] += 1
+                front['weight'][nb] += g[src][nb].get('w', 0)
+                g.nodes[nb]['num_of_active_neighbors'] = front['count'][nb]
+                if g.nodes[nb]['fire_state'] == 'not_burnt':
+                    front['frontier'].add(nb)
+
+def set_burning(g, node, colors):
+    g.nodes[node]['fire_state'] = 'burning'
+    g.nodes[node]['color'] = 'orange'
+    if 0 <= node - 1 < len(colors):
+        colors[node - 1] = 'orange'
+    _add_burning(g, fire_front(g), node)
+    if 'ember_index' in g.graph:
+        g.graph['ember_index'].discard(node)
+
+class EmberIndex:
+    """
+    Uniform-grid spatial hash of the unburnt nodes for ember targeting.
+
+    Buckets are `radius` cells wide, so every node within the Chebyshev
+    radius of a point lies in the 3x3 buckets around it. Removals are
+    deferred until flush(), so an ember pass samples from the same
+    candidates as the unburnt-node snapshot it replaces.
+    """
+
+    def __init__(self, g, cell_scale, radius):
+        self.cell_scale = cell_scale
+        self.radius = radius
+        self.bucket_size = cell_scale * radius
+        self.buckets = {}
+        self.nodes = []     # dense list for uniform sampling over all candidates
+        self.slots = {}     # node -> index in self.nodes
+        self.keys = {}      # node -> bucket key
+        self.pending = []
+        for node, data in g.nodes(data=True):
+            if data['fire_state'] == 'not_burnt':
+                self.slots[node] = len(self.nodes)
+                self.nodes.append(node)
+                self.keys[node] = self._key(data['pos'])
+                self.buckets.setdefault(self.keys[node], {})[node] = data['pos']
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def _key(self, pos):
+        return (int(np.floor(pos[0] / self.bucket_size)), int(np.floor(pos[1] / self.bucket_size)))
+
+    def discard(self, node):
+        self.pending.append(node)
+
+    def flush(self):
+        for node in self.pending:
+            slot = self.slots.pop(node, None)
+            if slot is None:
+                continue
+            last = self.nodes.pop()
+            if last != node:
+                self.nodes[slot] = last
+                self.slots[last] = slot
+            del self.buckets[self.keys.pop(node)][node]
+        self.pending = []
+
+    def near(self, pos):
+        """Nodes within `radius` cells (Chebyshev) of pos."""
+        bx, by = pos
+        kx, ky = self._key(pos)
+        found = []
+        for i in (kx - 1, kx, kx + 1):
+            for j in (ky - 1, ky, ky + 1):
+                for node, (x, y) in self.buckets.get((i, j), {}).items():
+                    if abs(x - bx) / self.cell_scale <= self.radius and abs(y - by) / self.cell_scale <= self.radius:
+                        found.append(node)
+        return found
+
+    def sample(self):
+        """A uniformly random node of the index."""
+        return self.nodes[rnd.randrange(len(self.nodes))]
+
+def set_burnt(g, node, colors):
+    front = fire_front(g)
+    g.nodes[node]['fire_state'] = 'burnt'
+    g.nodes[node]['color'] = 'brown'
+    if 0 <= node - 1 < len(colors):
+        colors[node - 1] = 'brown'
+    front['burning'].discard(node)
+    for nb in g.neighbors(node):
+        g[node][nb]['color'] = 'brown'
+        front['count'][nb] -= 1
+        front['weight'][nb] -= g[node][nb].get('w', 0)
+        g.nodes[nb]['num_of_active_neighbors'] = front['count'][nb]
+        if front['count'][nb] == 0:
+            front['weight'][nb] = 0.0
+            front['frontier'].discard(nb)
+
+def set_edge_burning(g, n1, n2):
+    """Colour the edge a fire crossed orange and schedule it to turn brown."""
+    front = fire_front(g)
+    g[n1][n2]['color'] = 'orange'
+    front['edge_burnout'].setdefault(front['step'] + g[n1][n2]['life'], []).append((n1, n2))
+
+def set_edge_weight(g, n1, n2, w, data=None):
+    """
+    Change an edge weight, moving the burning-neighbour sums with it.
+    `data` is the edge's attribute dict, if the caller already has it.
+    """
+    front = fire_front(g)
+    data = g[n1][n2] if data is None else data
+    dw = w - data.get('w', 0)
+    data['w'] = w
+    if n1 in front['burning']:
+        front['weight'][n2] += dw
+    if n2 in front['burning']:
+        front['weight'][n1] += dw
+
+def lifeline_update(g, colors, stats=None):
+    """Burn out the nodes whose life runs out this step (this step's burnout bucket)."""
+    front = fire_front(g)
+    burnt_out = 0
+    for node in sorted(front['burnout'].pop(front['step'], [])):
         if g.nodes[node]['fire_state'] == 'burning':
-            g.nodes[node]['life'] -= 1
-            if g.nodes[node]['life'] < 0:
-                g.nodes[node]['fire_state'] = 'burnt'
-                g.nodes[node]['color'] = 'brown'
-                if 0 <= node -1 < len(colors):
-                    colors[node - 1] = 'brown'
-
-def life_edge_update(g, edge_list):
-    for p, q in edge_list:
-        if g.has_edge(p,q) and g[p][q]['color'] == 'orange':
-            g[p][q]['life'] -= 1
-            if g[p][q]['life'] < 0:
-                g[p][q]['color'] = 'brown'
+            burnt_out += 1
+            g.nodes[node]['life'] = -1
+            set_burnt(g, node, colors)
+    if stats is not None:
+        stats.burn_out(burnt_out)
+
+def life_edge_update(g):
+    """Turn brown the orange edges whose life runs out this step."""
+    front = fire_front(g)
+    for p, q in front['edge_burnout'].pop(front['step'], []):
+        if g[p][q]['color'] == 'orange':
+            g[p][q]['life'] = -1
+            g[p][q]['color'] = 'brown'
 
 def node_threshold(slope, elevation, ele_min, ele_max, aspect, aspect_dict):
     phi = np.tan(slope * np.pi / 180)
@@ -130,10 +328,42 @@ def node_threshold(slope, elevation, ele_min, ele_max, aspect, aspect_dict):
     theta = theta * THETA_FACTOR
     return round(theta, 2)
 
-def update_active_neighbors(g):
-    for itemm in g.nodes():
-        num = sum(1 for item in g.neighbors(itemm) if g.has_node(item) and g.nodes[item]['fire_state'] == 'burning')
-        g.nodes[itemm]['num_of_active_neighbors'] = num
+def node_thresholds(slope, elevation, ele_min, ele_max, aspect, aspect_dict):
+    """node_threshold over arrays of slope / elevation / aspect."""
+    phi = np.tan(np.asarray(slope, dtype=float) * np.pi / 180)
+    phi_s = 5.275 * phi ** 2
+    if ele_max > ele_min:
+        h = (np.asarray(elevation, dtype=float) - ele_min) / (ele_max - ele_min) * 2300
+    else:
+        h = np.zeros_like(phi)
+    h_prime = h * np.exp(-6)
+    xi = 1 / (1 + np.log(np.maximum(h_prime, 1)))
+    # get_direction's eight 45-degree sectors, N first
+    sectors = np.array([aspect_dict[d] for d in ('N', 'NE', 'E', 'SE', 'S', 'SW', 'W', 'NW')])
+    alpha = sectors[((np.asarray(aspect, dtype=float) + 22.5) % 360 // 45).astype(int)]
+    theta = -np.arctan(phi_s * xi * alpha) / np.pi + 0.5
+    return np.round(theta * THETA_FACTOR, 2)
+
+def grid_edge_pairs(occupied, grid_size):
+    """
+    Edges between occupied nodes of the column-by-column grid (node_id_to_grid)
+    that lie within 1.42 cells: the 8-neighbourhood. Returns 1-based (n1, n2)
+    arrays with n1 < n2, in the order of the pairwise scan they replace.
+    """
+    n = occupied.size
+    ids = np.arange(1, n + 1)
+    rows, _ = node_id_to_grid(ids, grid_size)
+    n1, n2 = [], []
+    # (id offset, row step): up, right, up-right, down-right
+    for offset, drow in ((1, 1), (grid_size, 0), (grid_size + 1, 1), (grid_size - 1, -1)):
+        other = ids + offset
+        ok = (other <= n) & (rows + drow >= 0) & (rows + drow < grid_size)
+        ok[ok] &= occupied[ids[ok] - 1] & occupied[other[ok] - 1]
+        n1.append(ids[ok])
+        n2.append(other[ok])
+    n1, n2 = np.concatenate(n1), np.concatenate(n2)
+    order = np.lexsort((n2, n1))
+    return n1[order], n2[order]
 
 def node_id_to_grid(node_id, grid_size):
     # Node IDs are 1-based
@@ -143,88 +373,194 @@ def node_id_to_grid(node_id, grid_size):
     row = (node_id - 1) % grid_size    # which row (bottom→top)
     return row, col
 
-def incinerate(g, colors, edge_list):
+def frontier_ignitions(g, front, edge_noise, threshold_noise):
+    """
+    The (node, burning neighbour) pairs of the frontier nodes that ignite
+    this step. Each unburnt node gets one trial per burning neighbour, with
+    edge weights and its threshold scaled by fresh uniform noise in the
+    (low, high) ranges `edge_noise` / `threshold_noise`; its burning-neighbour
+    weight sum bounds s, so trials it decides draw no random numbers.
+    """
+    edge_low, edge_high = edge_noise
+    threshold_low, threshold_high = threshold_noise
+    nodes_to_ignite = []
+    for nb in sorted(front['frontier']):
+        active_neighbors = sorted(b for b in g.neighbors(nb) if b in front['burning'])
+        ths = g.nodes[nb]['threshold_switch']
+        weight = front['weight'][nb]
+        if min(1, weight * edge_low) >= ths * threshold_high:
+            nodes_to_ignite.append((nb, active_neighbors[0]))   # every trial succeeds
+            continue
+        if min(1, weight * edge_high) < ths * threshold_low:
+            continue                                            # no trial can succeed
+
+        for ignition_node in active_neighbors:
+            s = 0
+            for burning_nb in active_neighbors:
+                w = g[burning_nb][nb].get('w', 0)
+                # add stochasticity to each contributing edge weight
+                w_eff = w * rnd.uniform(edge_low, edge_high)
+                s = min(1, s + w_eff)
+
+            # Apply noise to threshold
+            ths_eff = ths * rnd.uniform(threshold_low, threshold_high)
+
+            if s >= ths_eff:
+                nodes_to_ignite.append((nb, ignition_node))
+                break
+    return nodes_to_ignite
+
+def incinerate(g, colors, edge_list, stats=None):
     # cell scale (grid unit) based on global NODES so ember distances can be computed
     grid_size = int(np.ceil(np.sqrt(g.number_of_nodes())))
     cell_scale = 100.0 / grid_size # Scale based on 100x100 unit area
     
-    burning_nodes = get_burning(g, [n for n in g.nodes])
-    nodes_to_ignite = []
-
-    for ignition_node in burning_nodes:
-        for nb in g.neighbors(ignition_node):
-            if g.nodes[nb]['fire_state'] == 'not_burnt':
-                active_neighbors = get_burning(g, list(g.neighbors(nb)))
-                s = 0
-                for burning_nb in active_neighbors:
-                    if g.has_edge(burning_nb, nb):
-                        w = g.get_edge_data(burning_nb, nb).get('w', 0)
-                        # add stochasticity to each contributing edge weight
-                        w_eff = w * rnd.uniform(EDGE_WEIGHT_NOISE_LOW, EDGE_WEIGHT_NOISE_HIGH)
-                        s = min(1, s + w_eff)
-                
-                # Apply noise to threshold
-                ths = g.nodes[nb]['threshold_switch']
-                ths_eff = ths * rnd.uniform(THRESHOLD_NOISE_LOW, THRESHOLD_NOISE_HIGH)
-
-                if s >= ths_eff:
-                    nodes_to_ignite.append((nb, ignition_node))
+    front = fire_front(g)
+    burning_nodes = sorted(front['burning'])
+    ignited = []  # nodes that caught fire this step (for stats)
 
+    nodes_to_ignite = frontier_ignitions(g, front, (EDGE_WEIGHT_NOISE_LOW, EDGE_WEIGHT_NOISE_HIGH),
+                                         (THRESHOLD_NOISE_LOW, THRESHOLD_NOISE_HIGH))
     for nb, ignition_node in nodes_to_ignite:
-        if g.nodes[nb]['fire_state'] != 'burning':
-            g.nodes[nb]['fire_state'] = 'burning'
-            g.nodes[nb]['color'] = 'orange'
-            if 0 <= nb - 1 < len(colors):
-                colors[nb - 1] = 'orange'
-            if g.has_edge(ignition_node, nb):
-                g[ignition_node][nb]['color'] = 'orange'
-
-    # Ember mechanic
-    non_empty_nodes = [n for n in g.nodes if g.nodes[n]['fire_state'] not in ('empty', 'burning', 'burnt')]
+        ignited.append(nb)
+        set_burning(g, nb, colors)
+        set_edge_burning(g, ignition_node, nb)
+
+    # Ember mechanic: candidates are the unburnt nodes after neighbour ignition
+    if 'ember_index' not in g.graph:
+        g.graph['ember_index'] = EmberIndex(g, cell_scale, EMBER_RADIUS)
+    ember_index = g.graph['ember_index']
+    ember_index.flush()
     for bnode in burning_nodes:
-        if not non_empty_nodes:
+        if not len(ember_index):
             break
         if rnd.random() < EMBER_PROB:
-            bx, by = g.nodes[bnode]['pos']
-            candidates = []
-            for n in non_empty_nodes:
-                nxp, nyp = g.nodes[n]['pos']
-                dx = abs(nxp - bx) / cell_scale
-                dy = abs(nyp - by) / cell_scale
-                if dx <= EMBER_RADIUS and dy <= EMBER_RADIUS:
-                    candidates.append(n)
-            
-            if not candidates:
-                if rnd.random() < 0.1:
-                    candidates = non_empty_nodes
-            
-            if candidates:
-                target = rnd.choice(candidates)
+            candidates = ember_index.near(g.nodes[bnode]['pos'])
+            target = rnd.choice(candidates) if candidates else None
+            if target is None and rnd.random() < 0.1:
+                target = ember_index.sample()
+
+            if target is not None:
                 if rnd.random() < 0.5: # 50% chance to ignite if ember lands
                     if g.nodes[target]['fire_state'] == 'not_burnt':
-                        g.nodes[target]['fire_state'] = 'burning'
-                        g.nodes[target]['color'] = 'orange'
-                        if 0 <= target - 1 < len(colors):
-                            colors[target - 1] = 'orange'
+                        ignited.append(target)
+                        set_burning(g, target, colors)
                         if g.has_edge(bnode, target):
-                            g[bnode][target]['color'] = 'orange'
-
-    lifeline_update(g, colors)
-    life_edge_update(g, edge_list)
-    update_active_neighbors(g)
-
-    for nd in list(g.nodes()):
-        if g.nodes[nd]['fire_state'] == 'burnt':
-            g.nodes[nd]['color'] = 'brown'
-            for neighbor in g.neighbors(nd):
-                if g.has_edge(nd, neighbor):
-                    g[nd][neighbor]['color'] = 'brown'
+                            set_edge_burning(g, bnode, target)
+    ember_index.flush()
+
+    if stats is not None and ignited:
+        rows, cols = node_id_to_grid(np.array(ignited), grid_size)
+        stats.ignite(rows, cols)
+
+    # Burnt nodes brown their edges once, in set_burnt
+    lifeline_update(g, colors, stats)
+    life_edge_update(g)
+    front['step'] += 1
     return g, colors
 
+def checkpoint_arrays(g, edge_list):
+    """
+    Everything a step changes in a networkx graph, as arrays in node /
+    edge_list order, for graph_checkpoint.save_graph_checkpoint().
+    """
+    front = fire_front(g)
+    nodes = list(g.nodes)
+    edges = [g[p][q] for p, q in edge_list]
+    burnout_step, burnout_node = flatten_buckets(front['burnout'])
+    edge_burnout_step, edge_burnout_pair = flatten_buckets(front['edge_burnout'])
+    arrays = {
+        'state': np.array([STATE_CODES[g.nodes[n]['fire_state']] for n in nodes], dtype=np.uint8),
+        'life': np.array([g.nodes[n]['life'] for n in nodes], dtype=np.int16),
+        'weight': np.array([front['weight'][n] for n in nodes], dtype=np.float64),
+        't': np.int64(front['step']),
+        'edge_w': np.array([e['w'] for e in edges], dtype=np.float64),
+        'edge_life': np.array([e['life'] for e in edges], dtype=np.int16),
+        'edge_color': np.array([EDGE_COLOR_CODES[e['color']] for e in edges], dtype=np.uint8),
+        'edge_strength': np.array([e['edge_strength'] for e in edges], dtype=np.uint8),
+        'edge_wind_dir': np.array([e['wind_dir'] for e in edges], dtype=np.float64),
+        'burnout_step': burnout_step, 'burnout_node': burnout_node,
+        'edge_burnout_step': edge_burnout_step, 'edge_burnout_pair': edge_burnout_pair,
+    }
+    if 'ember_index' in g.graph:
+        arrays['ember_nodes'] = np.array(g.graph['ember_index'].nodes, dtype=np.int64)
+    if 'wind_table' in g.graph:
+        arrays['wind_random'] = generator_state(g.graph['wind_table']['rng'])
+    return arrays
+
+def restore_checkpoint(g, edge_list, arrays):
+    """Resume a networkx graph with the same nodes and edges from checkpoint_arrays(); returns colors."""
+    nodes = list(g.nodes)
+    for n, code, lf in zip(nodes, arrays['state'].tolist(), arrays['life'].tolist()):
+        g.nodes[n].update(fire_state=STATE_NAMES[code], color=NODE_COLORS[code], life=lf)
+    for (p, q), w, lf, color, strength, wind_dir in zip(
+            edge_list, arrays['edge_w'].tolist(), arrays['edge_life'].tolist(), arrays['edge_color'].tolist(),
+            arrays['edge_strength'].tolist(), arrays['edge_wind_dir'].tolist()):
+        g[p][q].update(w=w, life=lf, color=EDGE_COLORS[color], edge_strength=strength, wind_dir=wind_dir)
+
+    g.graph.pop('fire_front', None)
+    front = fire_front(g)
+    front['step'] = int(arrays['t'])
+    front['weight'] = dict(zip(nodes, arrays['weight'].tolist()))
+    front['burnout'] = {}
+    for step, node in zip(arrays['burnout_step'].tolist(), arrays['burnout_node'].tolist()):
+        front['burnout'].setdefault(step, []).append(node)
+    front['edge_burnout'] = {}
+    for step, (p, q) in zip(arrays['edge_burnout_step'].tolist(), arrays['edge_burnout_pair'].reshape(-1, 2).tolist()):
+        front['edge_burnout'].setdefault(step, []).append((p, q))
+
+    if 'ember_nodes' in arrays:
+        # Same buckets as the saved index; its sampling order is restored too
+        index = EmberIndex(g, 100.0 / int(np.ceil(np.sqrt(g.number_of_nodes()))), EMBER_RADIUS)
+        index.nodes = arrays['ember_nodes'].tolist()
+        index.slots = {node: slot for slot, node in enumerate(index.nodes)}
+        g.graph['ember_index'] = index
+    if 'wind_random' in arrays:
+        restore_generator(wind_table(g, edge_list)['rng'], arrays['wind_random'])
+    return [NODE_COLORS[code] for code in arrays['state'].tolist()]
+
+def wind_table(g, edge_list):
+    """
+    Arrays simulate_wind works on, built once per graph and kept in
+    g.graph['wind_table']: node positions, the non-empty nodes, and
+    edge_list as index pairs (and attribute dicts) with a per-node
+    incidence (CSR) list, so the ellipse is one mask over positions and
+    only its edges are visited.
+    """
+    table = g.graph.get('wind_table')
+    if table is None:
+        nodes = list(g.nodes)
+        index = {n: i for i, n in enumerate(nodes)}
+        u = np.array([index[p] for p, _ in edge_list], dtype=np.int64)
+        v = np.array([index[q] for _, q in edge_list], dtype=np.int64)
+        ends = np.concatenate([u, v])
+        order = np.argsort(ends, kind='stable')
+        indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(ends, minlength=len(nodes)), out=indptr[1:])
+        non_empty = np.array([g.nodes[n]['fire_state'] != 'empty' for n in nodes], dtype=bool)
+        table = {
+            'nodes': nodes,
+            'index': index,
+            'pos': np.array([g.nodes[n]['pos'] for n in nodes], dtype=float).reshape(-1, 2),
+            'non_empty': non_empty,
+            'non_empty_nodes': [n for n, keep in zip(nodes, non_empty) if keep],
+            'edges': edge_list,
+            'edge_data': [g[p][q] for p, q in edge_list],
+            'u': u,
+            'v': v,
+            'indptr': indptr,
+            'incident': np.concatenate([np.arange(len(edge_list))] * 2)[order],
+            # Weight draws are seeded from `random`, so rnd.seed() still fixes a run
+            'rng': np.random.default_rng(rnd.getrandbits(64)),
+        }
+        g.graph['wind_table'] = table
+    return table
+
 def simulate_wind(g, edge_list, max_speed, epsilon, dist_scale):
     nn = g.number_of_nodes()
     snn = int(np.ceil(np.sqrt(nn))) # grid size
-    non_empty_nodes = [n for n in g.nodes if g.nodes[n]['fire_state'] != 'empty']
+    table = wind_table(g, edge_list)
+    non_empty_nodes = table['non_empty_nodes']   # emptiness never changes
     if not non_empty_nodes:
         return (None, 0, 0)
     
@@ -243,12 +579,10 @@ def simulate_wind(g, edge_list, max_speed, epsilon, dist_scale):
     scaled_a = a * cell_scale * 5 
     scaled_b = b * cell_scale * 5
 
-    elliptical_nodes = []
-    for node, data in g.nodes(data=True):
-        if data['fire_state'] != 'empty':
-            x, y = g.nodes[node]['pos']
-            if ((x - center_x)**2 / scaled_a**2) + ((y - center_y)**2 / scaled_b**2) <= 1:
-                elliptical_nodes.append(node)
+    pos = table['pos']
+    inside = table['non_empty'] & (
+        ((pos[:, 0] - center_x)**2 / scaled_a**2) + ((pos[:, 1] - center_y)**2 / scaled_b**2) <= 1
+    )
     
     focus = center_node
     if a > b:
@@ -263,23 +597,29 @@ def simulate_wind(g, edge_list, max_speed, epsilon, dist_scale):
     
     posf = g.nodes[focus]['pos']
 
-    for n1 in elliptical_nodes:
-        for n2 in elliptical_nodes:
-            if n1 >= n2 or not g.has_edge(n1, n2):
-                continue
-            
-            pos1 = g.nodes[n1]['pos']
-            pos2 = g.nodes[n2]['pos']
-            
-            if a > b: # Horizontal ellipse
-                angle = 0 if (pos1[0] > posf[0] and pos2[0] > posf[0]) else 180
-            else: # Vertical ellipse
-                angle = 90 if (pos1[1] > posf[1] and pos2[1] > posf[1]) else 270
-            
-            w_e = edge_weight(max_speed, epsilon, 1, angle, dist(pos1, pos2, 30))
-            g[n1][n2]['w'] = w_e
-            g[n1][n2]['wind_dir'] = angle
-            g[n1][n2]['edge_strength'] = 1
+    # Edges with both ends in the ellipse, from the incidence lists of its nodes
+    indptr = table['indptr']
+    inside_nodes = np.flatnonzero(inside)
+    lengths = indptr[inside_nodes + 1] - indptr[inside_nodes]
+    offsets = np.arange(int(lengths.sum())) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    edges = np.unique(table['incident'][np.repeat(indptr[inside_nodes], lengths) + offsets])
+    u, v = table['u'][edges], table['v'][edges]
+    edges = edges[inside[u] & inside[v]]
+    pos1, pos2 = pos[table['u'][edges]], pos[table['v'][edges]]
+
+    if a > b: # Horizontal ellipse
+        angles = np.where((pos1[:, 0] > posf[0]) & (pos2[:, 0] > posf[0]), 0, 180)
+    else: # Vertical ellipse
+        angles = np.where((pos1[:, 1] > posf[1]) & (pos2[:, 1] > posf[1]), 90, 270)
+    distances = np.hypot(pos2[:, 0] - pos1[:, 0], pos2[:, 1] - pos1[:, 1]) * 30
+    weights = edge_weights(max_speed, epsilon, 1, angles, distances, table['rng'])
+
+    for e, angle, w_e in zip(edges.tolist(), angles.tolist(), weights.tolist()):
+        n1, n2 = table['edges'][e]
+        data = table['edge_data'][e]
+        set_edge_weight(g, n1, n2, w_e, data)
+        data['wind_dir'] = angle
+        data['edge_strength'] = 1
             
     return (center_node_pos, a, b)
 
@@ -289,6 +629,10 @@ def simulate_wind(g, edge_list, max_speed, epsilon, dist_scale):
 
 def draw_forest_snapshot(g, grid_size, timestep, output_dir):
     """Render a simple raster image of node states on a grid."""
+    if isinstance(g, ArrayGraph):
+        save_state_image(g.snapshot((grid_size, grid_size)), timestep, output_dir)
+        return
+
     img_data = np.zeros((grid_size, grid_size), dtype=int)
     
     for node, data in g.nodes(data=True):
@@ -302,6 +646,10 @@ def draw_forest_snapshot(g, grid_size, timestep, output_dir):
         else:
             logger.warning(f"Node {node} mapped to out-of-bounds grid ({row}, {col}). Skipping.")
 
+    save_state_image(img_data, timestep, output_dir)
+
+def save_state_image(img_data, timestep, output_dir):
+    """Save a grid of state codes (STATE_TO_INT) as timestep_NNNN.png."""
     plt.figure(figsize=(10, 10))
     plt.imshow(img_data, cmap=CUSTOM_CMAP, interpolation='nearest', origin='lower', vmin=0, vmax=len(STATE_TO_INT) - 1)
     plt.axis('off')
@@ -309,41 +657,28 @@ def draw_forest_snapshot(g, grid_size, timestep, output_dir):
     plt.savefig(filepath, bbox_inches='tight', pad_inches=0, dpi=150)
     plt.close()
 
-def run_wildfire_simulation(forest_shape=None):
+def build_static_graph(grid_size, scale, dist_scale, point_in_forest):
     """
-    Run wildfire simulation using detailed logic from incinerate_old.py
-    and save each timestep as a raster PNG.
+    The part of the graph that does not change between runs, for
+    graph_cache: node positions and thresholds from CSV_FILE, the cells
+    inside the forest shape (and within the GRAPH_DENSITY_SEED occupancy,
+    if set), and the 8-neighbour edges between those cells with their
+    angles and lengths.
+
+    Raises:
+        ValueError: If the dataset cannot be read or lacks a column.
     """
-    logger.info(f"Starting wildfire simulation...")
     try:
         df = pd.read_csv(CSV_FILE)
     except FileNotFoundError:
         logger.error(f"[ERROR] File not found at path: {CSV_FILE}")
-        return {"success": False, "error": f"Dataset file not found at {CSV_FILE}"}
+        raise ValueError(f"Dataset file not found at {CSV_FILE}")
     except Exception as e:
         logger.error(f"[ERROR] Could not load {CSV_FILE}: {e}")
-        return {"success": False, "error": f"Could not load dataset."}
+        raise ValueError("Could not load dataset.")
 
-
-    grid_size = int(np.ceil(np.sqrt(NODES)))
-    scale = 100.0 / grid_size # System scale (e.g., 100x100 units)
-    proximity = 1.42 * scale
-    dist_scale = 30
-    pos_dict = {}
     aspect_dict = {'N': -0.063, 'NE':0.349, 'E':0.686, 'SE':0.557, 'S':0.039, 'SW':-0.155, 'W':-0.252, 'NW':-0.171}
 
-    # Create a point-in-forest predicate using the helper module; this will
-    # use the provided override `forest_shape` if passed, otherwise it will
-    # read the latest stored shape from the SSOT in `state.py`.
-    point_in_forest = get_point_in_forest(scale, grid_size, forest_shape)
-    if forest_shape and not point_in_forest:
-        logger.error("Invalid GeoJSON: 'forest_shape' was provided but could not be processed.")
-        logger.error("Please provide a valid GeoJSON Feature or Geometry with type 'Polygon' or 'MultiPolygon'.")
-        return {
-            "success": False,
-            "error": "Invalid GeoJSON structure. Must be a Polygon or MultiPolygon Feature/Geometry."
-        }
-
     if len(df) < NODES:
         nodes_count = len(df)
         logger.warning(f"CSV file has fewer rows ({len(df)}) than requested NODES ({NODES}). Using {nodes_count}.")
@@ -356,122 +691,232 @@ def run_wildfire_simulation(forest_shape=None):
         ele_min = ele_series.min()
     except KeyError:
         logger.error("CSV missing 'Elevation' column.")
-        return {"success": False, "error": "CSV missing 'Elevation' column."}
+        raise ValueError("CSV missing 'Elevation' column.")
     except Exception as e:
         logger.error(f"Error processing elevation data: {e}")
-        return {"success": False, "error": f"Error processing elevation data."}
-
+        raise ValueError("Error processing elevation data.")
 
-    g = nx.Graph()
-    colors = [] 
-    k = 1 # Node IDs are 1-based
+    missing = [c for c in ('Slope', 'Aspect') if c not in df.columns]
+    if missing:
+        logger.error(f"CSV missing required column: {missing[0]}. Aborting.")
+        raise ValueError(f"CSV missing required column: {missing[0]}.")
 
-    # <-- UPDATED node loop to match old logic (col-by-col, 1-based)
     # This coordinate system (i*scale, j*scale) matches create_forest.py
-    for i in range(1, grid_size + 1):       # i = col index (x-axis)
-        for j in range(1, grid_size + 1):   # j = row index (y-axis)
-            if k > nodes_count:
-                break
-            
+    rows, cols = node_id_to_grid(np.arange(1, nodes_count + 1), grid_size)
+    pos = np.column_stack([(cols + 1) * scale, (rows + 1) * scale])
+    theta = node_thresholds(df['Slope'].values[:nodes_count], df['Elevation'].values[:nodes_count],
+                            ele_min, ele_max, df['Aspect'].values[:nodes_count], aspect_dict)
+
+    forest = np.ones(nodes_count, dtype=bool)
+    if point_in_forest:
+        for idx in range(nodes_count):
             try:
-                # k-1 because dataframe is 0-indexed
-                slope = df.at[k - 1, 'Slope']
-                elevation = df.at[k - 1, 'Elevation']
-                aspect = df.at[k - 1, 'Aspect']
-            except KeyError as e:
-                # Check for out of bounds, e.g., if k-1 > len(df)
-                if k - 1 >= len(df):
-                    logger.warning(f"Node ID {k} exceeds CSV rows ({len(df)}). Stopping node creation.")
-                    break 
-                logger.error(f"CSV missing required column: {e}. Aborting.")
-                return {"success": False, "error": f"CSV missing required column: {e}."}
-            except IndexError:
-                 logger.warning(f"Node ID {k} exceeds CSV rows ({len(df)}). Stopping node creation.")
-                 break
-
-
-            theta = node_threshold(slope, elevation, ele_min, ele_max, aspect, aspect_dict)
-            lf = rnd.randint(3, 7) # Lifeline
-
-            # Position: (x, y) with (scale, scale) at bottom-left
-            current_pos = (i * scale, j * scale)
-            pos_dict[k] = current_pos
-
-            # Check if node is inside the provided forest shape
-            inside_forest = True
-            if point_in_forest:
-                try:
-                    # point_in_forest is the predicate from create_forest
-                    inside_forest = bool(point_in_forest(current_pos))
-                except Exception as e:
-                    logger.warning(f"Error checking point_in_forest for {current_pos}: {e}")
-                    inside_forest = True # Default to inside on error
-
-            if not inside_forest:
-                g.add_node(k, threshold_switch=1.0, color='black', num_of_active_neighbors=0,
-                           fire_state='empty', life=lf, pos=current_pos)
-                colors.append('black')
-            # Original density-based occupancy behavior
-            elif rnd.uniform(0, 1) > DENSITY_FACTOR:
-                g.add_node(k, threshold_switch=1.0, color='black', num_of_active_neighbors=0,
-                           fire_state='empty', life=lf, pos=current_pos)
-                colors.append('black')
-            else:
-                g.add_node(k, threshold_switch=theta, color='green', num_of_active_neighbors=0,
-                           fire_state='not_burnt', life=lf, pos=current_pos)
-                colors.append('green')
-            
-            k += 1
-        if k > nodes_count:
-            break
+                forest[idx] = bool(point_in_forest(tuple(pos[idx])))
+            except Exception as e:
+                logger.warning(f"Error checking point_in_forest for {tuple(pos[idx])}: {e}")
+    if GRAPH_DENSITY_SEED is not None:
+        forest &= np.random.default_rng(GRAPH_DENSITY_SEED).uniform(0, 1, size=nodes_count) <= DENSITY_FACTOR
+
+    # Neighbours within 1.42 cells (the 8-neighbourhood)
+    n1, n2 = grid_edge_pairs(forest, grid_size)
+    p1, p2 = pos[n1 - 1], pos[n2 - 1]
+    return {
+        'pos': pos,
+        'theta': theta,
+        'forest': forest,
+        'n1': n1,
+        'n2': n2,
+        'angles': edge_angles(p1, p2),
+        'distances': np.hypot(p2[:, 0] - p1[:, 0], p2[:, 1] - p1[:, 1]) * dist_scale,
+    }
+
+def run_wildfire_simulation(forest_shape=None, engine=None, resume=None):
+    """
+    Run wildfire simulation using detailed logic from incinerate_old.py
+    and save each timestep as a raster PNG.
+
+    `engine` selects "networkx" (attribute dicts), "arrays" (the vectorized
+    ArrayGraph of graph_engine.py, same rules) or "events" (the continuous-time
+    EventEngine of event_engine.py, which also saves arrival_times.npy);
+    defaults to config GRAPH_ENGINE.
+
+    networkx and arrays runs write a graph_checkpoint.npz every
+    GRAPH_CHECKPOINT_INTERVAL steps. `resume` is the output_dir of such a
+    run: it continues from its last checkpoint, with its engine, into the
+    same directory.
+
+    With config GRAPH_HISTORY_COLUMNS set, every frame's node / edge columns
+    also go to the run's graph_history/ (graph_export.load_graph_history).
+
+    build_static_graph()'s arrays are reused from GRAPH_CACHE_DIR while the
+    dataset, NODES, density seed and forest_shape are unchanged.
+    """
+    resumed = None
+    if resume:
+        try:
+            resumed = load_graph_checkpoint(resume)
+        except FileNotFoundError as e:
+            logger.error(f"[ERROR] {e}")
+            return {"success": False, "error": str(e)}
+        engine = resumed['engine']
+        logger.info(f"Resuming {resume} from its checkpoint at timestep {resumed['step']}.")
+    engine = engine or GRAPH_ENGINE
+    if engine not in GRAPH_ENGINES:
+        return {"success": False, "error": f"Unknown graph engine '{engine}'. Use one of: {', '.join(GRAPH_ENGINES)}."}
+    logger.info(f"Starting wildfire simulation ({engine} engine)...")
+    grid_size = int(np.ceil(np.sqrt(NODES)))
+    scale = 100.0 / grid_size # System scale (e.g., 100x100 units)
+    proximity = 1.42 * scale
+    dist_scale = 30
 
-    edge_list = []
-    node_ids = list(g.nodes())
-    for i in range(len(node_ids)):
-        for j in range(i + 1, len(node_ids)):
-            n1, n2 = node_ids[i], node_ids[j]
-            p1, p2 = g.nodes[n1]['pos'], g.nodes[n2]['pos']
-            if dist(p1, p2, 1) < proximity and g.nodes[n1]['fire_state'] != 'empty' and g.nodes[n2]['fire_state'] != 'empty':
-                edge_list.append((n1, n2))
-
-    for n1, n2 in edge_list:
-        p1, p2 = g.nodes[n1]['pos'], g.nodes[n2]['pos']
-        angle = get_angle(p1, p2)
-        pp = edge_weight(MAX_WIND_SPEED, 0.1, 0, angle, dist(p1, p2, dist_scale)) * PP_FACTOR
-        lf = np.floor((g.nodes[n1]['life'] + g.nodes[n2]['life']) / 2)
-        g.add_edge(n1, n2, w=pp, color='green', life=int(lf), edge_strength=0, wind_speed=0.01, wind_dir=angle, eb=0)
-
-    non_burnt_nodes = [n for n in g.nodes if g.nodes[n]['fire_state'] == 'not_burnt']
-    if not non_burnt_nodes:
+    # Create a point-in-forest predicate using the helper module; this will
+    # use the provided override `forest_shape` if passed, otherwise it will
+    # read the latest stored shape from the SSOT in `state.py`.
+    point_in_forest = get_point_in_forest(scale, grid_size, forest_shape)
+    if forest_shape and not point_in_forest:
+        logger.error("Invalid GeoJSON: 'forest_shape' was provided but could not be processed.")
+        logger.error("Please provide a valid GeoJSON Feature or Geometry with type 'Polygon' or 'MultiPolygon'.")
+        return {
+            "success": False,
+            "error": "Invalid GeoJSON structure. Must be a Polygon or MultiPolygon Feature/Geometry."
+        }
+
+    # --- Deterministic part of the graph, from the cache when possible ---
+    cache_key, static = None, None
+    if GRAPH_CACHE_DIR:
+        try:
+            cache_key = graph_cache_key(CSV_FILE, NODES, DENSITY_FACTOR, GRAPH_DENSITY_SEED, forest_shape,
+                                        theta_factor=THETA_FACTOR, dist_scale=dist_scale)
+            static = load_prebuilt_graph(GRAPH_CACHE_DIR, cache_key)
+        except OSError:
+            pass    # no readable CSV: build_static_graph reports it
+    if static is None:
+        try:
+            static = build_static_graph(grid_size, scale, dist_scale, point_in_forest)
+        except ValueError as e:
+            return {"success": False, "error": str(e)}
+        if cache_key:
+            save_prebuilt_graph(GRAPH_CACHE_DIR, cache_key, static)
+
+    # Array draws are seeded from `random`, so rnd.seed() still fixes a run
+    np_rng = np.random.default_rng(rnd.getrandbits(64))
+
+    # --- Nodes: column by column, bottom to top, 1-based ids ---
+    nodes_count = static['theta'].size
+    node_ids = np.arange(1, nodes_count + 1)
+    rows, cols = node_id_to_grid(node_ids, grid_size)
+    pos = static['pos']
+    life = np_rng.integers(3, 8, size=nodes_count)  # Lifeline
+
+    # Original density-based occupancy, within the cached forest mask
+    occupied = static['forest'].copy()
+    if GRAPH_DENSITY_SEED is None:
+        occupied &= np_rng.uniform(0, 1, size=nodes_count) <= DENSITY_FACTOR
+    if resumed:
+        if resumed['state'].size != nodes_count:
+            return {"success": False, "error": "Checkpoint does not match the dataset's node count."}
+        occupied = resumed['state'] != EMPTY
+    states = np.where(occupied, NOT_BURNT, EMPTY).astype(np.uint8)
+    thresholds = np.where(occupied, static['theta'], 1.0)
+
+    # --- Edges: the cached candidates between occupied nodes ---
+    keep = occupied[static['n1'] - 1] & occupied[static['n2'] - 1]
+    n1, n2 = static['n1'][keep], static['n2'][keep]
+    angles = static['angles'][keep]
+    weights = edge_weights(MAX_WIND_SPEED, 0.1, 0, angles, static['distances'][keep], np_rng) * PP_FACTOR
+    edge_life = (life[n1 - 1] + life[n2 - 1]) // 2
+    logger.info(f"Built {nodes_count} nodes and {n1.size} edges on a {grid_size}x{grid_size} grid.")
+
+    non_burnt_nodes = node_ids[states == NOT_BURNT]
+    if non_burnt_nodes.size == 0:
         logger.warning("No nodes available to ignite. Forest is empty or all density checks failed.")
         return {"success": False, "error": "No nodes available to ignite"}
 
-    ignition_node = rnd.choice(non_burnt_nodes) if IGNITION_POINT == "random" else int(IGNITION_POINT)
-    
-    if not g.has_node(ignition_node) or g.nodes[ignition_node]['fire_state'] != 'not_burnt':
-        logger.warning(f"Selected ignition node {ignition_node} is invalid. Choosing random.")
-        ignition_node = rnd.choice(non_burnt_nodes)
-
-    g.nodes[ignition_node]['fire_state'] = 'burning'
-    g.nodes[ignition_node]['color'] = 'orange'
-    if 0 <= ignition_node - 1 < len(colors):
-        colors[ignition_node - 1] = 'orange'
-    
-    logger.info(f"Ignition set at node {ignition_node} (pos {g.nodes[ignition_node]['pos']})")
+    random_node = lambda: int(non_burnt_nodes[rnd.randrange(non_burnt_nodes.size)])
+    ignition_node = None
+    if not resumed:
+        ignition_node = random_node() if IGNITION_POINT == "random" else int(IGNITION_POINT)
+        if not (1 <= ignition_node <= nodes_count) or states[ignition_node - 1] != NOT_BURNT:
+            logger.warning(f"Selected ignition node {ignition_node} is invalid. Choosing random.")
+            ignition_node = random_node()
+
+        states[ignition_node - 1] = BURNING
+        logger.info(f"Ignition set at node {ignition_node} (pos {tuple(pos[ignition_node - 1])})")
+
+    if engine in ("arrays", "events"):
+        g = ArrayGraph(
+            labels=node_ids, state=states, threshold=thresholds, life=life, pos=pos, rows=rows, cols=cols,
+            edge_u=n1 - 1, edge_v=n2 - 1, edge_w=weights, edge_life=edge_life, edge_wind_dir=angles,
+            ember_prob=EMBER_PROB,
+            ember_radius=EMBER_RADIUS,
+            threshold_noise=(THRESHOLD_NOISE_LOW, THRESHOLD_NOISE_HIGH),
+            edge_noise=(EDGE_WEIGHT_NOISE_LOW, EDGE_WEIGHT_NOISE_HIGH),
+            rng=np_rng,
+        )
+        colors, edge_list = None, None
+        if engine == "events":
+            events = EventEngine(g, wind=dict(max_speed=MAX_WIND_SPEED, epsilon=0.1,
+                                              grid_size=grid_size, dist_scale=dist_scale))
+    else:
+        colors = [NODE_COLORS[s] for s in states]
+        g = nx.Graph()
+        g.add_nodes_from(
+            (k, {'threshold_switch': th, 'color': NODE_COLORS[s], 'num_of_active_neighbors': 0,
+                 'fire_state': STATE_NAMES[s], 'life': lf, 'pos': (x, y)})
+            for k, th, s, lf, (x, y) in zip(node_ids.tolist(), thresholds.tolist(), states.tolist(),
+                                             life.tolist(), pos.tolist())
+        )
+        edge_list = list(zip(n1.tolist(), n2.tolist()))
+        g.add_edges_from(
+            (a, b, {'w': w, 'color': 'green', 'life': lf, 'edge_strength': 0, 'wind_speed': 0.01,
+                    'wind_dir': angle, 'eb': 0})
+            for (a, b), w, lf, angle in zip(edge_list, weights.tolist(), edge_life.tolist(), angles.tolist())
+        )
 
     # --- Setup Output Directory ---
-    output_dir = os.path.join(OUTPUT_BASE, f"wildfire_run_{int(time.time())}")
+    output_dir = resume or os.path.join(WILDFIRE_OUTPUT_BASE, f"wildfire_run_{int(time.time())}")
     os.makedirs(output_dir, exist_ok=True)
     logger.info(f"Saving simulation frames to: {output_dir}")
 
     # --- Main Simulation Loop ---
-    final_timestep = 0
-    for i in range(TIMESTEPS + 1):
+    # Stats are updated from the transitions reported by incinerate(); the
+    # record for step i describes the state drawn for frame i.
+    start = 0
+    if resumed:
+        start = resumed['step']
+        if engine == "arrays":
+            g.restore_checkpoint(resumed)
+        else:
+            colors = restore_checkpoint(g, edge_list, resumed)
+        grid = np.zeros((grid_size, grid_size), dtype=np.uint8)
+        grid[rows, cols] = resumed['state']
+        stats = FireStatsTracker.from_grid(grid, BURNING, BURNT, CELL_SIZE_M, CELL_SIZE_M,
+                                           json.loads(str(resumed['stats_records'])))
+        restore_random(resumed['py_random'])
+    else:
+        stats = FireStatsTracker((grid_size, grid_size), CELL_SIZE_M, CELL_SIZE_M)
+        stats.ignite(*node_id_to_grid(np.array([ignition_node]), grid_size))
+    checkpoints = GRAPH_CHECKPOINT_INTERVAL if engine != "events" else 0
+    history = (GraphHistoryWriter(output_dir, g, TIMESTEPS + 1, GRAPH_HISTORY_COLUMNS, edge_list,
+                                  append=bool(resumed))
+               if GRAPH_HISTORY_COLUMNS else None)
+
+    final_timestep = start
+    for i in range(start, TIMESTEPS + 1):
         final_timestep = i
-        current_burning_forests = count_burning(g)
+        if not (resumed and i == start):   # the checkpoint already holds this record
+            stats.end_step(i)
+        current_burning_forests = stats.burning
 
         # Draw the state *before* this step's incineration
         draw_forest_snapshot(g, grid_size, i, output_dir)
+        if history:
+            history.write(i, g)
+
+        if checkpoints and i % checkpoints == 0 and not (resumed and i == start):
+            arrays = g.checkpoint_arrays() if engine == "arrays" else checkpoint_arrays(g, edge_list)
+            arrays['stats_records'] = np.array(json.dumps(stats.records))
+            save_graph_checkpoint(output_dir, i, engine, arrays)
         
         # Stop when there are no burning nodes left
         if current_burning_forests == 0 and i > 0:
@@ -481,19 +926,36 @@ def run_wildfire_simulation(forest_shape=None):
         if i == TIMESTEPS:
              logger.info(f"Simulation reached max timesteps ({TIMESTEPS}).")
 
-        # Run fire spread logic
-        g, colors = incinerate(g, colors, edge_list)
+        # Run fire spread logic (the event engine also applies its own wind)
+        if engine == "events":
+            events.advance(stats)
+            continue
+        if engine == "arrays":
+            g.step(stats)
+        else:
+            g, colors = incinerate(g, colors, edge_list, stats)
 
         # Run wind logic
         if i > 0:
-            simulate_wind(g, edge_list, MAX_WIND_SPEED, 0.1, dist_scale)
+            if engine == "arrays":
+                g.simulate_wind(MAX_WIND_SPEED, 0.1, grid_size, dist_scale)
+            else:
+                simulate_wind(g, edge_list, MAX_WIND_SPEED, 0.1, dist_scale)
 
     logger.info(f"Simulation complete. Final timestep: {final_timestep}")
+    stats.write(output_dir)
+    if history:
+        history.close()
+    if engine == "events":
+        np.save(os.path.join(output_dir, "arrival_times.npy"), events.arrival_grid((grid_size, grid_size)))
+        logger.info(f"Event engine processed {events.events} events.")
 
     return {
         "success": True,
         "message": f"Simulation complete. {final_timestep+1} frames saved.",
         "output_dir": output_dir,
         "grid_size": grid_size,
-        "final_timestep": final_timestep
+        "final_timestep": final_timestep,
+        "engine": engine,
+        "stats": stats.to_columns()
     }
\ No newline at end of file
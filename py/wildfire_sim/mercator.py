@@ -0,0 +1,155 @@
+"""
+mercator.py
+---------------------------------------------
+Warps county forest rasters onto a Web Mercator (EPSG:3857) grid aligned
+with Leaflet's zoom pyramid.
+
+Frames simulated on this grid are already in the map's projection, so
+neither the server nor georaster-layer-for-leaflet has to reproject them.
+The warped raster is written once, next to the source raster, and reused
+until the source changes.
+
+Usage (pre-warp every county raster in GEOTIFF_DIR):
+    python -m wildfire_sim.mercator [--zoom Z]
+"""
+
+import os
+import re
+import math
+import logging
+import argparse
+import rasterio
+from rasterio.enums import Resampling
+from rasterio.transform import from_origin
+from rasterio.warp import calculate_default_transform, reproject, transform_bounds
+
+try:
+    from config import GEOTIFF_DIR
+except ImportError:
+    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+    PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, os.pardir, os.pardir))
+    GEOTIFF_DIR = os.path.join(PROJECT_ROOT, "data", "shared", "geotiff")
+
+logger = logging.getLogger(__name__)
+
+WEB_MERCATOR_CRS = "EPSG:3857"
+WEB_MERCATOR_SUFFIX = "_3857"
+# Half the width of the EPSG:3857 world square, in metres
+ORIGIN_SHIFT = 20037508.342789244
+TILE_SIZE = 256
+MAX_ZOOM = 18
+
+FOREST_RASTER_PATTERN = re.compile(r"ForestCover_.+_2024\.tif$", re.IGNORECASE)
+
+
+def zoom_resolution(zoom):
+    """Metres per pixel of Leaflet's 256px tile pyramid at `zoom`."""
+    return 2 * ORIGIN_SHIFT / (TILE_SIZE * 2 ** zoom)
+
+
+def choose_zoom(native_resolution):
+    """Coarsest zoom level whose pixels are no larger than `native_resolution`."""
+    zoom = math.ceil(math.log2(2 * ORIGIN_SHIFT / (TILE_SIZE * native_resolution)))
+    return max(0, min(MAX_ZOOM, zoom))
+
+
+def web_mercator_path(input_file):
+    """Path of the warped copy for a source raster."""
+    stem, ext = os.path.splitext(input_file)
+    return f"{stem}{WEB_MERCATOR_SUFFIX}{ext}"
+
+
+def warp_to_web_mercator(input_file, output_file=None, zoom=None):
+    """
+    Warp a categorical forest raster to a zoom-aligned EPSG:3857 grid.
+
+    The pixel size is the Leaflet resolution at `zoom` (by default the
+    coarsest level that keeps the native resolution) and the grid origin is
+    snapped to the global tile grid, so pixel edges coincide with tile edges.
+
+    Returns:
+        str: Path of the written raster.
+    """
+    output_file = output_file or web_mercator_path(input_file)
+
+    with rasterio.open(input_file) as src:
+        if zoom is None:
+            native_transform, _, _ = calculate_default_transform(
+                src.crs, WEB_MERCATOR_CRS, src.width, src.height, *src.bounds
+            )
+            zoom = choose_zoom(abs(native_transform.a))
+        res = zoom_resolution(zoom)
+
+        left, bottom, right, top = transform_bounds(src.crs, WEB_MERCATOR_CRS, *src.bounds)
+        # Snap outwards to the tile-aligned pixel grid
+        col_min = math.floor((left + ORIGIN_SHIFT) / res)
+        col_max = math.ceil((right + ORIGIN_SHIFT) / res)
+        row_min = math.floor((ORIGIN_SHIFT - top) / res)
+        row_max = math.ceil((ORIGIN_SHIFT - bottom) / res)
+
+        width = col_max - col_min
+        height = row_max - row_min
+        transform = from_origin(col_min * res - ORIGIN_SHIFT, ORIGIN_SHIFT - row_min * res, res, res)
+
+        meta = src.meta.copy()
+        meta.update(
+            driver="GTiff",
+            crs=WEB_MERCATOR_CRS,
+            transform=transform,
+            width=width,
+            height=height,
+            count=1,
+            dtype=rasterio.uint8,
+            nodata=None,
+            compress="lzw",
+            tiled=True,
+            blockxsize=TILE_SIZE,
+            blockysize=TILE_SIZE,
+        )
+
+        logger.info(f"Warping {input_file} to {WEB_MERCATOR_CRS} at zoom {zoom} ({res:.3f} m/px, {width}x{height})...")
+        with rasterio.open(output_file, "w", **meta) as dst:
+            # Nearest keeps the land-cover classes intact
+            reproject(
+                source=rasterio.band(src, 1),
+                destination=rasterio.band(dst, 1),
+                src_transform=src.transform,
+                src_crs=src.crs,
+                dst_transform=transform,
+                dst_crs=WEB_MERCATOR_CRS,
+                resampling=Resampling.nearest,
+                dst_nodata=0,
+            )
+            dst.update_tags(LEAFLET_ZOOM=zoom)
+
+    return output_file
+
+
+def ensure_web_mercator(input_file, zoom=None):
+    """Return the warped copy of `input_file`, (re)building it if it is missing or stale."""
+    output_file = web_mercator_path(input_file)
+    if os.path.exists(output_file) and os.path.getmtime(output_file) >= os.path.getmtime(input_file):
+        if zoom is None:
+            return output_file
+        with rasterio.open(output_file) as dst:
+            if dst.tags().get("LEAFLET_ZOOM") == str(zoom):
+                return output_file
+    return warp_to_web_mercator(input_file, output_file, zoom=zoom)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warp county forest rasters to zoom-aligned Web Mercator grids.")
+    parser.add_argument('--dir', '-d', default=GEOTIFF_DIR, help=f"Directory of ForestCover_*_2024.tif rasters. (Default: {GEOTIFF_DIR})")
+    parser.add_argument('--zoom', '-z', type=int, default=None, help="Leaflet zoom level for the grid. (Default: match native resolution)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    for filename in sorted(os.listdir(args.dir)):
+        if FOREST_RASTER_PATTERN.match(filename):
+            path = ensure_web_mercator(os.path.join(args.dir, filename), zoom=args.zoom)
+            logger.info(f"Ready: {path}")
+
+
+if __name__ == "__main__":
+    main()
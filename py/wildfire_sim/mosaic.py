@@ -0,0 +1,143 @@
+"""
+mosaic.py
+---------------------------------------------
+Lazy virtual mosaic of neighbouring county forest rasters.
+
+A VirtualMosaic extends the pixel grid of one county raster (the primary)
+indefinitely in every direction. Reading a window fills it from every
+raster in GEOTIFF_DIR whose footprint overlaps it, like a GDAL VRT:
+rasters on the same grid are read directly with a boundless window, and
+rasters on other grids are resampled on the fly through a WarpedVRT. Only
+the requested window is read, and nothing is merged on disk.
+
+Only file headers are read when the mosaic is built; member datasets are
+opened on the first read that touches them.
+"""
+
+import os
+import re
+import math
+import logging
+import numpy as np
+import rasterio
+from rasterio.enums import Resampling
+from rasterio.vrt import WarpedVRT
+from rasterio.windows import Window
+from rasterio.windows import bounds as window_bounds
+from rasterio.windows import transform as window_transform
+from rasterio.warp import transform_bounds
+
+logger = logging.getLogger(__name__)
+
+FOREST_RASTER_PATTERN = re.compile(r"ForestCover_.+_2024(_3857)?\.tif$", re.IGNORECASE)
+# Pixel offsets closer than this to an integer count as aligned grids
+ALIGN_TOLERANCE = 1e-6
+
+
+def _same_grid(a, b):
+    """Offset (cols, rows) of raster `b`'s origin on raster `a`'s pixel grid, or None if the grids differ."""
+    if a.crs != b.crs:
+        return None
+    ta, tb = a.transform, b.transform
+    if (ta.b, ta.d, tb.b, tb.d) != (0, 0, 0, 0):
+        return None
+    if not (math.isclose(ta.a, tb.a, rel_tol=ALIGN_TOLERANCE) and math.isclose(ta.e, tb.e, rel_tol=ALIGN_TOLERANCE)):
+        return None
+    col = (tb.c - ta.c) / ta.a
+    row = (tb.f - ta.f) / ta.e
+    if abs(col - round(col)) > ALIGN_TOLERANCE or abs(row - round(row)) > ALIGN_TOLERANCE:
+        return None
+    return int(round(col)), int(round(row))
+
+
+class VirtualMosaic:
+    """
+    The primary raster's grid, filled from every overlapping county raster.
+
+    Use as a context manager so opened member datasets are closed:
+        with VirtualMosaic(path) as mosaic:
+            state = mosaic.read(Window(-50, -50, 200, 200))
+    """
+
+    def __init__(self, primary_file, directory=None):
+        self.primary_file = primary_file
+        directory = directory or os.path.dirname(primary_file)
+        with rasterio.open(primary_file) as primary:
+            self.crs = primary.crs
+            self.transform = primary.transform
+            self.width = primary.width
+            self.height = primary.height
+            self.meta = primary.meta.copy()
+
+        # Members must be on the same kind of grid (source vs Web Mercator copy)
+        mercator = primary_file.lower().endswith("_3857.tif")
+        self.members = []
+        for filename in sorted(os.listdir(directory)):
+            if not FOREST_RASTER_PATTERN.match(filename) or filename.lower().endswith("_3857.tif") != mercator:
+                continue
+            path = os.path.join(directory, filename)
+            with rasterio.open(path) as src:
+                offset = _same_grid(self, src)
+                footprint = transform_bounds(src.crs, self.crs, *src.bounds) if src.crs != self.crs else tuple(src.bounds)
+            is_primary = os.path.abspath(path) == os.path.abspath(primary_file)
+            self.members.append({"path": path, "offset": offset, "bounds": footprint, "primary": is_primary})
+        self._open = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for src in self._open.values():
+            src.close()
+        self._open.clear()
+
+    def _dataset(self, path):
+        if path not in self._open:
+            self._open[path] = rasterio.open(path)
+        return self._open[path]
+
+    def covers(self, window):
+        """True if `window` lies entirely inside the primary raster."""
+        return (window.col_off >= 0 and window.row_off >= 0
+                and window.col_off + window.width <= self.width
+                and window.row_off + window.height <= self.height)
+
+    def window_meta(self, window):
+        """Raster metadata of `window` as a standalone raster on this grid."""
+        meta = self.meta.copy()
+        meta.update(transform=window_transform(window, self.transform), width=window.width, height=window.height)
+        return meta
+
+    def read(self, window):
+        """
+        Read `window` (in primary pixel coordinates, may extend past the
+        primary raster) as a uint8 state array. Cells no raster covers are 0.
+        """
+        out = np.zeros((window.height, window.width), dtype=np.uint8)
+        left, bottom, right, top = window_bounds(window, self.transform)
+        sources = []
+
+        for member in self.members:
+            m_left, m_bottom, m_right, m_top = member["bounds"]
+            if m_left >= right or m_right <= left or m_bottom >= top or m_top <= bottom:
+                continue
+            src = self._dataset(member["path"])
+            if member["offset"] is not None:
+                dx, dy = member["offset"]
+                data = src.read(1, window=Window(window.col_off - dx, window.row_off - dy, window.width, window.height),
+                                boundless=True, fill_value=0)
+            else:
+                with WarpedVRT(src, crs=self.crs, transform=window_transform(window, self.transform),
+                               width=window.width, height=window.height,
+                               resampling=Resampling.nearest, nodata=0) as vrt:
+                    data = vrt.read(1)
+            # County rasters are 0 outside their county, so forest wins where footprints overlap
+            np.maximum(out, data.astype(np.uint8), out=out)
+            sources.append(os.path.basename(member["path"]))
+
+        logger.info(f"  Mosaic window {window} read from: {', '.join(sources) or 'no rasters'}")
+        self.last_sources = sources
+        return out
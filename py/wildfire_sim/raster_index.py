@@ -0,0 +1,153 @@
+"""
+raster_index.py
+---------------------------------------------
+Spatial index of the county forest rasters in GEOTIFF_DIR.
+
+Each raster's footprint (in EPSG:4326) goes into a shapely STRtree, so a
+clicked coordinate resolves to the covering raster(s) and pixel without the
+caller knowing the countyKey and without scanning filenames. Batches of
+points are queried in one vectorized call and grouped per raster for the
+pixel conversion.
+
+The index is built at startup and rebuilt when a raster in the directory
+is added, removed or rewritten. The check runs at most every
+RASTER_INDEX_REFRESH_S seconds.
+"""
+
+import os
+import re
+import time
+import logging
+from threading import Lock
+import numpy as np
+import rasterio
+import shapely
+from rasterio.warp import transform as warp_transform, transform_bounds
+
+try:
+    from config import GEOTIFF_DIR, RASTER_INDEX_REFRESH_S
+except ImportError:
+    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+    PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, os.pardir, os.pardir))
+    GEOTIFF_DIR = os.path.join(PROJECT_ROOT, "data", "shared", "geotiff")
+    RASTER_INDEX_REFRESH_S = 5
+
+logger = logging.getLogger(__name__)
+
+# Source-grid county rasters only; the _3857 copies cover the same ground
+FOREST_RASTER_PATTERN = re.compile(r"ForestCover_(.+)_2024\.tif$", re.IGNORECASE)
+
+
+class RasterIndex:
+    """R-tree (STRtree) over the EPSG:4326 footprints of the county rasters."""
+
+    def __init__(self, directory=GEOTIFF_DIR, refresh_s=RASTER_INDEX_REFRESH_S):
+        self.directory = directory
+        self.refresh_s = refresh_s
+        self.rasters = []
+        self._tree = None
+        self._signature = None
+        self._checked = 0.0
+        self._lock = Lock()
+
+    # --- building ---
+
+    def _scan(self):
+        """(filename, size, mtime) of every county raster: changes whenever the index must."""
+        if not os.path.isdir(self.directory):
+            return ()
+        return tuple(sorted(
+            (entry.name, entry.stat().st_size, entry.stat().st_mtime_ns)
+            for entry in os.scandir(self.directory)
+            if FOREST_RASTER_PATTERN.match(entry.name)
+        ))
+
+    def _build(self, signature):
+        rasters = []
+        for filename, _, _ in signature:
+            path = os.path.join(self.directory, filename)
+            try:
+                with rasterio.open(path) as src:
+                    footprint = transform_bounds(src.crs, "EPSG:4326", *src.bounds) if src.crs else tuple(src.bounds)
+                    rasters.append({
+                        "county_key": FOREST_RASTER_PATTERN.match(filename).group(1),
+                        "path": path,
+                        "crs": src.crs,
+                        "geographic": src.crs is None or src.crs.is_geographic,
+                        "inverse": ~src.transform,
+                        "shape": (src.height, src.width),
+                        "bounds": footprint,
+                    })
+            except rasterio.errors.RasterioIOError as e:
+                logger.warning(f"Skipping unreadable raster {filename}: {e}")
+
+        self.rasters = rasters
+        self._tree = shapely.STRtree([shapely.box(*r["bounds"]) for r in rasters]) if rasters else None
+        self._signature = signature
+        logger.info(f"Raster index built over {len(rasters)} county rasters in {self.directory}")
+
+    def refresh(self, force=False):
+        """Rebuild the index if the rasters on disk changed (checked at most every refresh_s)."""
+        now = time.monotonic()
+        if not force and now - self._checked < self.refresh_s:
+            return
+        with self._lock:
+            self._checked = now
+            signature = self._scan()
+            if force or signature != self._signature:
+                self._build(signature)
+
+    # --- queries ---
+
+    def _pixels(self, raster, lats, lons):
+        """Row / col arrays of points in one raster."""
+        xs, ys = np.asarray(lons, dtype=float), np.asarray(lats, dtype=float)
+        if not raster["geographic"]:
+            xs, ys = (np.asarray(a) for a in warp_transform("EPSG:4326", raster["crs"], xs, ys))
+        cols, rows = raster["inverse"] * (xs, ys)
+        return np.floor(rows).astype(np.int64), np.floor(cols).astype(np.int64)
+
+    def resolve_many(self, lats, lons):
+        """
+        Resolve many points at once.
+
+        Returns:
+            list[list[dict]]: For each point, the covering rasters as dicts
+            with county_key, path, row and col (empty if none covers it).
+        """
+        self.refresh()
+        lats = np.asarray(lats, dtype=float)
+        lons = np.asarray(lons, dtype=float)
+        results = [[] for _ in range(lats.size)]
+        if self._tree is None or lats.size == 0:
+            return results
+
+        point_idx, raster_idx = self._tree.query(shapely.points(lons, lats), predicate="intersects")
+        for r in np.unique(raster_idx):
+            raster = self.rasters[r]
+            points = point_idx[raster_idx == r]
+            rows, cols = self._pixels(raster, lats[points], lons[points])
+            height, width = raster["shape"]
+            inside = (rows >= 0) & (rows < height) & (cols >= 0) & (cols < width)
+            for p, row, col in zip(points[inside], rows[inside], cols[inside]):
+                results[p].append({
+                    "county_key": raster["county_key"],
+                    "path": raster["path"],
+                    "row": int(row),
+                    "col": int(col),
+                })
+        for hits in results:
+            hits.sort(key=lambda hit: hit["county_key"])
+        return results
+
+    def resolve(self, lat, lon):
+        """Covering rasters of one point (see resolve_many)."""
+        return self.resolve_many([lat], [lon])[0]
+
+
+# Process-wide index shared by the routes; built by warm_up() at startup
+raster_index = RasterIndex()
+
+
+def warm_up():
+    raster_index.refresh(force=True)
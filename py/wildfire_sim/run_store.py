@@ -0,0 +1,214 @@
+"""
+run_store.py
+---------------------------------------------
+Storage backends for simulation runs.
+
+A run is either a directory under WILDFIRE_OUTPUT_BASE or an ephemeral
+in-memory run whose frames are encoded into rasterio MemoryFile buffers and
+kept in a bounded, thread-safe cache. Memory runs never touch disk and are
+evicted once their TTL expires or the cache exceeds its byte budget.
+"""
+
+import os
+import time
+import logging
+from threading import Lock
+from collections import OrderedDict
+import rasterio
+from rasterio.io import MemoryFile
+
+try:
+    from config import WILDFIRE_OUTPUT_BASE, RUN_CACHE_MAX_BYTES, RUN_CACHE_TTL_SECONDS, RUN_CACHE_MIN_FREE_BYTES
+except ImportError:
+    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+    WILDFIRE_OUTPUT_BASE = os.path.join(BASE_DIR, os.pardir, os.pardir, "wildfire_output")
+    RUN_CACHE_MAX_BYTES = 256 * 1024 * 1024
+    RUN_CACHE_TTL_SECONDS = 15 * 60
+    RUN_CACHE_MIN_FREE_BYTES = 256 * 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+MEMORY_RUN_PREFIX = "mem_run_"
+
+
+class DirectoryRun:
+    """A run stored as files in a directory on disk."""
+
+    ephemeral = False
+
+    def __init__(self, path, create=True):
+        self.path = path
+        self.name = os.path.basename(os.path.normpath(path))
+        if create:
+            os.makedirs(path, exist_ok=True)
+
+    def write_raster(self, filename, data, meta, colormap=None):
+        path = os.path.join(self.path, filename)
+        with rasterio.open(path, 'w', **meta) as dst:
+            dst.write(data, 1)
+            if colormap:
+                dst.write_colormap(1, colormap)
+
+    def write_bytes(self, filename, payload):
+        with open(os.path.join(self.path, filename), 'wb') as f:
+            f.write(payload)
+
+    def read_bytes(self, filename):
+        with open(os.path.join(self.path, filename), 'rb') as f:
+            return f.read()
+
+    def exists(self, filename):
+        return os.path.exists(os.path.join(self.path, filename))
+
+    def list_files(self):
+        return sorted(os.listdir(self.path))
+
+
+class MemoryRun:
+    """A run whose files live only in memory (see RunCache)."""
+
+    ephemeral = True
+    path = None
+
+    def __init__(self, name):
+        self.name = name
+        self.files = {}
+        self.nbytes = 0
+        self.created = time.time()
+
+    def write_raster(self, filename, data, meta, colormap=None):
+        with MemoryFile() as memfile:
+            with memfile.open(**meta) as dst:
+                dst.write(data, 1)
+                if colormap:
+                    dst.write_colormap(1, colormap)
+            self.write_bytes(filename, memfile.read())
+
+    def write_bytes(self, filename, payload):
+        payload = bytes(payload)
+        self.nbytes += len(payload) - len(self.files.get(filename, b""))
+        self.files[filename] = payload
+
+    def read_bytes(self, filename):
+        return self.files[filename]
+
+    def exists(self, filename):
+        return filename in self.files
+
+    def list_files(self):
+        return sorted(self.files)
+
+
+def as_run(target):
+    """Accept a run object or a directory path and return a run object."""
+    if isinstance(target, (DirectoryRun, MemoryRun)):
+        return target
+    return DirectoryRun(target)
+
+
+def _available_memory_bytes():
+    """Available physical memory (Linux MemAvailable), or None if unknown."""
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class RunCache:
+    """
+    Bounded LRU cache of MemoryRun objects.
+
+    Entries expire `ttl_seconds` after they were stored. When the cache
+    would exceed `max_bytes`, or the machine drops below `min_free_bytes`
+    of free memory, the least recently used runs are evicted first.
+    """
+
+    def __init__(self, max_bytes, ttl_seconds, min_free_bytes=0):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.min_free_bytes = min_free_bytes
+        self._runs = OrderedDict()
+        self._nbytes = 0
+        self._lock = Lock()
+
+    def put(self, run):
+        """Store a finished MemoryRun, evicting older runs as needed."""
+        with self._lock:
+            self._evict_expired()
+            if run.name in self._runs:
+                self._remove(run.name)
+            self._runs[run.name] = (run, time.time())
+            self._nbytes += run.nbytes
+            self._evict_for_space(keep=run.name)
+        logger.info(f"Cached in-memory run {run.name} ({run.nbytes / 1024:.1f} KiB, {len(self._runs)} runs, {self._nbytes / 1024:.1f} KiB total)")
+
+    def get(self, name):
+        """Return the MemoryRun called `name`, or None if absent or expired."""
+        with self._lock:
+            self._evict_expired()
+            entry = self._runs.get(name)
+            if entry is None:
+                return None
+            self._runs.move_to_end(name)
+            return entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._runs.clear()
+            self._nbytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {'runs': len(self._runs), 'bytes': self._nbytes, 'max_bytes': self.max_bytes}
+
+    # --- internal helpers (call with the lock held) ---
+
+    def _remove(self, name):
+        run, _ = self._runs.pop(name)
+        self._nbytes -= run.nbytes
+
+    def _evict_expired(self):
+        cutoff = time.time() - self.ttl_seconds
+        expired = [name for name, (_, stored) in self._runs.items() if stored < cutoff]
+        for name in expired:
+            self._remove(name)
+            logger.info(f"Evicted expired in-memory run {name}")
+
+    def _memory_tight(self):
+        if self._nbytes > self.max_bytes:
+            return True
+        free = _available_memory_bytes()
+        return free is not None and free < self.min_free_bytes
+
+    def _evict_for_space(self, keep):
+        while self._memory_tight():
+            oldest = next((name for name in self._runs if name != keep), None)
+            if oldest is None:
+                break
+            self._remove(oldest)
+            logger.info(f"Evicted in-memory run {oldest} to free memory")
+
+
+# Process-wide cache shared by the simulator and the output route
+run_cache = RunCache(RUN_CACHE_MAX_BYTES, RUN_CACHE_TTL_SECONDS, RUN_CACHE_MIN_FREE_BYTES)
+
+
+def open_run(name):
+    """
+    Look up an existing run by name: a mem_run_* entry in the run cache or a
+    directory directly under WILDFIRE_OUTPUT_BASE. Returns None if not found.
+    """
+    # Accept the 'wildfire_output/<run>' form returned by the API
+    name = name.strip('/').split('/')[-1]
+    if not name or name in ('.', '..'):
+        return None
+    if name.startswith(MEMORY_RUN_PREFIX):
+        return run_cache.get(name)
+    path = os.path.join(WILDFIRE_OUTPUT_BASE, name)
+    if os.path.isdir(path):
+        return DirectoryRun(path, create=False)
+    return None
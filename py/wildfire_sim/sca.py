@@ -2,16 +2,33 @@ import os
 import re  # For regex file searching
 import rasterio
 import numpy as np
+import json
 import traceback
 import logging
 from scipy.signal import convolve2d
+from scipy.ndimage import binary_dilation
+from rasterio.features import rasterize
 from datetime import datetime
 from rasterio.windows import Window
 from rasterio.windows import transform as window_transform
+from rasterio.warp import transform as warp_transform, transform_geom
+
+from wildfire_sim.fire_stats import FireStatsTracker, pixel_size_m, STATS_JSON_FILENAME
+from wildfire_sim.mercator import ensure_web_mercator
+from wildfire_sim.ignition_snap import snap_to_forest
+from wildfire_sim.terrain import terrain_ignition_probability
+from wildfire_sim.mosaic import VirtualMosaic
+from wildfire_sim.run_store import DirectoryRun, MemoryRun, MEMORY_RUN_PREFIX, as_run, run_cache, open_run
+from wildfire_sim.checkpoints import (
+    write_manifest, read_manifest, save_checkpoint, load_checkpoint, checkpoint_run
+)
 
 # --- Import config from parent directory ---
 try:
-    from config import GEOTIFF_DIR, WILDFIRE_OUTPUT_BASE
+    from config import (
+        GEOTIFF_DIR, WILDFIRE_OUTPUT_BASE, SIMULATION_GRID, OUTPUT_PROFILE, EPHEMERAL_RUNS,
+        IGNITION_SNAP_RADIUS_PX, CHECKPOINT_INTERVAL, TERRAIN_SPREAD, MOSAIC_NEIGHBOURS
+    )
 except ImportError:
     # Fallback for running script directly
     print("Warning: Could not import config. Using relative paths.")
@@ -19,6 +36,13 @@ except ImportError:
     PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, os.pardir))
     GEOTIFF_DIR = os.path.join(PROJECT_ROOT, "data", "shared", "geotiff")
     WILDFIRE_OUTPUT_BASE = os.path.join(PROJECT_ROOT, "wildfire_output")
+    SIMULATION_GRID = "source"
+    OUTPUT_PROFILE = "default"
+    EPHEMERAL_RUNS = False
+    IGNITION_SNAP_RADIUS_PX = 15
+    CHECKPOINT_INTERVAL = 5
+    TERRAIN_SPREAD = True
+    MOSAIC_NEIGHBOURS = True
     os.makedirs(GEOTIFF_DIR, exist_ok=True)
     os.makedirs(WILDFIRE_OUTPUT_BASE, exist_ok=True)
 
@@ -30,24 +54,66 @@ FOREST = 1     # Burnable forest
 BURNING = 2    # Actively on fire
 BURNT = 3      # Burnt out
 
+# Palette used by the palette-indexed output profiles (matches the frame viewer)
+STATE_COLORMAP = {
+    NO_FOREST: (204, 204, 204, 255),  # light gray
+    FOREST: (39, 167, 63, 255),       # green
+    BURNING: (255, 165, 0, 255),      # orange
+    BURNT: (255, 0, 0, 255),          # red
+}
+
 # --- 2. CONFIGURATION PARAMETERS ---
 TIMESTEPS = 20
 ENABLE_CROP = True
 CROP_BUFFER = 100 # Pixels to include around the ignition point
 P_IGNITION = 0.40
 P_SPONTANEOUS = 0
+GRID_SOURCE = "source"            # simulate on the county raster as downloaded
+GRID_WEB_MERCATOR = "webmercator" # simulate on the zoom-aligned EPSG:3857 copy
+SIMULATION_GRIDS = (GRID_SOURCE, GRID_WEB_MERCATOR)
+
+# --- Output encoding profiles for the per-timestep GeoTIFFs ---
+# "palette" writes STATE_COLORMAP into the file. PREDICTOR=2 is only valid
+# for 8-bit samples, so the 2-bit profile relies on bit packing instead.
+OUTPUT_PROFILES = {
+    # Untiled LZW, the original format
+    "default": {"driver": "GTiff", "compress": "lzw"},
+    # Latency-bound: no compression, 256px tiles
+    "fast": {"driver": "GTiff", "tiled": True, "blockxsize": 256, "blockysize": 256},
+    # Storage-bound: 2 bits per pixel, ZSTD, embedded palette
+    "compact": {"driver": "GTiff", "compress": "zstd", "zstd_level": 9, "nbits": 2, "palette": True},
+    # 8-bit variant of compact that can use the horizontal predictor
+    "compact_predictor": {"driver": "GTiff", "compress": "zstd", "zstd_level": 9, "predictor": 2, "palette": True},
+    # Cloud-optimized GeoTIFF for HTTP range reads
+    "cog": {"driver": "COG", "compress": "deflate", "blocksize": 256},
+}
 
 # --- 3. HELPER FUNCTIONS ---
 
 def _coords_to_pixels(lat, lon, src):
     """Converts geographic (lat, lon) coordinates to (y, x) pixel coordinates."""
     logger.info(f"  Converting (lat={lat}, lon={lon}) to pixel coordinates...")
-    row, col = src.index(lon, lat)
+    x, y = lon, lat
+    if src.crs is not None and not src.crs.is_geographic:
+        xs, ys = warp_transform("EPSG:4326", src.crs, [lon], [lat])
+        x, y = xs[0], ys[0]
+    row, col = src.index(x, y)
     logger.info(f"  ...Converted to (row={row}, col={col})")
     return (int(row), int(col))
 
-def _save_raster(data, meta, timestep, output_dir, crop_window=None):
-    """Saves a numpy array as a GeoTIFF."""
+def _pixels_to_coords(row, col, src):
+    """Converts (row, col) pixel coordinates to the geographic (lat, lon) of the pixel centre."""
+    x, y = src.xy(row, col)
+    if src.crs is not None and not src.crs.is_geographic:
+        lons, lats = warp_transform(src.crs, "EPSG:4326", [x], [y])
+        x, y = lons[0], lats[0]
+    return (float(y), float(x))
+
+def _save_raster(data, meta, timestep, output_dir, crop_window=None, profile="default"):
+    """
+    Saves a numpy array as a GeoTIFF using one of OUTPUT_PROFILES.
+    `output_dir` is a directory path or a run_store run (e.g. a MemoryRun).
+    """
     
     if crop_window:
         new_transform = window_transform(crop_window, meta['transform'])
@@ -62,20 +128,33 @@ def _save_raster(data, meta, timestep, output_dir, crop_window=None):
         data_to_save = data
 
     data_to_save = data_to_save.astype(np.uint8)
+    options = dict(OUTPUT_PROFILES[profile])
+    write_palette = options.pop('palette', False)
+    # Source metadata may carry creation options of its own; start clean
+    for key in ('compress', 'tiled', 'blockxsize', 'blockysize', 'predictor', 'nbits'):
+        meta.pop(key, None)
     meta.update(
         dtype=rasterio.uint8,
         count=1,
-        compress='lzw'
+        **options
     )
     
-    filename = os.path.join(output_dir, f"wildfire_t_{timestep:03d}.tif")
+    run = as_run(output_dir)
+    filename = f"wildfire_t_{timestep:03d}.tif"
     
-    logger.info(f"  Saving {filename} (Size: {data_to_save.shape})...")
-    with rasterio.open(filename, 'w', **meta) as dst:
-        dst.write(data_to_save, 1)
+    logger.info(f"  Saving {run.name}/{filename} (Size: {data_to_save.shape})...")
+    run.write_raster(filename, data_to_save, meta, colormap=STATE_COLORMAP if write_palette else None)
+
+def _run_ca_step(grid, p_ignite, p_spontaneous, return_ignited=False, rng=None):
+    """
+    Performs one step of the stochastic cellular automaton.
 
-def _run_ca_step(grid, p_ignite, p_spontaneous):
-    """Performs one step of the stochastic cellular automaton."""
+    With `return_ignited=True` the boolean mask of cells that caught fire
+    this step is returned as well, so callers can track transitions.
+    `rng` is a numpy Generator; runs pass their own so they can be
+    checkpointed and replayed exactly.
+    """
+    rng = rng if rng is not None else np.random
     
     next_grid = grid.copy()
     next_grid[grid == BURNING] = BURNT
@@ -86,8 +165,8 @@ def _run_ca_step(grid, p_ignite, p_spontaneous):
     is_forest = (grid == FOREST)
     has_burning_neighbor = (burning_neighbors > 0)
     
-    random_neighbor = np.random.rand(*grid.shape)
-    random_spontaneous = np.random.rand(*grid.shape)
+    random_neighbor = rng.random(grid.shape)
+    random_spontaneous = rng.random(grid.shape)
     
     ignites_from_neighbor = (is_forest & has_burning_neighbor & (random_neighbor < p_ignite))
     ignites_spontaneously = (is_forest & ~has_burning_neighbor & (random_spontaneous < p_spontaneous))
@@ -95,31 +174,19 @@ def _run_ca_step(grid, p_ignite, p_spontaneous):
     next_grid[ignites_from_neighbor] = BURNING
     next_grid[ignites_spontaneously] = BURNING
 
+    if return_ignited:
+        return next_grid, ignites_from_neighbor | ignites_spontaneously
     return next_grid
 
-# --- 5. MAIN SIMULATION FUNCTION (CALLED BY ROUTES.PY) ---
-def run_geotiff_simulation(county_key, igni_lat, igni_lon):
+def _find_input_raster(county_key, grid=GRID_SOURCE):
     """
-    Main function to run the GeoTIFF wildfire simulation.
-    
-    Args:
-        county_key (str): The county key (e.g., "Arlington_VA").
-        igni_lat (float): Ignition point latitude.
-        igni_lon (float): Ignition point longitude.
-        
-    Returns:
-        str: The *absolute path* to the simulation output directory.
-        
+    Returns the path of the county's forest raster on the requested grid.
+
     Raises:
-        FileNotFoundError: If the correct GeoTIFF file/directory cannot be found.
-        IndexError: If the (lat, lon) is outside the raster bounds.
-        ValueError: If the ignition point is not a valid forest pixel.
+        FileNotFoundError: If no raster matches the county key.
     """
-    logger.info(f"Starting wildfire simulation for {county_key}...")
-    
-    # --- Step 1: Find the input raster ---
     file_pattern = re.compile(rf"ForestCover_{re.escape(county_key)}_2024\.tif", re.IGNORECASE)
-    INPUT_FILE = None
+    input_file = None
     
     logger.info(f"Searching for file in: {GEOTIFF_DIR}")
     if not os.path.exists(GEOTIFF_DIR):
@@ -127,18 +194,39 @@ def run_geotiff_simulation(county_key, igni_lat, igni_lon):
         
     for filename in os.listdir(GEOTIFF_DIR):
         if file_pattern.match(filename):
-            INPUT_FILE = os.path.join(GEOTIFF_DIR, filename)
-            logger.info(f"Found input file: {INPUT_FILE}")
+            input_file = os.path.join(GEOTIFF_DIR, filename)
+            logger.info(f"Found input file: {input_file}")
             break
             
-    if not INPUT_FILE:
+    if not input_file:
         raise FileNotFoundError(f"No GeoTIFF file found for countyKey '{county_key}' in {GEOTIFF_DIR}. Searched for pattern: {file_pattern.pattern}")
 
-    # --- Step 2: Read raster & get ignition point ---
+    if grid == GRID_WEB_MERCATOR:
+        # Warped once per county; frames then need no reprojection downstream
+        input_file = ensure_web_mercator(input_file)
+        logger.info(f"Using Web Mercator grid: {input_file}")
+
+    return input_file
+
+def _read_ignition_site(input_file, igni_lat, igni_lon, snap_radius_px):
+    """
+    Reads the forest raster and locates the ignition pixel, snapping it to
+    the nearest forest pixel within `snap_radius_px` if needed.
+
+    Returns:
+        dict: state (uint8 array), meta, pixel_size_m (w, h), crs, row, col,
+              snapped, snap_distance_px, and the lat / lon of the pixel used.
+
+    Raises:
+        IndexError: If the point is outside the raster.
+        ValueError: If no forest pixel lies within the snap radius.
+    """
     try:
-        with rasterio.open(INPUT_FILE) as src:
+        with rasterio.open(input_file) as src:
             current_state = src.read(1).astype(np.uint8)
             meta = src.meta.copy()
+            pixel_w, pixel_h = pixel_size_m(src.transform, src.crs)
+            output_crs = src.crs.to_string() if src.crs else None
             
             # This call will raise an IndexError if (lon, lat) is out of bounds
             start_y, start_x = _coords_to_pixels(igni_lat, igni_lon, src)
@@ -147,31 +235,276 @@ def run_geotiff_simulation(county_key, igni_lat, igni_lon):
                 start_x < 0 or start_x >= current_state.shape[1]):
                 raise IndexError(f"Calculated pixel ({start_y}, {start_x}) is outside raster bounds.")
 
+            snapped = False
+            snap_distance_px = 0.0
             if current_state[start_y, start_x] != FOREST:
-                raise ValueError(f"Ignition point {igni_lat, igni_lon} (pixel {start_y, start_x}) is not a forest pixel. Value is {current_state[start_y, start_x]}")
+                if not snap_radius_px:
+                    raise ValueError(f"Ignition point {igni_lat, igni_lon} (pixel {start_y, start_x}) is not a forest pixel. Value is {current_state[start_y, start_x]}")
+                # Raises ValueError if nothing is within the radius
+                start_y, start_x, snap_distance_px = snap_to_forest(
+                    input_file, current_state, start_y, start_x, FOREST, snap_radius_px
+                )
+                snapped = True
+
+            ignition_lat, ignition_lon = _pixels_to_coords(start_y, start_x, src)
             
     except (IndexError, ValueError):
         # Re-raise for the route to handle
         raise
     except Exception as e:
-        logger.error(f"Error reading {INPUT_FILE} or converting coords: {e}")
+        logger.error(f"Error reading {input_file} or converting coords: {e}")
         # Wrap other rasterio errors
         raise IOError(f"Failed to read or process raster file: {e}")
 
-    # --- Step 3: Prepare output directory ---
+    return {
+        'state': current_state,
+        'meta': meta,
+        'pixel_size_m': (pixel_w, pixel_h),
+        'crs': output_crs,
+        'row': start_y,
+        'col': start_x,
+        'snapped': snapped,
+        'snap_distance_px': snap_distance_px,
+        'lat': ignition_lat,
+        'lon': ignition_lon,
+    }
+
+def _mosaic_domain(row, col):
+    """
+    The crop window around (row, col) on the input raster's grid, unclipped:
+    it may extend past the raster into the neighbouring county rasters.
+    """
+    return Window(col_off=col - CROP_BUFFER, row_off=row - CROP_BUFFER, width=2 * CROP_BUFFER, height=2 * CROP_BUFFER)
+
+def _read_domain(input_file, domain):
+    """Reads `domain` from the virtual mosaic around `input_file`: (state, meta, source filenames)."""
+    with VirtualMosaic(input_file) as mosaic:
+        return mosaic.read(domain), mosaic.window_meta(domain), mosaic.last_sources
+
+def _window_array(array, window, fill):
+    """Slice `window` out of a raster-aligned array, padding cells outside it with `fill`."""
+    out = np.full((window.height, window.width), fill, dtype=array.dtype)
+    r0, c0 = max(0, window.row_off), max(0, window.col_off)
+    r1 = min(array.shape[0], window.row_off + window.height)
+    c1 = min(array.shape[1], window.col_off + window.width)
+    if r0 < r1 and c0 < c1:
+        out[r0 - window.row_off:r1 - window.row_off, c0 - window.col_off:c1 - window.col_off] = array[r0:r1, c0:c1]
+    return out
+
+def _new_run(county_key, ephemeral, suffix=""):
+    """Creates the output run: a MemoryRun in the run cache or a sim_run_* directory."""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    sim_run_name = f"sim_run_{county_key}_{timestamp}"
+    # Forks of one run at one step can start within the same second; the
+    # random part keeps their names (and directories) apart
+    unique = f"_{os.urandom(3).hex()}" if suffix else ""
+    if ephemeral:
+        # Frames go to MemoryFile buffers; the suffix keeps same-second runs apart
+        sim_run_name = f"{MEMORY_RUN_PREFIX}{county_key}_{timestamp}{suffix}_{os.urandom(3).hex()}"
+        logger.info(f"Creating in-memory run: {sim_run_name}")
+        return MemoryRun(sim_run_name)
+
+    sim_run_name = f"sim_run_{county_key}_{timestamp}{suffix}{unique}"
     # WILDFIRE_OUTPUT_BASE comes from config
     current_sim_output_dir = os.path.join(WILDFIRE_OUTPUT_BASE, sim_run_name)
-    
     logger.info(f"Creating output subfolder: {current_sim_output_dir}")
-    os.makedirs(current_sim_output_dir, exist_ok=True)
+    return DirectoryRun(current_sim_output_dir)
+
+def _simulate_steps(run, current_state, base_state, start_step, meta, crop_window, output_profile,
+                    stats, rng, checkpoints, p_ignite=P_IGNITION):
+    """
+    Runs the CA from the state at `start_step` up to TIMESTEPS, saving a frame
+    per step and a checkpoint every CHECKPOINT_INTERVAL steps (step numbers
+    are appended to `checkpoints`). `p_ignite` is P_IGNITION or a per-cell
+    terrain probability array. Returns the last timestep written.
+    """
+    final_timestep = start_step
+    for t in range(start_step + 1, TIMESTEPS + 1):
+        logger.info(f"--- Running Timestep {t} ---")
+        
+        next_state, ignited = _run_ca_step(current_state, p_ignite, P_SPONTANEOUS, return_ignited=True, rng=rng)
+
+        # Every cell burning at t-1 is burnt at t; new fires come from the mask
+        stats.burn_out(stats.burning)
+        stats.ignite(*np.nonzero(ignited))
+        stats.end_step(t)
+        final_timestep = t
+        
+        _save_raster(next_state, meta.copy(), t, run, crop_window=crop_window, profile=output_profile)
+        current_state = next_state
+
+        if stats.burning == 0:
+            logger.info(f"  Fire has burned out at timestep {t}.")
+            break
+
+        if CHECKPOINT_INTERVAL and t % CHECKPOINT_INTERVAL == 0:
+            save_checkpoint(run, t, current_state, base_state, rng)
+            checkpoints.append(t)
+
+    return final_timestep
+
+def _apply_modifiers(state, modifiers, transform, crs):
+    """
+    Applies what-if modifiers to a state array in place.
+
+    Each modifier is a dict with a "type" and either a GeoJSON "geometry"
+    (lon/lat) or, for point modifiers, "lat"/"lon". Optional "bufferPx"
+    widens the rasterized shape. Types:
+        firebreak   - fuel removed: FOREST -> NO_FOREST
+        suppression - fire put out and fuel wetted: BURNING -> BURNT, FOREST -> NO_FOREST
+        ignition    - new fire: FOREST -> BURNING
+
+    Returns:
+        int: Number of cells newly ignited.
+
+    Raises:
+        ValueError: If a modifier is malformed or does not touch the raster.
+    """
+    ignited = 0
+    for i, modifier in enumerate(modifiers or []):
+        kind = modifier.get('type')
+        if kind not in ('firebreak', 'suppression', 'ignition'):
+            raise ValueError(f"Modifier {i}: unknown type '{kind}'. Expected firebreak, suppression or ignition.")
+
+        geometry = modifier.get('geometry')
+        if geometry is None and 'lat' in modifier and 'lon' in modifier:
+            geometry = {"type": "Point", "coordinates": [float(modifier['lon']), float(modifier['lat'])]}
+        if not geometry:
+            raise ValueError(f"Modifier {i}: missing 'geometry' (or 'lat'/'lon').")
+
+        try:
+            if crs is not None:
+                geometry = transform_geom("EPSG:4326", crs, geometry)
+            mask = rasterize([(geometry, 1)], out_shape=state.shape, transform=transform,
+                             all_touched=True, dtype=np.uint8).astype(bool)
+        except Exception as e:
+            raise ValueError(f"Modifier {i}: invalid geometry: {e}")
+
+        buffer_px = int(modifier.get('bufferPx', 0))
+        if buffer_px > 0:
+            mask = binary_dilation(mask, iterations=buffer_px)
+        if not mask.any():
+            raise ValueError(f"Modifier {i}: geometry does not overlap the simulation raster.")
+
+        if kind == 'firebreak':
+            state[mask & (state == FOREST)] = NO_FOREST
+        elif kind == 'suppression':
+            state[mask & (state == BURNING)] = BURNT
+            state[mask & (state == FOREST)] = NO_FOREST
+        else:
+            lit = mask & (state == FOREST)
+            state[lit] = BURNING
+            ignited += int(lit.sum())
+        logger.info(f"  Applied {kind} modifier over {int(mask.sum())} cells.")
+    return ignited
+
+# --- 5. MAIN SIMULATION FUNCTION (CALLED BY ROUTES.PY) ---
+def run_geotiff_simulation(county_key, igni_lat, igni_lon, grid=None, output_profile=None, ephemeral=None,
+                           snap_radius_px=None, terrain=None, mosaic=None):
+    """
+    Main function to run the GeoTIFF wildfire simulation.
+    
+    Args:
+        county_key (str): The county key (e.g., "Arlington_VA").
+        igni_lat (float): Ignition point latitude.
+        igni_lon (float): Ignition point longitude.
+        grid (str): "source" to simulate on the county raster as-is, or
+            "webmercator" to simulate on its zoom-aligned EPSG:3857 copy
+            (warped once and cached). Defaults to config SIMULATION_GRID.
+        output_profile (str): Frame encoding, a key of OUTPUT_PROFILES.
+            Defaults to config OUTPUT_PROFILE.
+        ephemeral (bool): Keep the run in the in-memory run cache instead of
+            writing a sim_run_* directory. Defaults to config EPHEMERAL_RUNS.
+        snap_radius_px (float): If the point is not on a forest pixel, move it
+            to the nearest forest pixel within this many pixels (0 disables
+            snapping). Defaults to config IGNITION_SNAP_RADIUS_PX.
+        terrain (bool): Scale the ignition probability per cell by slope and
+            aspect from the county DEM, if there is one (see terrain.py).
+            Defaults to config TERRAIN_SPREAD.
+        mosaic (bool): When the crop window crosses the raster edge, fill it
+            from the neighbouring county rasters (see mosaic.py) so the fire
+            can cross county lines. Defaults to config MOSAIC_NEIGHBOURS.
+        
+    Returns:
+        dict: Run summary with keys:
+            - output_dir (str): The *absolute path* to the simulation output
+              directory, or None for ephemeral runs.
+            - run_name (str): Name of the run (directory or in-memory cache key).
+            - ephemeral (bool): Whether the run lives only in memory.
+            - final_timestep (int): Last timestep written.
+            - crs (str): CRS of the output frames.
+            - terrain (bool): Whether DEM-derived spread probabilities were used.
+            - mosaic (list): Rasters the simulation window was read from
+              (empty when only the county raster was needed).
+            - ignition (dict): Ignition actually used: lat, lon, row, col,
+              snapped (bool) and snap_distance_m.
+            - stats (dict): Column-oriented per-timestep fire statistics
+              (also written to fire_stats.json / fire_stats.csv in the run).
+        
+    Raises:
+        FileNotFoundError: If the correct GeoTIFF file/directory cannot be found.
+        IndexError: If the (lat, lon) is outside the raster bounds.
+        ValueError: If no forest pixel lies within the snap radius of the
+            ignition point, or `grid` / `output_profile` is not recognised.
+    """
+    logger.info(f"Starting wildfire simulation for {county_key}...")
+    if snap_radius_px is None:
+        snap_radius_px = IGNITION_SNAP_RADIUS_PX
+    grid = grid or SIMULATION_GRID
+    if grid not in SIMULATION_GRIDS:
+        raise ValueError(f"Unknown simulation grid '{grid}'. Expected one of: {', '.join(SIMULATION_GRIDS)}")
+    output_profile = output_profile or OUTPUT_PROFILE
+    if output_profile not in OUTPUT_PROFILES:
+        raise ValueError(f"Unknown output profile '{output_profile}'. Expected one of: {', '.join(OUTPUT_PROFILES)}")
+    
+    # --- Step 1: Find the input raster ---
+    INPUT_FILE = _find_input_raster(county_key, grid)
+
+    # --- Step 2: Read raster & get ignition point ---
+    site = _read_ignition_site(INPUT_FILE, igni_lat, igni_lon, snap_radius_px)
+    current_state = site['state']
+    meta = site['meta']
+    pixel_w, pixel_h = site['pixel_size_m']
+    output_crs = site['crs']
+    start_y, start_x = site['row'], site['col']
+    snapped = site['snapped']
+    snap_distance_px = site['snap_distance_px']
+    ignition_lat, ignition_lon = site['lat'], site['lon']
+
+    # Per-cell probabilities from the cached terrain layers (None = uniform)
+    if terrain is None:
+        terrain = TERRAIN_SPREAD
+    p_terrain = terrain_ignition_probability(county_key, INPUT_FILE, P_IGNITION) if terrain else None
+    p_ignite = P_IGNITION if p_terrain is None else p_terrain
+
+    # Near a county line the crop window is read from the neighbouring rasters
+    # too, and the fire is simulated on that window only
+    domain = None
+    mosaic_sources = []
+    if mosaic is None:
+        mosaic = MOSAIC_NEIGHBOURS
+    if mosaic and ENABLE_CROP:
+        window = _mosaic_domain(start_y, start_x)
+        full_height, full_width = current_state.shape
+        if (window.col_off < 0 or window.row_off < 0 or
+            window.col_off + window.width > full_width or window.row_off + window.height > full_height):
+            domain = window
+            logger.info(f"Ignition near the raster edge; simulating on mosaic window {domain}")
+            current_state, meta, mosaic_sources = _read_domain(INPUT_FILE, domain)
+            if p_terrain is not None:
+                p_ignite = _window_array(p_terrain, domain, P_IGNITION)
+            start_y -= domain.row_off
+            start_x -= domain.col_off
+
+    # --- Step 3: Prepare output run ---
+    if ephemeral is None:
+        ephemeral = EPHEMERAL_RUNS
+    run = _new_run(county_key, ephemeral)
     
     logger.info(f"Starting fire at coordinate: (y={start_y}, x={start_x})")
     
     # --- Step 4: Calculate cropping window ---
     crop_window = None
-    if ENABLE_CROP:
+    if ENABLE_CROP and domain is None:
         logger.info(f"Cropping enabled with a {CROP_BUFFER}px buffer.")
         full_height, full_width = current_state.shape
         y_min = max(0, start_y - CROP_BUFFER)
@@ -182,24 +515,186 @@ def run_geotiff_simulation(county_key, igni_lat, igni_lon):
         logger.info(f"  ...Calculated crop window: {crop_window}")
 
     # --- Step 5: Start fire and save t=0 ---
+    # A per-run generator makes checkpoints replayable for forks
+    seed = int(np.random.SeedSequence().entropy % (2 ** 63))
+    rng = np.random.default_rng(seed)
+    base_state = current_state.copy()
+
+    stats = FireStatsTracker(current_state.shape, pixel_w, pixel_h)
     current_state[start_y, start_x] = BURNING
-    _save_raster(current_state, meta.copy(), 0, current_sim_output_dir, crop_window=crop_window)
+    stats.ignite([start_y], [start_x])
+    stats.end_step(0)
+    _save_raster(current_state, meta.copy(), 0, run, crop_window=crop_window, profile=output_profile)
+    checkpoints = [0]
+    save_checkpoint(run, 0, current_state, base_state, rng)
 
     # --- Step 6: Run simulation loop ---
-    for t in range(1, TIMESTEPS + 1):
-        logger.info(f"--- Running Timestep {t} ---")
-        
-        next_state = _run_ca_step(current_state, P_IGNITION, P_SPONTANEOUS)
-        
-        if np.sum(next_state == BURNING) == 0:
-            logger.info(f"  Fire has burned out at timestep {t}.")
-            _save_raster(next_state, meta.copy(), t, current_sim_output_dir, crop_window=crop_window)
-            break
-            
-        _save_raster(next_state, meta.copy(), t, current_sim_output_dir, crop_window=crop_window)
-        current_state = next_state
+    final_timestep = _simulate_steps(
+        run, current_state, base_state, 0, meta, crop_window, output_profile, stats, rng, checkpoints,
+        p_ignite=p_ignite
+    )
+
+    stats.write(run)
+    ignition = {
+        "lat": ignition_lat,
+        "lon": ignition_lon,
+        "row": site['row'],
+        "col": site['col'],
+        "snapped": snapped,
+        "snap_distance_m": round(snap_distance_px * (pixel_w + pixel_h) / 2, 2)
+    }
+    write_manifest(run, {
+        "county_key": county_key,
+        "input_file": INPUT_FILE,
+        "grid": grid,
+        "output_profile": output_profile,
+        "crop_window": [crop_window.col_off, crop_window.row_off, crop_window.width, crop_window.height] if crop_window else None,
+        "domain": [domain.col_off, domain.row_off, domain.width, domain.height] if domain else None,
+        "seed": seed,
+        "p_ignition": P_IGNITION,
+        "p_spontaneous": P_SPONTANEOUS,
+        "terrain": p_terrain is not None,
+        "ignition": ignition,
+        "checkpoints": checkpoints,
+        "final_timestep": final_timestep,
+        "parent": None,
+        "fork_step": None
+    })
+    if run.ephemeral:
+        run_cache.put(run)
 
     logger.info("--- Simulation complete ---")
     
-    # Return the *absolute path* to the route handler
-    return current_sim_output_dir
+    # Return the *absolute path* (disk runs) and stats to the route handler
+    return {
+        "output_dir": run.path,
+        "run_name": run.name,
+        "ephemeral": run.ephemeral,
+        "final_timestep": final_timestep,
+        "crs": output_crs,
+        "terrain": p_terrain is not None,
+        "mosaic": mosaic_sources,
+        "ignition": ignition,
+        "stats": stats.to_columns()
+    }
+
+# --- 6. FORK A RUN FROM A CHECKPOINT (WHAT-IF RE-RUNS) ---
+def fork_geotiff_simulation(parent_run_name, step, modifiers=None, ephemeral=None):
+    """
+    Continues an existing run from `step` with what-if modifiers applied.
+
+    The state at `step` is rebuilt from the parent's nearest earlier
+    checkpoint, replayed with the saved generator so it matches the parent
+    exactly, modified (see _apply_modifiers) and simulated to TIMESTEPS.
+    Frames before `step` are not copied: the fork's manifest references the
+    parent, and the output route resolves them there.
+
+    Args:
+        parent_run_name (str): Run name or 'wildfire_output/<run>' path.
+        step (int): Timestep to fork at (0 .. parent's final timestep).
+        modifiers (list[dict]): Firebreak / suppression / ignition modifiers.
+        ephemeral (bool): Keep the fork in memory. Defaults to the parent's mode.
+
+    Returns:
+        dict: Same shape as run_geotiff_simulation, plus parent and fork_step.
+
+    Raises:
+        FileNotFoundError: If the parent run or its input raster is missing.
+        ValueError: If `step` or a modifier is invalid.
+    """
+    parent = open_run(parent_run_name)
+    if parent is None:
+        raise FileNotFoundError(f"Run '{parent_run_name}' not found (it may have expired).")
+    manifest = read_manifest(parent)
+
+    step = int(step)
+    if not 0 <= step <= manifest['final_timestep']:
+        raise ValueError(f"Fork step {step} is outside the parent's range 0..{manifest['final_timestep']}.")
+    if ephemeral is None:
+        ephemeral = parent.ephemeral
+
+    logger.info(f"Forking {parent.name} at t={step} with {len(modifiers or [])} modifier(s)...")
+
+    # --- Step 1: Rebuild the state at `step` ---
+    input_file = manifest['input_file']
+    if not os.path.exists(input_file):
+        raise FileNotFoundError(f"Input raster of run '{parent.name}' no longer exists: {input_file}")
+    with rasterio.open(input_file) as src:
+        base_state = src.read(1).astype(np.uint8)
+        meta = src.meta.copy()
+        pixel_w, pixel_h = pixel_size_m(src.transform, src.crs)
+        output_crs = src.crs.to_string() if src.crs else None
+
+    p_ignite = manifest['p_ignition']
+    if manifest.get('terrain'):
+        p_ignite = terrain_ignition_probability(manifest['county_key'], input_file, manifest['p_ignition'])
+        if p_ignite is None:
+            raise FileNotFoundError(f"DEM used by run '{parent.name}' no longer exists.")
+
+    if manifest.get('domain'):
+        # The parent ran on a cross-county mosaic window
+        domain = Window(*manifest['domain'])
+        base_state, meta, _ = _read_domain(input_file, domain)
+        if manifest.get('terrain'):
+            p_ignite = _window_array(p_ignite, domain, manifest['p_ignition'])
+
+    # Steps before a fork's own fork_step come from its parent's checkpoints
+    checkpoint_owner, checkpoint_step = checkpoint_run(parent, manifest, step)
+    current_state, rng = load_checkpoint(checkpoint_owner, checkpoint_step, base_state)
+    for _ in range(checkpoint_step, step):
+        current_state = _run_ca_step(current_state, p_ignite, manifest['p_spontaneous'], rng=rng)
+
+    # --- Step 2: Apply what-if modifiers ---
+    modifier_ignitions = _apply_modifiers(current_state, modifiers, meta['transform'], meta['crs'])
+
+    # --- Step 3: Continue the stats series from the parent's ---
+    parent_series = json.loads(parent.read_bytes(STATS_JSON_FILENAME))['series']
+    stats = FireStatsTracker.from_grid(
+        current_state, BURNING, BURNT, pixel_w, pixel_h,
+        records=[dict(zip(parent_series, values)) for values in zip(*parent_series.values())][:step]
+    )
+    parent_ignited = parent_series['ignited'][step]
+    stats.ignited_this_step(parent_ignited + modifier_ignitions)
+    stats.end_step(step)
+
+    # --- Step 4: Simulate the remaining steps ---
+    run = _new_run(manifest['county_key'], ephemeral, suffix=f"_fork_t{step:03d}")
+    cw = manifest['crop_window']
+    crop_window = Window(col_off=cw[0], row_off=cw[1], width=cw[2], height=cw[3]) if cw else None
+
+    _save_raster(current_state, meta.copy(), step, run, crop_window=crop_window, profile=manifest['output_profile'])
+    checkpoints = [step]
+    save_checkpoint(run, step, current_state, base_state, rng)
+
+    final_timestep = step
+    if stats.burning > 0:
+        final_timestep = _simulate_steps(
+            run, current_state, base_state, step, meta, crop_window, manifest['output_profile'],
+            stats, rng, checkpoints, p_ignite=p_ignite
+        )
+
+    stats.write(run)
+    write_manifest(run, dict(
+        manifest,
+        modifiers=modifiers or [],
+        checkpoints=checkpoints,
+        final_timestep=final_timestep,
+        parent=parent.name,
+        fork_step=step
+    ))
+    if run.ephemeral:
+        run_cache.put(run)
+
+    logger.info("--- Fork complete ---")
+    return {
+        "output_dir": run.path,
+        "run_name": run.name,
+        "ephemeral": run.ephemeral,
+        "final_timestep": final_timestep,
+        "crs": output_crs,
+        "terrain": bool(manifest.get('terrain')),
+        "ignition": manifest['ignition'],
+        "parent": parent.name,
+        "fork_step": step,
+        "stats": stats.to_columns()
+    }
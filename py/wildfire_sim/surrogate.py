@@ -0,0 +1,368 @@
+"""
+surrogate.py
+---------------------------------------------
+Learned surrogate of the raster CA for instant burn-probability previews.
+
+The fire can only reach a cell through forest, one cell per step, so a
+cell's burn probability is mostly explained by three local features:
+    - its geodesic distance from the ignition through forest (8-connected,
+      capped at TIMESTEPS + 1 for unreachable cells),
+    - how many of its neighbours lie one step closer (the ways the front
+      can arrive),
+    - the forest density of its 3x3 neighbourhood.
+The model is a binned lookup table over these features, fitted to the mean
+burn probability of SCA ensembles on patches sampled from the county
+rasters. Sparse bins fall back to the distance-only marginal. Prediction is
+a few array operations on the ignition window, well under 100 ms.
+
+Training holds out a set of patches and reports calibration against their
+SCA ensembles: Brier score, the ensemble's own irreducible Brier floor,
+expected calibration error (ECE) and burnt-area error. These metrics are
+stored with the model and returned with every preview. The model ignores
+terrain layers and is tied to the TIMESTEPS / P_IGNITION it was trained with.
+
+Usage:
+    python -m wildfire_sim.surrogate [--sites 200] [--holdout 50] [--members 64] [--seed 0]
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import argparse
+import numpy as np
+import rasterio
+from scipy.ndimage import binary_dilation, convolve
+
+from wildfire_sim.sca import (
+    FOREST, BURNING, TIMESTEPS, P_IGNITION, P_SPONTANEOUS,
+    _find_input_raster, _read_ignition_site, _new_run,
+)
+from wildfire_sim.ensemble import (
+    EnsembleAccumulator, ignition_window, simulate_member, write_probability_raster,
+)
+from wildfire_sim.run_store import run_cache
+
+try:
+    from config import GEOTIFF_DIR, SURROGATE_MODEL_PATH, SIMULATION_GRID, EPHEMERAL_RUNS, IGNITION_SNAP_RADIUS_PX
+except ImportError:
+    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+    PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, os.pardir, os.pardir))
+    GEOTIFF_DIR = os.path.join(PROJECT_ROOT, "data", "shared", "geotiff")
+    SURROGATE_MODEL_PATH = os.path.join(PROJECT_ROOT, "data", "surrogate", "sca_surrogate.npz")
+    SIMULATION_GRID = "source"
+    EPHEMERAL_RUNS = False
+    IGNITION_SNAP_RADIUS_PX = 15
+
+logger = logging.getLogger(__name__)
+
+FOREST_RASTER_PATTERN = re.compile(r"ForestCover_(.+)_2024\.tif$", re.IGNORECASE)
+NEIGHBOURS = np.ones((3, 3), dtype=bool)
+
+MAX_DISTANCE = TIMESTEPS + 1
+PREDECESSOR_BINS = 5                 # 0, 1, 2, 3, 4+ neighbours one step closer
+DENSITY_EDGES = np.array([3, 6])     # forest neighbours: 0-2, 3-5, 6-8
+MIN_BIN_PIXELS = 20                  # below this a bin falls back to the distance marginal
+ECE_BINS = 10
+
+_model = None
+_model_key = None
+
+
+class SurrogateModelError(ValueError):
+    """The saved surrogate does not fit the current CA parameters (a server-side problem)."""
+
+
+# --- 1. FEATURES ---
+def geodesic_distance(forest, row, col, max_distance=MAX_DISTANCE):
+    """Steps from (row, col) to every forest cell through 8-connected forest, capped at max_distance."""
+    distance = np.full(forest.shape, max_distance, dtype=np.int16)
+    reached = np.zeros(forest.shape, dtype=bool)
+    reached[row, col] = True
+    distance[row, col] = 0
+    for d in range(1, max_distance):
+        grown = binary_dilation(reached, structure=NEIGHBOURS) & forest
+        front = grown & ~reached
+        if not front.any():
+            break
+        distance[front] = d
+        reached = grown
+    return distance
+
+
+def pixel_features(forest, row, col):
+    """(distance, predecessor-bin, density-bin) index arrays for a window."""
+    distance = geodesic_distance(forest, row, col)
+    density = convolve(forest.astype(np.int8), NEIGHBOURS.astype(np.int8), mode='constant') - forest
+
+    # Neighbours exactly one step closer to the ignition
+    padded = np.pad(distance, 1, constant_values=MAX_DISTANCE)
+    h, w = distance.shape
+    predecessors = np.zeros(distance.shape, dtype=np.int8)
+    for dr in (-1, 0, 1):
+        for dc in (-1, 0, 1):
+            if dr or dc:
+                predecessors += padded[1 + dr:1 + dr + h, 1 + dc:1 + dc + w] == distance - 1
+    predecessors = np.minimum(predecessors, PREDECESSOR_BINS - 1)
+
+    return distance, predecessors, np.digitize(density, DENSITY_EDGES)
+
+
+def _bin_index(distance, predecessors, density_bin):
+    return (distance.astype(np.intp) * PREDECESSOR_BINS + predecessors) * (len(DENSITY_EDGES) + 1) + density_bin
+
+
+N_BINS = (MAX_DISTANCE + 1) * PREDECESSOR_BINS * (len(DENSITY_EDGES) + 1)
+
+
+# --- 2. MODEL ---
+class SurrogateModel:
+    """Binned burn-probability table with a distance-only fallback."""
+
+    def __init__(self, table, distance_table, metrics=None, meta=None):
+        self.table = table
+        self.distance_table = distance_table
+        self.metrics = metrics or {}
+        self.meta = meta or {}
+
+    @classmethod
+    def fit(cls, samples):
+        """Fit from (features, probability) pairs, one per training window (forest pixels only)."""
+        sums = np.zeros(N_BINS)
+        counts = np.zeros(N_BINS)
+        d_sums = np.zeros(MAX_DISTANCE + 1)
+        d_counts = np.zeros(MAX_DISTANCE + 1)
+        for (distance, predecessors, density_bin), probability, forest in samples:
+            idx = _bin_index(distance, predecessors, density_bin)[forest]
+            p = probability[forest]
+            sums += np.bincount(idx, weights=p, minlength=N_BINS)
+            counts += np.bincount(idx, minlength=N_BINS)
+            d = distance[forest]
+            d_sums += np.bincount(d, weights=p, minlength=MAX_DISTANCE + 1)
+            d_counts += np.bincount(d, minlength=MAX_DISTANCE + 1)
+
+        distance_table = np.divide(d_sums, d_counts, out=np.zeros_like(d_sums), where=d_counts > 0)
+        # Unseen distances: burn probability decays with distance, so carry the last seen value
+        seen = d_counts > 0
+        for d in range(1, MAX_DISTANCE + 1):
+            if not seen[d]:
+                distance_table[d] = distance_table[d - 1]
+        distance_table[MAX_DISTANCE] = 0.0  # unreachable within TIMESTEPS
+
+        fallback = np.repeat(distance_table, N_BINS // (MAX_DISTANCE + 1))
+        table = np.where(counts >= MIN_BIN_PIXELS, sums / np.maximum(counts, 1), fallback)
+        return cls(table.astype(np.float32), distance_table.astype(np.float32))
+
+    def predict(self, forest, row, col):
+        """Burn probability for every cell of a forest window ignited at (row, col)."""
+        distance, predecessors, density_bin = pixel_features(forest, row, col)
+        probability = self.table[_bin_index(distance, predecessors, density_bin)]
+        probability[~forest] = 0.0
+        probability[row, col] = 1.0
+        return probability
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez_compressed(
+            path,
+            table=self.table,
+            distance_table=self.distance_table,
+            metrics=np.array(json.dumps(self.metrics)),
+            meta=np.array(json.dumps(self.meta)),
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['table'], data['distance_table'],
+                       json.loads(str(data['metrics'])), json.loads(str(data['meta'])))
+
+
+def load_model(path=SURROGATE_MODEL_PATH):
+    """
+    Return the trained surrogate (cached until the file changes).
+
+    Raises:
+        FileNotFoundError: If no model has been trained yet.
+        SurrogateModelError: If the model was trained for different CA parameters.
+    """
+    global _model, _model_key
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No surrogate model at {path}. Train one with: python -m wildfire_sim.surrogate")
+    key = (path, os.path.getmtime(path))
+    if key != _model_key:
+        model = SurrogateModel.load(path)
+        if (model.meta.get('timesteps'), model.meta.get('p_ignition')) != (TIMESTEPS, P_IGNITION):
+            raise SurrogateModelError("Surrogate model was trained for different TIMESTEPS / P_IGNITION; retrain it.")
+        _model, _model_key = model, key
+    return _model
+
+
+# --- 3. CALIBRATION ---
+def calibration_metrics(predictions, targets):
+    """
+    Calibration of predicted burn probabilities against ensemble probabilities
+    over the held-out forest pixels.
+    """
+    pred = np.concatenate([p.ravel() for p in predictions]).astype(np.float64)
+    target = np.concatenate([t.ravel() for t in targets]).astype(np.float64)
+
+    # Expected Brier score against individual member outcomes (burnt or not)
+    floor = target * (1 - target)
+    brier = np.mean((pred - target) ** 2 + floor)
+
+    bins = np.minimum((pred * ECE_BINS).astype(int), ECE_BINS - 1)
+    ece = 0.0
+    for b in range(ECE_BINS):
+        in_bin = bins == b
+        if in_bin.any():
+            ece += in_bin.mean() * abs(pred[in_bin].mean() - target[in_bin].mean())
+
+    area_errors = [abs(p.sum() - t.sum()) / t.sum() for p, t in zip(predictions, targets) if t.sum() > 0]
+    return {
+        "pixels": int(pred.size),
+        "brier": round(float(brier), 5),
+        "brier_floor": round(float(floor.mean()), 5),
+        "mae": round(float(np.abs(pred - target).mean()), 5),
+        "ece": round(float(ece), 5),
+        "burnt_area_mean_rel_error": round(float(np.mean(area_errors)), 4) if area_errors else None,
+    }
+
+
+# --- 4. TRAINING ---
+def _sample_sites(rasters, n_sites, rng):
+    """Random forest ignition pixels spread over the county rasters."""
+    sites = []
+    for path in rasters:
+        with rasterio.open(path) as src:
+            forest = src.read(1) == FOREST
+        cells = np.flatnonzero(forest)
+        if cells.size == 0:
+            continue
+        picks = rng.choice(cells, size=max(1, n_sites // len(rasters)), replace=cells.size < n_sites)
+        sites += [(forest, *np.unravel_index(i, forest.shape)) for i in picks]
+    rng.shuffle(sites)
+    return sites[:n_sites]
+
+
+def _site_ensemble(forest, row, col, members, rng):
+    """SCA ensemble on the ignition window: (window forest mask, local row/col, burn probability)."""
+    window = ignition_window(forest.shape, row, col)
+    local = forest[window.row_off:window.row_off + window.height, window.col_off:window.col_off + window.width]
+    r, c = row - window.row_off, col - window.col_off
+    state = local.astype(np.uint8) * FOREST
+    state[r, c] = BURNING
+    acc = EnsembleAccumulator(state.shape, 1.0)
+    for _ in range(members):
+        acc.add(simulate_member(state, P_IGNITION, rng))
+    return local, r, c, acc.probability
+
+
+def train(n_sites=200, n_holdout=50, members=64, seed=0, directory=GEOTIFF_DIR, path=SURROGATE_MODEL_PATH):
+    """Generate SCA training ensembles, fit the surrogate, evaluate it on held-out sites and save it."""
+    if P_SPONTANEOUS > 0:
+        raise ValueError("The surrogate assumes P_SPONTANEOUS == 0 (fire spreads only through neighbours).")
+    rasters = [os.path.join(directory, f) for f in sorted(os.listdir(directory)) if FOREST_RASTER_PATTERN.match(f)]
+    if not rasters:
+        raise FileNotFoundError(f"No ForestCover_*_2024.tif rasters in {directory}.")
+
+    rng = np.random.default_rng(seed)
+    started = time.perf_counter()
+    sites = _sample_sites(rasters, n_sites + n_holdout, rng)
+    ensembles = [_site_ensemble(forest, row, col, members, rng) for forest, row, col in sites]
+    logger.info(f"Simulated {len(ensembles)} site ensembles x {members} members in {time.perf_counter() - started:.1f}s")
+
+    train_set, holdout = ensembles[:n_sites], ensembles[n_sites:]
+    model = SurrogateModel.fit(
+        (pixel_features(local, r, c), probability, local) for local, r, c, probability in train_set
+    )
+
+    predictions, targets = [], []
+    for local, r, c, probability in holdout:
+        predictions.append(model.predict(local, r, c)[local])
+        targets.append(probability[local])
+    model.metrics = calibration_metrics(predictions, targets) if holdout else {}
+    model.meta = {
+        "timesteps": TIMESTEPS,
+        "p_ignition": P_IGNITION,
+        "train_sites": len(train_set),
+        "holdout_sites": len(holdout),
+        "members": members,
+        "seed": seed,
+        "rasters": [os.path.basename(r) for r in rasters],
+        "trained": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    model.save(path)
+    logger.info(f"Saved surrogate to {path}; held-out calibration: {model.metrics}")
+    return model
+
+
+# --- 5. PREVIEW (CALLED BY ROUTES.PY) ---
+def preview_burn_probability(county_key, igni_lat, igni_lon, grid=None, snap_radius_px=None, ephemeral=None):
+    """
+    Predict the burn-probability footprint of an ignition with the surrogate
+    and save it as burn_probability.tif, like an ensemble run.
+
+    Returns:
+        dict: output_dir, run_name, ephemeral, crs, ignition, elapsed_ms,
+              burnt_area_expected_ha and the model's held-out calibration.
+    """
+    started = time.perf_counter()
+    model = load_model()
+    grid = grid or SIMULATION_GRID
+    snap_radius_px = IGNITION_SNAP_RADIUS_PX if snap_radius_px is None else snap_radius_px
+    input_file = _find_input_raster(county_key, grid)
+    site = _read_ignition_site(input_file, igni_lat, igni_lon, snap_radius_px)
+    pixel_w, pixel_h = site['pixel_size_m']
+
+    window = ignition_window(site['state'].shape, site['row'], site['col'])
+    forest = site['state'][window.row_off:window.row_off + window.height,
+                           window.col_off:window.col_off + window.width] == FOREST
+    probability = model.predict(forest, site['row'] - window.row_off, site['col'] - window.col_off)
+
+    if ephemeral is None:
+        ephemeral = EPHEMERAL_RUNS
+    run = _new_run(county_key, ephemeral, suffix="_preview")
+    write_probability_raster(run, probability, site['meta'], window)
+    if run.ephemeral:
+        run_cache.put(run)
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.info(f"Surrogate preview for {county_key} in {elapsed_ms:.1f} ms")
+    return {
+        "output_dir": run.path,
+        "run_name": run.name,
+        "ephemeral": run.ephemeral,
+        "crs": site['crs'],
+        "ignition": {
+            "lat": site['lat'],
+            "lon": site['lon'],
+            "row": site['row'],
+            "col": site['col'],
+            "snapped": site['snapped'],
+            "snap_distance_m": round(site['snap_distance_px'] * (pixel_w + pixel_h) / 2, 2)
+        },
+        "burnt_area_expected_ha": round(float(probability.sum()) * pixel_w * pixel_h / 10000.0, 4),
+        "elapsed_ms": round(elapsed_ms, 1),
+        "calibration": model.metrics,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the SCA burn-probability surrogate from simulated ensembles.")
+    parser.add_argument('--sites', type=int, default=200, help="Training ignition sites. (Default: 200)")
+    parser.add_argument('--holdout', type=int, default=50, help="Held-out sites for calibration metrics. (Default: 50)")
+    parser.add_argument('--members', type=int, default=64, help="SCA runs per site. (Default: 64)")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed. (Default: 0)")
+    parser.add_argument('--dir', '-d', default=GEOTIFF_DIR, help=f"Directory of ForestCover_*_2024.tif rasters. (Default: {GEOTIFF_DIR})")
+    parser.add_argument('--output', '-o', default=SURROGATE_MODEL_PATH, help=f"Model file. (Default: {SURROGATE_MODEL_PATH})")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    model = train(args.sites, args.holdout, args.members, args.seed, args.dir, args.output)
+    print(json.dumps(model.metrics, indent=2))
+
+
+if __name__ == "__main__":
+    main()
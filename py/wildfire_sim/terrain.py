@@ -0,0 +1,236 @@
+"""
+terrain.py
+---------------------------------------------
+DEM-derived slope, aspect and ignition layers for the raster simulator.
+
+The terrain model is the one incinerate.node_threshold applies per node:
+a slope term phi_s, an elevation damping term xi and an aspect factor
+alpha give a threshold theta (lower ignites more easily). Here it runs
+vectorized over a whole county: the DEM is reprojected onto the forest
+raster's grid, slope and aspect come from np.gradient, and aspect_dict is
+a lookup table indexed by the 45-degree sector.
+
+For the CA the threshold is turned into a per-cell ignition probability,
+scaled so that flat terrain keeps the uniform P_IGNITION. The layers are
+cached as an .npz next to the forest raster and rebuilt only when the
+forest raster or DEM changes, so heterogeneous spread costs nothing per step.
+
+DEMs are looked up in GEOTIFF_DIR as DEM_<countyKey>.tif (or
+DEM_<countyKey>_<anything>.tif).
+
+Usage (precompute the layers of every county that has a DEM):
+    python -m wildfire_sim.terrain
+"""
+
+import os
+import re
+import logging
+import argparse
+from threading import Lock
+from collections import OrderedDict
+import numpy as np
+import rasterio
+from rasterio.enums import Resampling
+from rasterio.warp import reproject
+
+from wildfire_sim.fire_stats import pixel_size_m
+
+try:
+    from config import GEOTIFF_DIR, TERRAIN_CACHE_SIZE
+except ImportError:
+    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+    PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, os.pardir, os.pardir))
+    GEOTIFF_DIR = os.path.join(PROJECT_ROOT, "data", "shared", "geotiff")
+    TERRAIN_CACHE_SIZE = 4
+
+logger = logging.getLogger(__name__)
+
+TERRAIN_SUFFIX = "_terrain.npz"
+FOREST_RASTER_PATTERN = re.compile(r"ForestCover_(.+)_2024(_3857)?\.tif$", re.IGNORECASE)
+
+# Same constants as incinerate.py (kept here so the raster path does not
+# import the networkx/matplotlib engine)
+THETA_FACTOR = 0.2
+ELEVATION_SPAN_M = 2300
+# aspect_dict of incinerate.py as a LUT, in sector order N, NE, E, ..., NW
+ASPECT_SECTORS = ('N', 'NE', 'E', 'SE', 'S', 'SW', 'W', 'NW')
+ASPECT_FACTORS = np.array([-0.063, 0.349, 0.686, 0.557, 0.039, -0.155, -0.252, -0.171])
+# Threshold of a flat cell: arctan(0) gives 0.5, times THETA_FACTOR
+FLAT_THETA = 0.5 * THETA_FACTOR
+
+_cache = OrderedDict()
+_lock = Lock()
+
+
+def find_dem(county_key, directory=GEOTIFF_DIR):
+    """Path of the county's DEM in `directory`, or None if there is none."""
+    pattern = re.compile(rf"DEM_{re.escape(county_key)}(_.*)?\.tif$", re.IGNORECASE)
+    if not os.path.isdir(directory):
+        return None
+    for filename in sorted(os.listdir(directory)):
+        if pattern.match(filename):
+            return os.path.join(directory, filename)
+    return None
+
+
+def terrain_cache_path(forest_file):
+    stem, _ = os.path.splitext(forest_file)
+    return f"{stem}{TERRAIN_SUFFIX}"
+
+
+def _dem_on_grid(dem_file, forest_src):
+    """Bilinear reprojection of the DEM onto the forest raster's grid (NaN where missing)."""
+    elevation = np.full((forest_src.height, forest_src.width), np.nan, dtype=np.float32)
+    with rasterio.open(dem_file) as dem:
+        reproject(
+            source=rasterio.band(dem, 1),
+            destination=elevation,
+            src_transform=dem.transform,
+            src_crs=dem.crs,
+            src_nodata=dem.nodata,
+            dst_transform=forest_src.transform,
+            dst_crs=forest_src.crs,
+            dst_nodata=np.nan,
+            resampling=Resampling.bilinear,
+        )
+    return elevation
+
+
+def slope_aspect(elevation, pixel_width_m, pixel_height_m):
+    """
+    Slope (degrees) and aspect (degrees clockwise from north, the direction
+    the slope faces) of a north-up elevation grid.
+    """
+    # Rows run north to south, so d/drow is the negative northward gradient
+    dz_drow, dz_dcol = np.gradient(elevation, pixel_height_m, pixel_width_m)
+    slope = np.degrees(np.arctan(np.hypot(dz_dcol, dz_drow)))
+    # Downslope vector is (-dz/dx east, -dz/dy north) = (-dz_dcol, dz_drow)
+    aspect = np.degrees(np.arctan2(-dz_dcol, dz_drow)) % 360.0
+    return slope.astype(np.float32), aspect.astype(np.float32)
+
+
+def threshold_layer(slope, elevation, aspect):
+    """Vectorized incinerate.node_threshold (without the 2-decimal rounding)."""
+    phi = np.tan(np.radians(slope))
+    phi_s = 5.275 * phi ** 2
+
+    ele_min = np.nanmin(elevation)
+    ele_max = np.nanmax(elevation)
+    if ele_max > ele_min:
+        h = (elevation - ele_min) / (ele_max - ele_min) * ELEVATION_SPAN_M
+    else:
+        h = np.zeros_like(elevation)
+    h_prime = h * np.exp(-6)
+    xi = 1 / (1 + np.log(np.maximum(h_prime, 1)))
+
+    # get_direction() as a LUT: sector k covers [45k - 22.5, 45k + 22.5).
+    # Cells without DEM coverage (NaN aspect) get a NaN theta, which
+    # ignition_probability() turns back into the uniform probability.
+    covered = np.isfinite(aspect) & np.isfinite(slope)
+    sector = np.where(covered, ((aspect + 22.5) % 360.0) // 45, 0).astype(np.intp)
+    alpha = ASPECT_FACTORS[sector]
+
+    theta = -np.arctan(phi_s * xi * alpha) / np.pi + 0.5
+    theta = np.where(covered, theta, np.nan)
+    return (theta * THETA_FACTOR).astype(np.float32)
+
+
+def ignition_probability(theta, p_ignition):
+    """
+    Per-cell CA ignition probability: P_IGNITION scaled by how much easier
+    (lower theta) or harder than flat ground the cell is. Cells without DEM
+    coverage keep the uniform probability.
+    """
+    p = p_ignition * FLAT_THETA / theta
+    p = np.where(np.isfinite(p), p, p_ignition)
+    return np.clip(p, 0.0, 1.0).astype(np.float32)
+
+
+def build_terrain_layers(forest_file, dem_file):
+    """Compute slope, aspect and theta on the forest raster's grid."""
+    with rasterio.open(forest_file) as src:
+        logger.info(f"  Building terrain layers for {os.path.basename(forest_file)} from {os.path.basename(dem_file)}...")
+        elevation = _dem_on_grid(dem_file, src)
+        pixel_w, pixel_h = pixel_size_m(src.transform, src.crs)
+
+    if not np.isfinite(elevation).any():
+        raise ValueError(f"DEM {dem_file} does not overlap {forest_file}.")
+
+    slope, aspect = slope_aspect(elevation, pixel_w, pixel_h)
+    theta = threshold_layer(slope, elevation, aspect)
+    return {"slope": slope, "aspect": aspect, "theta": theta}
+
+
+def load_terrain_layers(forest_file, dem_file):
+    """
+    Return the cached slope / aspect / theta layers for a forest raster,
+    rebuilding the .npz when it is missing or older than either input.
+    """
+    mtimes = (os.path.getmtime(forest_file), os.path.getmtime(dem_file))
+    key = (os.path.abspath(forest_file), os.path.abspath(dem_file), mtimes)
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    cache_file = terrain_cache_path(forest_file)
+    layers = None
+    if os.path.exists(cache_file):
+        with np.load(cache_file) as cached:
+            if (str(cached["dem_file"]) == os.path.basename(dem_file)
+                    and tuple(cached["mtimes"]) == mtimes):
+                layers = {name: cached[name] for name in ("slope", "aspect", "theta")}
+
+    if layers is None:
+        layers = build_terrain_layers(forest_file, dem_file)
+        np.savez_compressed(
+            cache_file,
+            dem_file=np.array(os.path.basename(dem_file)),
+            mtimes=np.array(mtimes),
+            **layers,
+        )
+        logger.info(f"  Saved terrain layers to {cache_file}")
+
+    with _lock:
+        for stale in [k for k in _cache if k[0] == key[0]]:
+            del _cache[stale]
+        _cache[key] = layers
+        while len(_cache) > TERRAIN_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return layers
+
+
+def terrain_ignition_probability(county_key, forest_file, p_ignition):
+    """
+    Per-cell ignition probabilities for `forest_file`, or None if the county
+    has no DEM (the caller then keeps the uniform probability).
+    """
+    dem_file = find_dem(county_key, os.path.dirname(forest_file))
+    if dem_file is None:
+        logger.info(f"  No DEM for {county_key}; using uniform ignition probability.")
+        return None
+    layers = load_terrain_layers(forest_file, dem_file)
+    return ignition_probability(layers["theta"], p_ignition)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute DEM-derived terrain layers for county forest rasters.")
+    parser.add_argument('--dir', '-d', default=GEOTIFF_DIR, help=f"Directory of ForestCover_*_2024.tif rasters and DEM_* files. (Default: {GEOTIFF_DIR})")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    for filename in sorted(os.listdir(args.dir)):
+        match = FOREST_RASTER_PATTERN.match(filename)
+        if not match:
+            continue
+        dem_file = find_dem(match.group(1), args.dir)
+        if dem_file is None:
+            logger.info(f"Skipping {filename}: no DEM_{match.group(1)}*.tif")
+            continue
+        load_terrain_layers(os.path.join(args.dir, filename), dem_file)
+        logger.info(f"Ready: {terrain_cache_path(os.path.join(args.dir, filename))}")
+
+
+if __name__ == "__main__":
+    main()